@@ -7,13 +7,17 @@ from gymnasium.spaces import Discrete
 import yaml
 from yaml import Loader
 import warnings
+import numpy as np
 
 from typing import Optional
 
 from copy import deepcopy
 
 from utils.pddl_utils import KnowledgeBase
-from utils.plan_utils import call_planner
+from utils.plan_utils import call_planner, get_translation_table, plan_to_action_indices
+from utils.perf_utils import NULL_PERF_RECORDER
+from utils.planner_telemetry import PLANNER_TELEMETRY
+from utils.failed_action import FailedAction, CANNOT_PLAN_ACTION
 
 import tempfile
 import os
@@ -29,24 +33,48 @@ def get_base_config():
     return config_content
 
 class BasePlanningAgent(Agent):
+    # per-stage timers, set by the env wrapper when enabled
+    perf = NULL_PERF_RECORDER
+    # planner telemetry of the env wrapper of the agent
+    planner_telemetry = PLANNER_TELEMETRY
+
     def __init__(self, verbose=False, **kwargs):
         super().__init__(**kwargs)
         self.verbose = verbose
         self._reset()
         self.kb = None
         self.not_found_actions = set()
+        # number of times the planner is called, never reset. used for benchmarking
+        self.num_planner_calls = 0
 
 
     def _reset(self):
         self.action_buffer: List[tuple] = []
+        # action indices of the plan, in the same (reversed) order as action_buffer
+        self.action_index_buffer: List[int] = []
+        self.plan_action_indices: np.ndarray = np.zeros(0, dtype=int)
+        self.plan_tokens: List[tuple] = []
         self.done = False
         self.last_action: Optional[Tuple[str, tuple]] = None
-        self.failed_action: Optional[Tuple[str, tuple]] = None
-        self.pddl_plan: str = ""
+        self.failed_action: Optional[FailedAction] = None
+        self.pddl_plan = ""
         
         # rl mode
         self.stuck = False
     
+    @property
+    def pddl_plan(self) -> str:
+        """
+        The plan in pddl format. Only generated from the plan tokens when requested.
+        """
+        if self._pddl_plan is None:
+            self._pddl_plan = "\n".join(["(" + " ".join(operator) + ")" for operator in self.plan_tokens])
+        return self._pddl_plan
+
+    @pddl_plan.setter
+    def pddl_plan(self, value):
+        self._pddl_plan = value
+    
     def get_observation_space(self, map_size: tuple, other_size: int):
         return Discrete(1)
     
@@ -61,8 +89,11 @@ class BasePlanningAgent(Agent):
         return [0]
 
     def plan(self):
+        self.num_planner_calls += 1
+        self.perf.count("planner_calls")
         with tempfile.TemporaryDirectory() as tmpdir:
-            self.pddl_domain, self.pddl_problem = self.kb.generate_pddl(self.state, self.dynamic)
+            with self.perf.timer("pddl_gen"):
+                self.pddl_domain, self.pddl_problem = self.kb.generate_pddl(self.state, self.dynamic)
             if self.verbose:
                 tmpdir = os.path.dirname(os.path.abspath(__file__))
             domain_path = os.path.join(tmpdir, PDDL_DOMAIN)
@@ -77,11 +108,25 @@ class BasePlanningAgent(Agent):
                 if self.verbose:
                     print("PDDL Problem file:")
                     print(problem_path)
-            plan, translated = call_planner(domain_path, problem_path, verbose=self.verbose)
+            translation_misses = get_translation_table.cache_info().misses
+            translation_table = get_translation_table(self.pddl_domain)
+            self.planner_telemetry.record_translation_lookup(
+                get_translation_table.cache_info().misses == translation_misses
+            )
+            with self.perf.timer("planner"):
+                plan, translated = call_planner(
+                    domain_path, problem_path, 
+                    translation_table=translation_table,
+                    verbose=self.verbose,
+                    problem_size=self.kb.problem_size,
+                    telemetry=self.planner_telemetry
+                )
         if translated is not None:
-            self.pddl_plan = "\n".join(["(" + " ".join(operator) + ")" for operator in plan])
-            self.action_buffer = list(zip(translated, plan))
-            self.action_buffer.reverse()
+            self.plan_tokens = plan
+            self.pddl_plan = None # generated lazily
+            self.plan_action_indices = plan_to_action_indices(translated, self.action_set.action_index)
+            self.action_buffer = list(zip(reversed(translated), reversed(plan)))
+            self.action_index_buffer = self.plan_action_indices[::-1].tolist()
             if self.verbose:
                 print("Found Plan:")
                 for item in plan:
@@ -97,7 +142,8 @@ class BasePlanningAgent(Agent):
 
     def set_stuck(self):
         self.stuck = True
-        self.failed_action = self.last_action
+        # last_action is (translated action, plan step)
+        self.failed_action = None if self.last_action is None else FailedAction.from_plan_step(self.last_action[1])
 
     def policy(self, observation):
         if self.stuck:
@@ -112,19 +158,19 @@ class BasePlanningAgent(Agent):
                 # if cannot plan, run RL
                 self.pddl_plan = []
                 self.stuck = True
-                self.failed_action = "cannotplan"
+                self.failed_action = CANNOT_PLAN_ACTION
                 return self.action_set.action_index["nop"]
         
         # if the plan exists, execute the first action
         if len(self.action_buffer) > 0:
             action = self.action_buffer.pop()
+            action_idx = self.action_index_buffer.pop()
             self.last_action = action
-            try:
-                return self.action_set.action_index[action[0]]
-            except KeyError as e:
-                if action[0] not in self.not_found_actions:
-                    warnings.warn(f'Action "{action[0]}" not found in action set. Will do nop. Will print only once.')
-                    self.not_found_actions.add(action[0])
-                return self.action_set.action_index["nop"]
+            if action_idx >= 0:
+                return action_idx
+            if action[0] not in self.not_found_actions:
+                warnings.warn(f'Action "{action[0]}" not found in action set. Will do nop. Will print only once.')
+                self.not_found_actions.add(action[0])
+            return self.action_set.action_index["nop"]
 
         return self.action_set.action_index["nop"]
@@ -1,6 +1,5 @@
 import argparse
-import torch
-from config import NOVELTIES, OBS_TYPES, HINTS, POLICIES, POLICY_PROPS, NOVEL_ACTIONS, OBS_GEN_ARGS, AVAILABLE_ENVS
+from config import NOVELTIES, OBS_TYPES, HINTS, POLICIES, POLICY_PROPS, NOVEL_ACTIONS, OBS_GEN_ARGS, AVAILABLE_ENVS, VECTOR_MODES
 
 
 parser = argparse.ArgumentParser(description="Polycraft Gym Environment")
@@ -33,6 +32,16 @@ parser.add_argument(
     required=False,
     default=None
 )
+parser.add_argument(
+    '--vector_mode',
+    type=str,
+    help="How the envs are run. subproc and shmem run one env per worker process, "
+         "inproc steps all the envs in the main process with batched observations, "
+         "which is faster for lightweight observation types such as facing_only and lidar_lite.",
+    required=False,
+    default="subproc",
+    choices=VECTOR_MODES.keys()
+)
 parser.add_argument(
     '--logdir', '-o',
     type=str,
@@ -83,6 +92,12 @@ parser.add_argument(
     help="The path to the checkpoint to load the model. This is used to fine tune a model. To resume training, use --resume instead.",
     default=None
 )
+parser.add_argument(
+    '--num_checkpoints',
+    type=int,
+    help="Number of rolling checkpoint_<epoch>.pth files kept in the log folder.",
+    default=3
+)
 parser.add_argument(
     '--lr', 
     help="Learning Rate",
@@ -95,8 +110,32 @@ parser.add_argument(
 )
 parser.add_argument(
     '--device', '-d',
-    help="device to be run on",
-    default='cuda' if torch.cuda.is_available() else 'cpu'
+    help="device to be run on. Defaults to cuda if available, otherwise cpu.",
+    default=None
+)
+parser.add_argument(
+    '--perf',
+    type=int,
+    help="Sample interval (in env steps) of the per-stage env timers and planner telemetry, logged as perf/* and planner/*. 0 disables the timers.",
+    default=0
+)
+parser.add_argument(
+    '--planner_trace',
+    action='store_true',
+    help="Trace every planner call of the env workers as json lines to planner_trace_<pid>.jsonl in the log folder.",
+)
+parser.add_argument(
+    '--profile',
+    action='store_true',
+    help="Sample the stacks of the main process and of every env worker, written as flamegraph-ready <role>_<pid>.folded files to the profile folder in the log folder.",
 )
 
 verbose = False
+
+
+def get_default_device():
+    """
+    Picks the default device. torch is only imported when this is called.
+    """
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
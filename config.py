@@ -1,22 +1,32 @@
-from obs_convertion import LidarAll, OnlyFacingObs, NovelOnlyObs, Matrix
-import tianshou as ts
-from policies import BiasedDQN
-from net.basic import BasicNet
-from net.norm_net import NormalizedNet
-from envs.single_agent_standard import SingleAgentWrapper
+from utils.lazy_registry import LazyRegistry
 
-OBS_TYPES = {
-    "lidar_all": LidarAll,
-    "lidar_lite": LidarAll,
-    "facing_only": OnlyFacingObs,
-    "hinted_only": NovelOnlyObs,
-    "matrix": Matrix
-}
+# The registries below are resolved by dotted path on first use, so that
+# importing the config (e.g. in the env workers) does not import tianshou,
+# torch or every observation generator.
+
+OBS_TYPES = LazyRegistry({
+    "lidar_all": "obs_convertion.LidarAll",
+    "lidar_lite": "obs_convertion.LidarAll",
+    "lidar_occluded": "obs_convertion.LidarAll",
+    "facing_only": "obs_convertion.OnlyFacingObs",
+    "hinted_only": "obs_convertion.NovelOnlyObs",
+    "matrix": "obs_convertion.Matrix",
+    "local_map": "obs_convertion.LocalMap",
+    "local_map_onehot": "obs_convertion.LocalMap",
+    "distance_field": "obs_convertion.DistanceField",
+    "path_distance": "obs_convertion.PathDistance",
+})
 
 OBS_GEN_ARGS = {
     "lidar_lite": {
         "num_beams": 4,
         "max_beam_range": 2
+    },
+    "lidar_occluded": {
+        "occlusion": True
+    },
+    "local_map_onehot": {
+        "one_hot": True
     }
 }
 
@@ -60,18 +70,18 @@ NOVEL_ACTIONS = {
     "space_ar": [],
 }
 
-POLICIES = {
-    "dqn": ts.policy.DQNPolicy,
-    "novel_boost": BiasedDQN,
-    "ppo": ts.policy.PPOPolicy, 
-    "dsac": ts.policy.DiscreteSACPolicy,
-    "crr": ts.policy.DiscreteCRRPolicy,
-    "crr_separate_net": ts.policy.DiscreteCRRPolicy,
-    "gail": ts.policy.GAILPolicy,
-    "ppo_shared_net": ts.policy.PPOPolicy,
+POLICIES = LazyRegistry({
+    "dqn": "tianshou.policy.DQNPolicy",
+    "novel_boost": "policies.BiasedDQN",
+    "ppo": "tianshou.policy.PPOPolicy", 
+    "dsac": "tianshou.policy.DiscreteSACPolicy",
+    "crr": "tianshou.policy.DiscreteCRRPolicy",
+    "crr_separate_net": "tianshou.policy.DiscreteCRRPolicy",
+    "gail": "tianshou.policy.GAILPolicy",
+    "ppo_shared_net": "tianshou.policy.PPOPolicy",
     "icm_ppo": None,
     "icm_ppo_shared_net": None
-}
+})
 
 POLICY_PROPS = {
     "dqn": {},
@@ -87,19 +97,25 @@ AVAILABLE_ENVS = {
     "rs_s": None
 }
 
-AVAILABLE_WRAPPERS = {
-    "sa": [SingleAgentWrapper]
-}
+AVAILABLE_WRAPPERS = LazyRegistry({
+    "sa": ["envs.single_agent_standard.SingleAgentWrapper"]
+})
 
 
-RL_ALGOS = {
-    "dqn": ts.policy.DQNPolicy,
-}
+RL_ALGOS = LazyRegistry({
+    "dqn": "tianshou.policy.DQNPolicy",
+})
 
-NETS = {
-    "basic": BasicNet,
-    "normalized": NormalizedNet,
-}
+NETS = LazyRegistry({
+    "basic": "net.basic.BasicNet",
+    "normalized": "net.norm_net.NormalizedNet",
+})
+
+VECTOR_MODES = LazyRegistry({
+    "subproc": "tianshou.env.SubprocVectorEnv",
+    "shmem": "tianshou.env.ShmemVectorEnv",
+    "inproc": "ts_extensions.inproc_vector_env.InProcVectorEnv",
+})
 
 REWARDS = {
     "positive": 1000,
@@ -3,6 +3,8 @@ import gymnasium as gym
 
 from agents.base_planning import BasePlanningAgent
 from utils.diarc_json_utils import generate_diarc_json_from_state
+from utils.failed_action import CANNOT_PLAN_ACTION
+from utils.perf_utils import PERF_INFO_KEYS
 
 
 REWARDS = {
@@ -29,6 +31,15 @@ class RapidLearnWrapper(gym.Wrapper):
     def __init__(self, env, skip_epi_when_rl_done):
         super().__init__(env)
         self.skip_epi_when_rl_done = skip_epi_when_rl_done
+        # per-stage timers, shared with the wrapped env
+        self.perf = self.env.perf
+        # perf and planner samples emitted by a step of the wrapped env, to be passed on
+        self._pending_perf_samples = {}
+
+    def _keep_perf_sample(self, info: dict):
+        for key in PERF_INFO_KEYS:
+            if key in info:
+                self._pending_perf_samples[key] = info[key]
 
     
     def _execute_plan(self):
@@ -57,6 +68,7 @@ class RapidLearnWrapper(gym.Wrapper):
 
             # run the action
             obs, reward, terminated, truncated, info = self.env.step(action)
+            self._keep_perf_sample(info)
             if not info["success"]:
                 agent_obj.set_stuck()
             # run the agents in the environment
@@ -72,19 +84,22 @@ class RapidLearnWrapper(gym.Wrapper):
 
     def step(self, action):
         # this step function does not call the wrapped step function.
-        self.env.step(action)
+        _, _, _, _, info = self.env.step(action)
+        self._keep_perf_sample(info)
 
         # run another step of other agents using the stored policy 
         # until the agent in interest is reached again.
         while True:
             # returns true if the agent gets stuck in the current episode.
             # returns false if the agent goes into the next episode.
-            is_stuck = self._execute_plan()
+            with self.perf.timer("execute_plan"):
+                is_stuck = self._execute_plan()
 
             obs, reward, env_terminated, truncated, info = self.env.last()
 
             # check if effects met and give the rewards
-            plannable_done, truncated, reward = self._gen_reward()
+            with self.perf.timer("rl_reward"):
+                plannable_done, truncated, reward = self._gen_reward()
 
             if not is_stuck:
                 # not stuck, in a new episode.
@@ -107,7 +122,11 @@ class RapidLearnWrapper(gym.Wrapper):
             terminated = env_terminated or plannable_done
         else:
             terminated = env_terminated
-        return obs, reward, terminated, truncated, {"skipped_epi_count": 0}
+        info = {"skipped_epi_count": 0}
+        if len(self._pending_perf_samples) > 0:
+            info.update(self._pending_perf_samples)
+            self._pending_perf_samples = {}
+        return obs, reward, terminated, truncated, info
 
     def reset(self, seed=None, options={}):
         _, info = self.env.reset()
@@ -132,14 +151,17 @@ class RapidLearnWrapper(gym.Wrapper):
         """
         main_agent = self.env.agent_manager.agents["agent_0"].agent
         failed_action = main_agent.failed_action
-        diarc_json = generate_diarc_json_from_state(
-            player_id=self.player_id,
-            state=self.env.internal_state,
-            dynamic=self.env.dynamic,
-            failed_action=failed_action,
-            success=False,
-        )
-        return self.rep_gen.generate_observation(diarc_json)
+        with self.perf.timer("diarc_json"):
+            diarc_json = generate_diarc_json_from_state(
+                player_id=self.player_id,
+                state=self.env.internal_state,
+                dynamic=self.env.dynamic,
+                failed_action=failed_action,
+                success=False,
+                include_slots=False,
+            )
+        with self.perf.timer("obs"):
+            return self.rep_gen.generate_observation(diarc_json)
 
 
     def _init_obs_gen(self):
@@ -151,9 +173,6 @@ class RapidLearnWrapper(gym.Wrapper):
             main_agent.verbose = True
         failed_action = main_agent.failed_action
         action_set = self.env.agent_manager.agents['agent_0'].action_set
-
-        if type(failed_action) == tuple:
-            failed_action = "(" + " ".join(failed_action[1]) + ")"
         
         diarc_json = generate_diarc_json_from_state(
             player_id=self.player_id,
@@ -176,6 +195,7 @@ class RapidLearnWrapper(gym.Wrapper):
             RL_test=True,
             **self.rep_gen_args
         )
+        self.rep_gen.perf = self.perf
 
 
     def _gen_reward(self) -> Tuple[bool, bool, float]:
@@ -195,7 +215,7 @@ class RapidLearnWrapper(gym.Wrapper):
         failed_action = main_agent.failed_action
 
         # case 2: unplannable mode, replan straight away
-        if failed_action == "cannotplan":
+        if failed_action == CANNOT_PLAN_ACTION:
             plan_found = main_agent.plan()
             if plan_found:
                 # case 2.1, plan found. give positive reward and quit
@@ -205,14 +225,17 @@ class RapidLearnWrapper(gym.Wrapper):
 
 
         # case 3: failed action mode. firstly check if effects met, then replan and assign rewards
-        diarc_json = generate_diarc_json_from_state(
-            player_id=self.env.player_id,
-            state=self.unwrapped.internal_state,
-            dynamic=self.unwrapped.dynamic,
-            failed_action=failed_action,
-            success=False,
-        )
-        effects_met = self.rep_gen.check_if_effects_met(diarc_json)
+        with self.perf.timer("diarc_json"):
+            diarc_json = generate_diarc_json_from_state(
+                player_id=self.env.player_id,
+                state=self.unwrapped.internal_state,
+                dynamic=self.unwrapped.dynamic,
+                failed_action=failed_action,
+                success=False,
+                include_slots=False,
+            )
+        with self.perf.timer("effect_check"):
+            effects_met = self.rep_gen.check_if_effects_met(diarc_json)
         # case 3.1: effects not met, return step reward and continue
         if not (effects_met[0] or effects_met[1]):
             return False, False, REWARDS['step']
@@ -3,6 +3,7 @@ import gymnasium as gym
 
 from agents.base_planning import BasePlanningAgent
 from utils.diarc_json_utils import generate_diarc_json_from_state
+from utils.failed_action import CANNOT_PLAN_ACTION
 
 from .single_agent_standard import SingleAgentWrapper
 
@@ -58,9 +59,6 @@ class RapidLearnWrapper(SingleAgentWrapper):
             main_agent.verbose = True
         failed_action = main_agent.failed_action
         action_set = self.env.agent_manager.agents['agent_0'].action_set
-
-        if type(failed_action) == tuple:
-            failed_action = "(" + " ".join(failed_action[1]) + ")"
         
         diarc_json = generate_diarc_json_from_state(
             player_id=self.player_id,
@@ -102,7 +100,7 @@ class RapidLearnWrapper(SingleAgentWrapper):
         failed_action = main_agent.failed_action
 
         # case 2: unplannable mode, replan straight away
-        if failed_action == "cannotplan":
+        if failed_action == CANNOT_PLAN_ACTION:
             plan_found = main_agent.plan()
             if plan_found:
                 # case 2.1, plan found. give positive reward and quit
@@ -118,6 +116,7 @@ class RapidLearnWrapper(SingleAgentWrapper):
             dynamic=self.env.dynamic,
             failed_action=failed_action,
             success=False,
+            include_slots=False,
         )
         effects_met = self.rep_gen.check_if_effects_met(diarc_json)
         # case 3.1: effects not met, return step reward and continue
@@ -5,16 +5,13 @@ from agents import BasePlanningAgent
 
 from gym_novel_gridworlds2.actions import ActionSet
 
-import queue
+from utils.subgoal_compiler import compile_subgoals
 
 REWARDS = {
     "step": -1,
     "plan_fit": 5
 }
 
-def is_good_goal(goal: tuple):
-    return "craft" in goal or "use" in goal or "trade" in goal or "collect" in goal
-
 
 class RSPreplannedSubgoal(gym.Wrapper):
     """
@@ -39,10 +36,11 @@ class RSPreplannedSubgoal(gym.Wrapper):
         agent: BasePlanningAgent = self.unwrapped.agent_manager.agents[self.get_wrapper_attr("agent_name")].agent
         plan_success = agent.plan()
         action_buffer = agent.action_buffer # reversed action buffer
-        if plan_success and "nop" not in action_buffer[0]:
-            self.subgoals = [
-                action[0] for action in action_buffer if is_good_goal(action[1][0])
-            ]
+        if plan_success:
+            # the plan steps increasing the count of an item are the subgoals
+            subgoal_steps = compile_subgoals(agent.pddl_domain, agent.plan_tokens).steps
+            plan_actions = action_buffer[::-1]
+            self.subgoals = [plan_actions[step][0] for step in reversed(subgoal_steps.tolist())]
         else:
             self.subgoals = []
         if self.unwrapped.render_mode == "human":
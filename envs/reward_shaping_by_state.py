@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Tuple
 import gymnasium as gym
 from agents import BasePlanningAgent
@@ -6,8 +5,11 @@ from agents import BasePlanningAgent
 
 from gym_novel_gridworlds2.actions import ActionSet
 from gym_novel_gridworlds2.envs import NovelGridWorldSequentialEnv
+from gym_novel_gridworlds2.contrib.polycraft.utils.map_utils import getBlockInFront
 
-import re
+import numpy as np
+
+from utils.subgoal_compiler import SubgoalPlan, compile_subgoals
 
 REWARDS = {
     "step": -1,
@@ -16,56 +18,10 @@ REWARDS = {
 
 REHIT_SUBGOAL_DECAY_FACTOR = 0.5
 
-INVENTORY_CHANGES = {
-    "craft_planks": {
-    },
-    "craft_stick": {
-        "stick": 4
-    },
-    "collect_from_tree_tap": {
-        "rubber": 1
-    },
-    "break_diamond_ore": {
-        "diamond": 9
-    },
-    "craft_pogo_stick": {
-        "pogo_stick": 1
-    },
-    "break_block_of_platinum": {
-        "block_of_platinum": 1
-    },
-    "trade_block_of_titanium_1": {
-        "block_of_titanium": 1
-    },
-    "break_oak_log": {
-    }
-}
-
-def _parse_add_sub_goals(pddl_plan):
-    pddl_plan = pddl_plan.split("\n")
-    sub_goals = []
-    for action in reversed(pddl_plan):
-        tokens = action.lstrip("(").rstrip(")").split(" ")
-        if tokens[0] == "break_diamond_ore":
-            sub_goals.append(INVENTORY_CHANGES["break_diamond_ore"])
-        elif "break" in tokens[0]:
-            sub_goals.append(INVENTORY_CHANGES["break_" + tokens[1]])
-        elif "craft" in tokens[0] or "trade" in tokens[0] or "collect" in tokens[0]:
-            sub_goals.append(INVENTORY_CHANGES[tokens[0]])
-    return sub_goals
-
-
-def _inventory_goal_met(old_inventory, new_inventory, subgoal):
-    for item, increment in subgoal.items():
-        if new_inventory.get(item, 0) - old_inventory.get(item, 0) < increment:
-            return False
-    return True
-
-
 class RSPreplannedStateSubgoal(gym.Wrapper):
     """
-    An environment that gives rewards given if the action picked matches
-    the first action in the plan.
+    An environment that gives rewards when the agent reaches the subgoals
+    of the plan, i.e. gets the items the plan steps would produce.
     """
     def __init__(self, env: gym.Env):
         self.env = env
@@ -73,25 +29,53 @@ class RSPreplannedStateSubgoal(gym.Wrapper):
         # excludes actions in which we already give extra reward
         # to avoid local minima 
         self.rs_exclude_list = set()
+
+        # subgoals of the plan found at reset, and the stack of the
+        # indices of the remaining ones, the next one last.
+        self.subgoal_plan: SubgoalPlan = compile_subgoals("", [])
+        self.subgoals = []
+        # counts of the subgoal items in the inventory before the step
         self.last_inventory = None
+        # item in front of the agent before the step, only tracked when a
+        # subgoal places items in the world
+        self.last_facing = None
 
         # temporatily store the last subgoal for repeated reward
         self.last_subgoal = None 
 
         # track and compare with initial inventory. If the algorithm skipped ahead, 
         # then we can give skip some subgoals.
-        self.init_inventory = {} 
+        self.init_inventory = None
         self.rehit_subgoal_decay = 1
     
-    
-    def _get_copied_agent_inventory(self):
+
+    def _get_agent_entity(self):
         base_env: NovelGridWorldSequentialEnv = self.unwrapped
-        agent_rep = base_env.agent_manager.agents[self.get_wrapper_attr("agent_name")]
-        return deepcopy(agent_rep.entity.inventory)
+        return base_env.agent_manager.agents[self.get_wrapper_attr("agent_name")].entity
+
+    def _get_agent_inventory(self) -> np.ndarray:
+        return self.subgoal_plan.counts(self._get_agent_entity().inventory)
+
+    def _get_facing(self):
+        if not self.subgoal_plan.world.any():
+            return None
+        return getBlockInFront(self._get_agent_entity(), self.unwrapped.internal_state)['name']
+
+    def _get_world_increase(self, last_facing, new_facing) -> np.ndarray:
+        """
+        Counting the items of the world is as costly as scanning the map,
+        so an item counts as added to the world when it is placed in front
+        of the agent.
+        """
+        world_increase = np.zeros(len(self.subgoal_plan.items), dtype=int)
+        if new_facing != last_facing and new_facing in self.subgoal_plan.items:
+            world_increase[self.subgoal_plan.items.index(new_facing)] = 1
+        return world_increase
 
 
     def step(self, action):
-        self.last_inventory = self._get_copied_agent_inventory()
+        self.last_inventory = self._get_agent_inventory()
+        self.last_facing = self._get_facing()
         
         obs, reward, terminated, truncated, info = self.env.step(action)
         reward = self._update_reward(action, terminated, truncated, info, reward)
@@ -104,22 +88,21 @@ class RSPreplannedStateSubgoal(gym.Wrapper):
 
         agent: BasePlanningAgent = self.unwrapped.agent_manager.agents[self.get_wrapper_attr("agent_name")].agent
         plan_success = agent.plan()
-        pddl_plan = agent.pddl_plan
-        if plan_success and "nop" not in pddl_plan[0]:
-            try:
-                self.subgoals = _parse_add_sub_goals(pddl_plan)
-            except KeyError as e:
-                raise Exception("Unable to add subgoal for Reward Shaping") from e
+        if plan_success:
+            # a nop plan has no subgoals
+            self.subgoal_plan = compile_subgoals(agent.pddl_domain, agent.plan_tokens)
         else:
-            self.subgoals = []
+            self.subgoal_plan = compile_subgoals("", [])
+        self.subgoals = list(reversed(range(len(self.subgoal_plan))))
         if self.unwrapped.render_mode == "human":
             agent.verbose = True
             print("sub goals:")
             for goal in reversed(self.subgoals):
-                print("   inventory increase: ", goal)
+                print("   increase: ", self.subgoal_plan.describe(goal))
             print()
         self.last_inventory = None
-        self.init_inventory = self._get_copied_agent_inventory()
+        self.last_facing = None
+        self.init_inventory = self._get_agent_inventory()
         self.last_subgoal = None # temporatily store the last subgoal for repeated reward
         self.rehit_subgoal_decay = 1
         return result
@@ -129,25 +112,29 @@ class RSPreplannedStateSubgoal(gym.Wrapper):
         action_set: ActionSet = self.unwrapped.agent_manager.agents[agent_name].action_set
         return action_set.actions[action][0]
 
-    def _skip_subgoal_if_done(self):
+    def _skip_subgoal_if_done(self, new_inventory: np.ndarray):
         """
         When a subgoal is completed, skip subsequent subgoals if they have already been completed
         somehow in previous time steps.
         """
+        # the world increase since the start is unknown, so subgoals
+        # placing items are never skipped
+        no_world_increase = np.zeros(len(self.subgoal_plan.items), dtype=int)
+        inventory_increase = new_inventory - self.init_inventory
         while len(self.subgoals) > 0:
-            if not _inventory_goal_met(self.init_inventory, self.last_inventory, self.subgoals[-1]):
+            if not self.subgoal_plan.is_met(self.subgoals[-1], inventory_increase, no_world_increase):
                 # if the agent did not skip ahead, we do not update the subgoal.
                 break
             self.last_subgoal = self.subgoals[-1]
             self.rehit_subgoal_decay = 1
             self.subgoals.pop()
             if self.unwrapped.render_mode == "human":
-                print(f"Already completed subgoal {self.last_subgoal}. Next goal:", self.subgoals[-1])
+                print(f"Already completed subgoal {self.subgoal_plan.describe(self.last_subgoal)}.")
     
     def check_goal_state(self):
         print()
-        print("subgoals", self.subgoals)
-        print("last goal", self.last_subgoal)
+        print("subgoals", [self.subgoal_plan.describe(goal) for goal in self.subgoals])
+        print("last goal", None if self.last_subgoal is None else self.subgoal_plan.describe(self.last_subgoal))
         print("decay", self.rehit_subgoal_decay)
         print()
 
@@ -161,21 +148,22 @@ class RSPreplannedStateSubgoal(gym.Wrapper):
         action_name = self.convert_action_to_name(action)
 
         if info.get("success", False) and len(self.subgoals) > 0: # action success and have sub goals
-            last_inventory = self.last_inventory
-            new_inventory = self._get_copied_agent_inventory()
+            new_inventory = self._get_agent_inventory()
+            inventory_increase = new_inventory - self.last_inventory
+            world_increase = self._get_world_increase(self.last_facing, self._get_facing())
             
-            if _inventory_goal_met(last_inventory, new_inventory, self.subgoals[-1]): # check inventory
+            if self.subgoal_plan.is_met(self.subgoals[-1], inventory_increase, world_increase): # check inventory
                 self.last_subgoal = self.subgoals[-1]
                 self.rehit_subgoal_decay = 1
                 self.subgoals.pop()
-                if self.unwrapped.render_mode == "human":
-                    print(f"hit {action_name}. got plan fit reward. Next goal:", self.subgoals[-1])
-                self._skip_subgoal_if_done()
+                if self.unwrapped.render_mode == "human" and len(self.subgoals) > 0:
+                    print(f"hit {action_name}. got plan fit reward. Next goal:", self.subgoal_plan.describe(self.subgoals[-1]))
+                self._skip_subgoal_if_done(new_inventory)
                 return REWARDS["plan_fit"]
-            elif self.last_subgoal is not None and _inventory_goal_met(last_inventory, new_inventory, self.last_subgoal):
+            elif self.last_subgoal is not None and \
+                    self.subgoal_plan.is_met(self.last_subgoal, inventory_increase, world_increase):
                 if self.unwrapped.render_mode == "human":
                     print(f"hit {action_name} again. decay now: {self.rehit_subgoal_decay}")
                 self.rehit_subgoal_decay *= REHIT_SUBGOAL_DECAY_FACTOR
                 return REWARDS["plan_fit"] * self.rehit_subgoal_decay
         return REWARDS["step"]
-
@@ -6,6 +6,8 @@ from gym_novel_gridworlds2.utils.json_parser import ConfigParser, load_json
 from agents.base_planning import BasePlanningAgent
 from utils.diarc_json_utils import generate_diarc_json_from_state
 from utils.pddl_utils import generate_obj_types, get_entities
+from utils.perf_utils import PerfRecorder, NULL_PERF_RECORDER
+from utils.planner_telemetry import PlannerTelemetry
 from obs_convertion import LidarAll
 
 REWARDS = {
@@ -31,10 +33,19 @@ class SingleAgentWrapper(gym.Wrapper):
             RepGenerator=LidarAll,
             rep_gen_args={},
             skip_epi_when_rl_done=True,
-            seed=None
+            seed=None,
+            perf_sample_interval=0
         ):
         self.player_id = 0
 
+        # per-stage timers, disabled unless perf_sample_interval > 0
+        if perf_sample_interval > 0:
+            self.perf = PerfRecorder(enabled=True, sample_interval=perf_sample_interval)
+        else:
+            self.perf = NULL_PERF_RECORDER
+        # planner calls of the agent of this env, see utils/planner_telemetry.py
+        self.planner_telemetry = PlannerTelemetry()
+
         self.env = base_env
         self.show_action_log = show_action_log
         self.agent_name = agent_name
@@ -48,14 +59,19 @@ class SingleAgentWrapper(gym.Wrapper):
 
         if seed is not None:
             self.env.reset(seed=seed)
-        self.env.dynamic.all_objects = generate_obj_types(self.env.config_dict)
-        self.env.dynamic.all_entities = get_entities(self.env.config_dict)
+        self._set_dynamic_types()
 
         self._action_space = None
         self._observation_space = None
 
         self.skip_epi_when_rl_done = skip_epi_when_rl_done
 
+        # when set, _gen_obs only keeps the diarc json of the state and returns
+        # None. the observation is then generated by the caller, batched over
+        # many envs. see ts_extensions/inproc_vector_env.py
+        self.defer_obs = False
+        self.deferred_obs_state = None
+
     
     @property
     def observation_space(self):
@@ -115,9 +131,6 @@ class SingleAgentWrapper(gym.Wrapper):
             main_agent.verbose = True
         failed_action = main_agent.failed_action
         action_set = self.env.agent_manager.agents['agent_0'].action_set
-
-        if type(failed_action) == tuple:
-            failed_action = "(" + " ".join(failed_action[1]) + ")"
         
         diarc_json = generate_diarc_json_from_state(
             player_id=self.player_id,
@@ -138,6 +151,7 @@ class SingleAgentWrapper(gym.Wrapper):
             RL_test=True,
             **self.rep_gen_args
         )
+        self.rep_gen.perf = self.perf
 
 
     def _gen_obs(self):
@@ -146,14 +160,20 @@ class SingleAgentWrapper(gym.Wrapper):
         """
         main_agent = self.env.agent_manager.agents["agent_0"].agent
         failed_action = main_agent.failed_action
-        diarc_json = generate_diarc_json_from_state(
-            player_id=self.player_id,
-            state=self.env.internal_state,
-            dynamic=self.env.dynamic,
-            failed_action=failed_action,
-            success=False,
-        )
-        return self.rep_gen.generate_observation(diarc_json)
+        with self.perf.timer("diarc_json"):
+            diarc_json = generate_diarc_json_from_state(
+                player_id=self.player_id,
+                state=self.env.internal_state,
+                dynamic=self.env.dynamic,
+                failed_action=failed_action,
+                success=False,
+                include_slots=False,
+            )
+        if self.defer_obs:
+            self.deferred_obs_state = diarc_json
+            return None
+        with self.perf.timer("obs"):
+            return self.rep_gen.generate_observation(diarc_json)
 
 
     def _gen_reward(self):
@@ -169,12 +189,28 @@ class SingleAgentWrapper(gym.Wrapper):
         
 
     def step(self, action):
+        with self.perf.timer("step"):
+            obs, reward, terminated, truncated, info = self._step(action)
+
+        self.perf.tick()
+        perf_sample = self.perf.pop_sample()
+        if perf_sample is not None:
+            info["perf"] = perf_sample
+            # planner calls of the agent of this env since the last sample
+            planner_summary = self.planner_telemetry.pop_summary()
+            if planner_summary is not None:
+                info["planner"] = planner_summary
+        return obs, reward, terminated, truncated, info
+
+    def _step(self, action):
         # run the agent in interest
-        self.env.step(action, {})
+        with self.perf.timer("env_step"):
+            self.env.step(action, {})
 
         # run another step of other agents using the stored policy 
         # until the agent in interest is reached again.
-        needs_rl = self._run_env_agents()
+        with self.perf.timer("env_agents"):
+            needs_rl = self._run_env_agents()
 
         obs, reward, env_terminated, truncated, info = self.env.last()
 
@@ -192,11 +228,19 @@ class SingleAgentWrapper(gym.Wrapper):
             terminated = env_terminated
         return obs, reward, terminated, truncated, {"skipped_epi_count": 0, **info}
 
-    def seed(self, seed=None):
-        self.env.reset(seed=seed)
+    def _set_dynamic_types(self):
+        """
+        Sets the type tables of the config of the current episode, which
+        a novelty can change at reset. The tables are cached per config
+        content, see utils/pddl_utils.py.
+        """
         self.env.dynamic.all_objects = generate_obj_types(self.env.config_dict)
         self.env.dynamic.all_entities = get_entities(self.env.config_dict)
 
+    def seed(self, seed=None):
+        self.env.reset(seed=seed)
+        self._set_dynamic_types()
+
     def reset(self, seed=None, options={}):
         if options is None:
             options = {}
@@ -205,6 +249,8 @@ class SingleAgentWrapper(gym.Wrapper):
         needs_rl = False
         main_agent = self.env.agent_manager.agents[self.agent_name].agent
         main_agent._reset()
+        main_agent.perf = self.perf
+        main_agent.planner_telemetry = self.planner_telemetry
         if self.show_action_log:
             main_agent.verbose = True
 
@@ -213,8 +259,7 @@ class SingleAgentWrapper(gym.Wrapper):
         while not needs_rl:
             self.episode += 1
             self.env.reset(seed=seed, options={"episode": self.episode, **options})
-            self.env.dynamic.all_objects = generate_obj_types(self.env.config_dict)
-            self.env.dynamic.all_entities = get_entities(self.env.config_dict)
+            self._set_dynamic_types()
             
             # fast forward
             self._agent_iter = self.env.agent_iter()
@@ -1,31 +1,68 @@
 import torch, numpy as np
 from torch import nn
+from torch.nn import functional as F
 
-class BasicNet(nn.Module):
-    def __init__(self, state_space, action_space):
+
+class MatrixNet(nn.Module):
+    """
+    Batched net for the Dict observations of obs_convertion.Matrix.
+    The item ids of the local view are one-hot encoded on the device and
+    go through a small conv net, the inventory and the selected item
+    through a linear layer. Every input is turned into a float32 tensor
+    once per batch.
+    """
+    def __init__(self, state_space, output_dim, hidden_sizes=[128, 64], softmax=False, device="cpu"):
         super().__init__()
-        size_inventory_obs = state_space["inventory"].n
+        map_space = state_space["map"]
+        self.num_item_types = int(np.max(map_space.high)) + 1
+        local_view_size = map_space.shape[0]
+        size_inventory_obs = state_space["inventory"].shape[0]
+
         self.conv_module = nn.Sequential(
-            nn.Conv2d(1, 3, [2, 2]),
-            nn.BatchNorm2d(3),
-            nn.ReLU(),
+            nn.Conv2d(self.num_item_types, 16, 3, padding=1), nn.ReLU(inplace=True),
+            nn.Conv2d(16, 16, 3, padding=1), nn.ReLU(inplace=True),
             nn.Flatten(1, -1)
         )
-        self.inventory_select_module = nn.Linear(in_features=size_inventory_obs + 1, out_features=32)
-        self.combined_module = nn.Sequential(
-            nn.LazyLinear(out_features=64), nn.ReLU(inplace=True),
-            nn.LazyLinear(out_features=32), nn.ReLU(inplace=True),
-            nn.LazyLinear(out_features=action_space.n)
+        self.inventory_select_module = nn.Sequential(
+            nn.Linear(size_inventory_obs + self.num_item_types, 32), nn.ReLU(inplace=True)
         )
+        layers = []
+        in_features = 16 * local_view_size ** 2 + 32
+        for hidden_size in hidden_sizes:
+            layers += [nn.Linear(in_features, hidden_size), nn.ReLU(inplace=True)]
+            in_features = hidden_size
+        layers.append(nn.Linear(in_features, output_dim))
+        self.combined_module = nn.Sequential(*layers)
 
-    def forward(self, obs, state=None, info={}):
-        map = obs["map"]
-        inventory_selected_item = np.concatenate((obs["inventory"], obs["selected_item"]))
-        map = torch.tensor(map, dtype=float)
-        inventory_selected_item = torch.tensor(inventory_selected_item, dtype=float)
+        self.output_dim = output_dim
+        self.softmax = softmax
+        self.device = device
+        self.to(device)
 
-        map_processed = self.conv_module(map)
-        inventory_processed = self.inventory_select_module(inventory_selected_item)
+    def _logits(self, obs):
+        map_ids = torch.as_tensor(obs["map"], device=self.device).long()
+        maps = F.one_hot(map_ids, self.num_item_types).permute(0, 3, 1, 2).float()
+        inventory = torch.as_tensor(obs["inventory"], device=self.device, dtype=torch.float32)
+        selected_item = torch.as_tensor(obs["selected_item"], device=self.device).long().view(-1)
+        selected_item = F.one_hot(selected_item, self.num_item_types).float()
 
-        logits = self.combined_module(torch.concat((map_processed, inventory_processed)))
+        map_processed = self.conv_module(maps)
+        inventory_processed = self.inventory_select_module(torch.cat((inventory, selected_item), dim=1))
+        return self.combined_module(torch.cat((map_processed, inventory_processed), dim=1))
+
+    def forward(self, obs, state=None, info={}):
+        logits = self._logits(obs)
+        if self.softmax:
+            logits = F.softmax(logits, dim=-1)
         return logits, state
+
+
+class MatrixCriticNet(MatrixNet):
+    """
+    Value net for the Dict observations of obs_convertion.Matrix.
+    """
+    def __init__(self, state_space, hidden_sizes=[128, 64], device="cpu"):
+        super().__init__(state_space, 1, hidden_sizes=hidden_sizes, device=device)
+
+    def forward(self, obs, state=None, info={}):
+        return self._logits(obs)
@@ -2,10 +2,16 @@ from .lidar_all import LidarAll
 from .only_facing import OnlyFacingObs
 from .only_hinted import NovelOnlyObs
 from .matrix import Matrix
+from .local_map import LocalMap
+from .distance_field import DistanceField
+from .path_distance import PathDistance
 
 __all__ = [
     "LidarAll",
     "OnlyFacingObs",
     "NovelOnlyObs",
-    "Matrix"
+    "Matrix",
+    "LocalMap",
+    "DistanceField",
+    "PathDistance"
 ]
@@ -8,8 +8,16 @@ from abc import (
 )
 
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
+from utils.perf_utils import NULL_PERF_RECORDER
 
 class ObservationGenerator(ABC):
+    # per-stage timers, set by the env wrapper when enabled
+    perf = NULL_PERF_RECORDER
+    # whether generate_observations of one generator can encode the states
+    # of other envs with the same item encoding, i.e. it keeps no state
+    # between calls other than the item encoder
+    batch_across_envs = True
+
     def __init__(self, *args, **kwargs):
         self.action_set: List[str] = []
         self.novel_action_set: List[str] = []
@@ -24,6 +32,14 @@ class ObservationGenerator(ABC):
     @abstractmethod
     def generate_observation(self, json_input: dict) -> np.ndarray:
         return [0]
+
+    def generate_observations(self, states: List[dict]) -> np.ndarray:
+        """
+        Generates the observations of many states at once, e.g. of all the
+        envs stepped in one process. Stacks generate_observation by default,
+        generators that can do better override it.
+        """
+        return np.stack([self.generate_observation(state) for state in states])
     
     @abstractmethod
     def check_if_effects_met(self, new_state_json: dict) -> bool:
@@ -0,0 +1,145 @@
+# Beam geometry shared by the LiDAR observation generators.
+#
+# The cells reached by the beams only depend on the facing of the player,
+# the number of beams and their range, so the trigonometry and the rounding
+# are done once per (facing, num_beams, max_beam_range) and cached. Casting
+# the beams is then a gather over a batch of maps.
+#
+# The beams are marched a few ranges at a time, and the march ends once every
+# beam has left its map, or with occlusion hit a blocking cell (e.g. a wall).
+#
+from functools import lru_cache
+from typing import Iterable, Mapping
+
+import numpy as np
+
+# number of ranges cast per step of the march in cast_beams
+MARCH_CHUNK = 16
+
+DIRECTION_RADIAN = {'north': np.pi, 'south': 0, 'west': 3 * np.pi / 2, 'east': np.pi / 2}
+
+
+def _ray_offsets(angles: np.ndarray, max_beam_range: int) -> np.ndarray:
+    ratios = np.stack((np.round(np.cos(angles), 2), np.round(np.sin(angles), 2)), axis=-1)
+    beam_ranges = np.arange(1, max_beam_range + 1)
+    offsets = np.round(beam_ranges[None, :, None] * ratios[:, None, :]).astype(int)
+    offsets.flags.writeable = False
+    return offsets
+
+
+@lru_cache(maxsize=None)
+def beam_offsets(facing: str, num_beams: int, max_beam_range: int) -> np.ndarray:
+    """
+    Offsets (relative to the player) of the cells reached by each of the
+    num_beams beams spread over 360 degrees, at each range.
+    Returns a read-only (num_beams, max_beam_range, 2) int array.
+    """
+    # Shoot beams in 360 degrees in front of agent
+    angles_list = np.linspace(DIRECTION_RADIAN[facing] - np.pi,
+                              DIRECTION_RADIAN[facing] + np.pi,
+                              num_beams + 1)[:-1]  # 0 and 360 degree is same, so removing 360
+    return _ray_offsets(angles_list, max_beam_range)
+
+
+@lru_cache(maxsize=None)
+def facing_beam_offsets(facing: str, max_beam_range: int) -> np.ndarray:
+    """
+    Offsets of the cells reached by a single beam in the facing direction.
+    Returns a read-only (1, max_beam_range, 2) int array.
+    """
+    return _ray_offsets(np.array([DIRECTION_RADIAN[facing]]), max_beam_range)
+
+
+def item_lookup_table(items_id: Mapping[int, int], size: int) -> np.ndarray:
+    """
+    item id -> item channel table for the items in items_id, -1 for air
+    and for the items not in items_id.
+    """
+    table = np.full(size, -1, dtype=int)
+    for item_id, item_idx in items_id.items():
+        if item_id != 0:
+            table[int(item_id)] = item_idx
+    return table
+
+
+def item_mask_table(item_ids: Iterable[int], size: int) -> np.ndarray:
+    """
+    item id -> bool table, True for the ids in item_ids.
+    """
+    table = np.zeros(size, dtype=bool)
+    table[[int(item_id) for item_id in item_ids]] = True
+    return table
+
+
+def cast_beams(
+        player_pos: np.ndarray,
+        offsets: np.ndarray,
+        world_maps: np.ndarray,
+        map_shapes: np.ndarray,
+        item_table: np.ndarray,
+        num_items: int,
+        first_hit_only=False,
+        block_table: np.ndarray = None,
+        march_chunk: int = MARCH_CHUNK
+    ) -> np.ndarray:
+    """
+    Casts the beams given by offsets (K, num_beams, max_beam_range, 2)
+    from the players at player_pos (K, 2) over the maps (K, H, W), each of
+    its own shape map_shapes (K, 2). A beam stops when it leaves its map.
+
+    Returns the (K, num_items, num_beams) distances of the first hit of each
+    item channel of item_table by each beam, 0 when not hit. With
+    first_hit_only, a beam also stops at the first item it hits. With
+    block_table (item id -> bool), a beam also stops at the first blocking
+    cell, which is still seen.
+
+    The beams are marched march_chunk ranges at a time, and the march ends
+    as soon as every beam has stopped, so its cost follows the distance to
+    the nearest walls rather than max_beam_range.
+    """
+    num_states, num_beams, max_beam_range, _ = offsets.shape
+    state_idx = np.arange(num_states)[:, None, None]
+    # beams that reached the end of the previous chunk without stopping
+    alive = np.ones((num_states, num_beams), dtype=bool)
+    chunks = []
+    for chunk_start in range(0, max_beam_range, march_chunk):
+        coords = player_pos[:, None, None, :] + offsets[:, :, chunk_start:chunk_start + march_chunk]
+
+        # prevent shooting out of the map. once a beam is out, it stays out
+        in_map = np.all((coords >= 0) & (coords < map_shapes[:, None, None, :]), axis=-1)
+        in_map[..., 0] &= alive
+        in_map = np.logical_and.accumulate(in_map, axis=2)
+        coords = np.where(in_map[..., None], coords, 0)
+
+        hit_ids = world_maps[state_idx, coords[..., 0], coords[..., 1]]
+        hit_items = item_table[hit_ids]
+        # the cells behind the first blocking cell (or the first hit) are not seen
+        stops = None
+        if block_table is not None:
+            stops = block_table[hit_ids] & in_map
+        if first_hit_only:
+            is_hit = (hit_items >= 0) & in_map
+            stops = is_hit if stops is None else stops | is_hit
+        if stops is not None:
+            stopped = np.logical_or.accumulate(stops, axis=2)
+            in_map[..., 1:] &= ~stopped[..., :-1]
+            alive = in_map[..., -1] & ~stopped[..., -1]
+        else:
+            alive = in_map[..., -1]
+        hit_items[~in_map] = -1
+        chunks.append(hit_items)
+        if not alive.any():
+            break
+    hit_items = chunks[0] if len(chunks) == 1 else np.concatenate(chunks, axis=2)
+
+    # keep the closest hit of each item by each beam. np.nonzero lists the
+    # ranges of a beam in increasing order, so the first occurrence of each
+    # (state, item, beam) is the closest one
+    signals = np.zeros((num_states, num_items, num_beams), dtype=int)
+    hit_state, hit_beam, hit_range = np.nonzero(hit_items >= 0)
+    hit_slot = np.ravel_multi_index(
+        (hit_state, hit_items[hit_state, hit_beam, hit_range], hit_beam), signals.shape
+    )
+    hit_slot, first = np.unique(hit_slot, return_index=True)
+    signals.ravel()[hit_slot] = hit_range[first] + 1
+    return signals
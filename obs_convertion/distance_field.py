@@ -0,0 +1,220 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+from gymnasium import spaces
+
+from .lidar_all import LidarAll, MAX_BEAM_RANGE
+
+# distance of the cells that are not reached, and of the cells around the map
+UNREACHED=1 << 20
+
+# unit vectors of the facing directions. the map is indexed [x, y],
+# south is +x and east is +y.
+FACING_VECTORS = {
+    'north': np.array([-1, 0]),
+    'south': np.array([1, 0]),
+    'east': np.array([0, 1]),
+    'west': np.array([0, -1]),
+}
+
+
+def _min_plus_1d(field: np.ndarray, axis: int) -> np.ndarray:
+    """
+    1D city block distance transform of field along axis:
+    out[i] = min_j(field[j] + |i - j|), in two cumulative passes.
+    """
+    shape = [1] * field.ndim
+    shape[axis] = field.shape[axis]
+    idx = np.arange(field.shape[axis]).reshape(shape)
+    forward = np.minimum.accumulate(field - idx, axis=axis) + idx
+    backward = np.flip(np.minimum.accumulate(np.flip(forward + idx, axis=axis), axis=axis), axis=axis) - idx
+    return backward
+
+
+def city_block_distance(sources: np.ndarray) -> np.ndarray:
+    """
+    Distance of every cell to the nearest source cell, for a (..., H, W)
+    bool array of sources. The city block distance is separable, so it is
+    the 1D transform along the rows followed by the one along the columns.
+    Cells without any source are UNREACHED.
+    """
+    field = np.where(sources, 0, UNREACHED)
+    field = _min_plus_1d(_min_plus_1d(field, -1), -2)
+    return np.minimum(field, UNREACHED)
+
+
+class _FieldCache:
+    """
+    Distance fields of one map, one per tracked item channel, bordered by
+    UNREACHED cells so that the neighbours of the player are always in it.
+    """
+    def __init__(self, world_map: np.ndarray, min_coord: np.ndarray, channel_map: np.ndarray, num_channels: int):
+        self.world_map = world_map
+        self.min_coord = min_coord
+        self.fields = np.full((num_channels, world_map.shape[0] + 2, world_map.shape[1] + 2), UNREACHED, dtype=int)
+        self.fields[:, 1:-1, 1:-1] = city_block_distance(
+            channel_map[None] == np.arange(num_channels)[:, None, None]
+        )
+
+
+class DistanceField(LidarAll):
+    """
+    Nearest object of each type observation.
+
+    Keeps a city block distance field per item type over the map, and
+    emits for each type the distance to its nearest object and the
+    direction to it relative to the player's facing (forward, right, each
+    in -1, 0, 1), followed by the inventory and the selected item.
+    Distances beyond max_distance, or of absent items, are 0.
+
+    The fields are only recomputed for the item types of the cells that
+    changed since the previous state (break, place, collect, moves), and
+    a new object only lowers its field around it.
+    """
+    # the caches follow the states of one env between calls
+    batch_across_envs = False
+
+    def __init__(self,
+                 json_input: dict,
+                 max_distance=MAX_BEAM_RANGE,
+                 *args,
+                 **kwargs
+        ) -> None:
+        super().__init__(json_input, *args, **kwargs)
+        self.max_distance = max_distance
+        # one cache per position in the batch, e.g. per env stepped in one process
+        self._field_caches: List[_FieldCache] = []
+        self.observation_space = DistanceField._build_observation_space(
+            self.max_item_type_count, len(self.items_lidar_disabled), max_distance
+        )
+
+
+    @staticmethod
+    def get_observation_space(
+            all_objects,
+            all_entities,
+            items_lidar_disabled=[],
+            max_distance=MAX_BEAM_RANGE,
+            reserved_extra_objects=2, # in case we have new objects in the world
+            item_encoder_config_path=None,
+            *args,
+            **kwargs
+        ):
+        max_item_type_count = LidarAll._get_max_item_type_count(
+            all_objects, all_entities, reserved_extra_objects, item_encoder_config_path
+        )
+        return DistanceField._build_observation_space(max_item_type_count, len(items_lidar_disabled), max_distance)
+
+
+    @staticmethod
+    def _build_observation_space(max_item_type_count, num_disabled, max_distance):
+        tracked_items_max_count = max_item_type_count - num_disabled
+        low = np.array(
+            [0] * tracked_items_max_count +       # distance
+            [-1] * (2 * tracked_items_max_count) + # forward, right
+            [0] * max_item_type_count +           # inventory
+            [0] * max_item_type_count             # selected item
+        )
+        high = np.array(
+            [max_distance] * tracked_items_max_count +
+            [1] * (2 * tracked_items_max_count) +
+            [40] * max_item_type_count +
+            [1] * max_item_type_count
+        )
+        return spaces.Box(low, high, dtype=int)
+
+
+    def generate_observation(self, json_input: dict) -> np.ndarray:
+        """
+        generates a numpy array representing the state from the json file.
+        takes in json['state']
+        """
+        return self.generate_observations([json_input])[0]
+
+
+    def generate_observations(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Batched version of generate_observation, see LidarAll.generate_observations.
+        The i-th state updates the fields cached for the i-th state of the
+        previous call.
+        """
+        num_tracked = len(self._beam_items())
+        nearest = np.zeros((len(states), 3, num_tracked), dtype=int)
+        for i, state_json in enumerate(states):
+            with self.perf.timer("map"):
+                world_map, min_coord, _ = self._generate_map(state_json)
+                world_map = world_map.astype(int)
+            with self.perf.timer("distance_field"):
+                fields = self._update_fields(i, world_map, min_coord)
+                player_pos = np.array(state_json['player']['pos']) - min_coord
+                nearest[i] = self._nearest_features(fields, player_pos, state_json['player']['facing'])
+        # inventory
+        inventory_result = self._generate_inventory_batch(states)
+        # selected item
+        selected_item_onehot = self._get_selected_item_onehot_batch(states)
+
+        return np.concatenate(
+            (nearest.reshape(len(states), -1), inventory_result, selected_item_onehot),
+            axis=1, dtype=int
+        )
+
+
+    def _update_fields(self, cache_idx: int, world_map: np.ndarray, min_coord: np.ndarray) -> np.ndarray:
+        """
+        Brings the cached fields of cache_idx up to date with world_map.
+        Returns the bordered (num_tracked, H + 2, W + 2) fields.
+        """
+        item_table = self._get_item_table(world_map)
+        num_tracked = len(self._beam_items())
+        cache = self._field_caches[cache_idx] if cache_idx < len(self._field_caches) else None
+        if cache is None or cache.world_map.shape != world_map.shape or np.any(cache.min_coord != min_coord):
+            # new map, or the map has grown
+            cache = _FieldCache(world_map, min_coord, item_table[world_map], num_tracked)
+            if cache_idx < len(self._field_caches):
+                self._field_caches[cache_idx] = cache
+            else:
+                self._field_caches.append(cache)
+            return cache.fields
+
+        changed_x, changed_y = np.nonzero(cache.world_map != world_map)
+        if len(changed_x) == 0:
+            return cache.fields
+        removed = item_table[cache.world_map[changed_x, changed_y]]
+        added = item_table[world_map[changed_x, changed_y]]
+        cache.world_map = world_map
+
+        interior = cache.fields[:, 1:-1, 1:-1]
+        # a removed object can be the nearest one of many cells, recompute its channels
+        recomputed = np.unique(removed[removed >= 0])
+        if len(recomputed) > 0:
+            interior[recomputed] = city_block_distance(item_table[world_map][None] == recomputed[:, None, None])
+        # an added object only lowers the distances around it
+        for channel in np.unique(added[added >= 0]):
+            if channel in recomputed:
+                continue
+            is_added = added == channel
+            xs = np.arange(world_map.shape[0])[:, None, None]
+            ys = np.arange(world_map.shape[1])[None, :, None]
+            added_dist = np.abs(xs - changed_x[is_added]) + np.abs(ys - changed_y[is_added])
+            np.minimum(interior[channel], added_dist.min(axis=-1), out=interior[channel])
+        return cache.fields
+
+
+    def _nearest_features(self, fields: np.ndarray, player_pos: np.ndarray, player_facing: str) -> np.ndarray:
+        """
+        Distance, forward and right direction of the nearest object of each
+        channel, from the player's cell and its 4 neighbours in the fields.
+        Returns a (3, num_tracked) array.
+        """
+        facing = FACING_VECTORS[player_facing]
+        right = np.array([facing[1], -facing[0]])
+        x, y = player_pos + 1 # fields are bordered
+        distance = fields[:, x, y]
+        forward = np.sign(fields[:, x - facing[0], y - facing[1]] - fields[:, x + facing[0], y + facing[1]])
+        rightward = np.sign(fields[:, x - right[0], y - right[1]] - fields[:, x + right[0], y + right[1]])
+
+        visible = distance <= self.max_distance
+        return np.stack((
+            np.where(visible, distance, 0),
+            np.where(visible, forward, 0),
+            np.where(visible, rightward, 0),
+        ))
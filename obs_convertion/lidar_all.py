@@ -1,18 +1,22 @@
 
 
 import json
-from typing import List, Tuple
+from typing import List, Mapping, Sequence, Tuple
 import numpy as np
 from gymnasium import spaces
 
 from utils.env_reward_rapidlearn import RapidLearnRewardGenerator, scan_tokens
 from utils.env_condition_set import ConditionSet
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
+from utils.inventory_encoder import InventoryEncoder
+from utils.failed_action import FailedAction
 from .base import ObservationGenerator
+from .beam_geometry import beam_offsets, cast_beams, item_lookup_table, item_mask_table
 
 NUM_BEAMS=8
 MAX_BEAM_RANGE=40
-
+# items stopping the beams in occlusion mode
+BLOCKING_ITEMS=("wall", "bedrock")
 
 ###################################
 # Important!
@@ -36,11 +40,15 @@ class LidarAll(ObservationGenerator):
                  max_beam_range=40,
                  num_reserved_extra_objects=2,
                  item_encoder_config_path=None,
+                 occlusion=False,
+                 blocking_items=BLOCKING_ITEMS,
                  *args, 
                  **kwargs
         ) -> None:
         """
         The Env is instanciated using the first json input.
+        With occlusion, the beams stop at the first of the blocking_items
+        they hit instead of going through everything.
         """
         # encoder for automatically encoding new objects
         self.max_item_type_count, self.item_encoder = self._encode_items(
@@ -52,11 +60,14 @@ class LidarAll(ObservationGenerator):
         # rep of beams
         self.num_beams = num_beams
         self.max_beam_range = max_beam_range
+        self.occlusion = occlusion
+        self.blocking_items = list(blocking_items)
 
         # things to search for in lidar. only excludes disabled items
         self.items_lidar_disabled = items_lidar_disabled
         self.items_lidar = list(filter(lambda item: item not in self.items_lidar_disabled, self.item_encoder.item_list.keys()))
         self.items_id_lidar = {self.item_encoder.get_id(keys): lidar_item_idx for lidar_item_idx, keys in enumerate(self.items_lidar)}
+        self.inventory_encoder = InventoryEncoder(self.item_encoder)
 
         # maximum of number of possible items
         lidar_items_max_count = self.max_item_type_count - len(self.items_lidar_disabled)
@@ -78,15 +89,16 @@ class LidarAll(ObservationGenerator):
         if 'domain' not in json_input:
             self.reward_generator = None
         else:
+            failed_action = FailedAction.parse(json_input['state']['action'])
             self.reward_generator = RapidLearnRewardGenerator(
                 pddl_domain=json_input['domain'],  # un-escape pddl string
                 initial_state=self.get_state_for_evaluation(json_input['state']),
-                failed_action_exp=json_input['state']['action'],
+                failed_action_exp=failed_action,
                 item_encoder=self.item_encoder,
                 plan=json_input.get('plan'),
                 RL_test=RL_test
             )
-            self.failed_action = json_input['state']['action'][1:-1].replace(" ", "_")
+            self.failed_action = failed_action.name
         self.novel_action_set = json_input['novelActions']
         self.action_set = json_input.get('actionSet') or list(self.reward_generator.actions.keys())
         # print("actions: ", self.action_set)
@@ -105,18 +117,9 @@ class LidarAll(ObservationGenerator):
             *args,
             **kwargs
         ):
-        # load and see if we already have the count
-        max_item_type_count = 0
-        if item_encoder_config_path is not None:
-            try:
-                with open(item_encoder_config_path, "r") as f:
-                    config = json.load(f)
-                    max_item_type_count = config["id_limit"]
-            except Exception as e:
-                pass
-        # +1 since obj encoder has one extra error margin for unknown objects
-        if max_item_type_count == 0:
-            max_item_type_count = len(all_objects) + len(all_entities) + reserved_extra_objects + 1
+        max_item_type_count = LidarAll._get_max_item_type_count(
+            all_objects, all_entities, reserved_extra_objects, item_encoder_config_path
+        )
         # things to search for in lidar. only excludes disabled items
 
         # maximum of number of possible items
@@ -137,6 +140,27 @@ class LidarAll(ObservationGenerator):
         return observation_space
 
     
+    @staticmethod
+    def _get_max_item_type_count(all_objects, all_entities, reserved_extra_objects, item_encoder_config_path=None) -> int:
+        """
+        Number of item types of the observation space, from the item encoder
+        config if there is one, otherwise from the objects in the world.
+        """
+        # load and see if we already have the count
+        max_item_type_count = 0
+        if item_encoder_config_path is not None:
+            try:
+                with open(item_encoder_config_path, "r") as f:
+                    config = json.load(f)
+                    max_item_type_count = config["id_limit"]
+            except Exception as e:
+                pass
+        # +1 since obj encoder has one extra error margin for unknown objects
+        if max_item_type_count == 0:
+            max_item_type_count = len(all_objects) + len(all_entities) + reserved_extra_objects + 1
+        return max_item_type_count
+
+    
     def init_info(self):
         """
         Returns the init info for the discover executor
@@ -161,7 +185,7 @@ class LidarAll(ObservationGenerator):
     
     def check_if_plannable_state_reached(self, new_state_json: dict) -> bool:
         state = self.get_state_for_evaluation(new_state_json)
-        return True
+        return self.reward_generator.plannable_state_met_checker(state)
 
 
     def generate_observation(self, json_input: dict) -> np.ndarray:
@@ -169,18 +193,32 @@ class LidarAll(ObservationGenerator):
         generates a numpy array representing the state from the json file.
         takes in json['state']
         """
-        state_json = json_input
+        return self.generate_observations([json_input])[0]
+
+
+    def generate_observations(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Batched version of generate_observation, for running many envs in
+        one process. The maps of the states are stacked into one padded
+        array, and the lidar, inventory and selected item are encoded
+        for the whole batch at once.
+        Returns a (len(states), obs_size) array.
+        """
+        num_states = len(states)
         # lidar beams
-        world_map, min_coord, max_coord = self._generate_map(state_json)
-        player_pos = np.array(state_json["player"]["pos"]) - min_coord
-        sensor_result = self._lidar_sensors(tuple(player_pos), state_json['player']['facing'], world_map).reshape(-1)
+        with self.perf.timer("map"):
+            world_maps, map_shapes, player_pos = self._generate_padded_maps(states)
+        with self.perf.timer("lidar"):
+            sensor_result = self._lidar_sensors_batch(
+                player_pos, [state_json['player']['facing'] for state_json in states],
+                world_maps, map_shapes
+            ).reshape(num_states, -1)
         # inventory
-        inventory_result = self._generate_inventory(state_json)
+        inventory_result = self._generate_inventory_batch(states)
         # selected item
-        selected_item_onehot = np.zeros(self.max_item_type_count, dtype=int)
-        selected_item_onehot[self._get_selected_item(state_json)] = 1
+        selected_item_onehot = self._get_selected_item_onehot_batch(states)
 
-        return np.concatenate((sensor_result, inventory_result, selected_item_onehot), dtype=int)
+        return np.concatenate((sensor_result, inventory_result, selected_item_onehot), axis=1, dtype=int)
 
 
     def _encode_items(self, json_data, num_extra_objects, item_encoder_config_path):
@@ -241,15 +279,37 @@ class LidarAll(ObservationGenerator):
         """
         Generates a numpy map from the json data. returns the map, min_coord, max_coord
         """
-        min_coord, max_coord = self._find_bounding_box(json_data['map'])
+        coords = np.array([key.split(",") for key in json_data['map'].keys()], dtype=int)
+        min_coord, max_coord = coords.min(axis=0), coords.max(axis=0)
         ng_map = -np.zeros((max_coord - min_coord + 1))
 
-        for key, item in json_data['map'].items():
-            curr_coord = np.array(key.split(",")).astype(int)
-            ng_map[tuple(curr_coord - min_coord)] = self.item_encoder.get_id(item)
+        item_ids = [self.item_encoder.get_id(item) for item in json_data['map'].values()]
+        ng_map[tuple((coords - min_coord).T)] = item_ids
         return ng_map, min_coord, max_coord
 
 
+    def _generate_padded_maps(self, states: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generates the maps of the states, zero padded to the largest map.
+        returns the (K, H, W) maps, the (K, 2) shape of each map and the
+        (K, 2) player positions relative to each map.
+        """
+        maps = []
+        map_shapes = np.zeros((len(states), 2), dtype=int)
+        player_pos = np.zeros((len(states), 2), dtype=int)
+        for i, state_json in enumerate(states):
+            world_map, min_coord, _ = self._generate_map(state_json)
+            maps.append(world_map)
+            map_shapes[i] = world_map.shape
+            player_pos[i] = np.array(state_json["player"]["pos"]) - min_coord
+
+        padded_shape = map_shapes.max(axis=0)
+        world_maps = np.zeros((len(states), *padded_shape), dtype=int)
+        for i, world_map in enumerate(maps):
+            world_maps[i, :world_map.shape[0], :world_map.shape[1]] = world_map
+        return world_maps, map_shapes, player_pos
+
+
     #################################################################
     # Util generate a lidar reading
     #################################################################
@@ -257,36 +317,76 @@ class LidarAll(ObservationGenerator):
         '''
         Send 8 beams of 45 degrees each from 0 to 360 degrees
         Return the euclidean distances of the objects that strike the LiDAR.
-        Assume that the occlusions dont hold true.
+        Occlusions only hold true in occlusion mode.
         '''
+        return self._lidar_sensors_batch(
+            np.array([player_pos], dtype=int),
+            [player_facing],
+            world_map[None].astype(int),
+            np.array([world_map.shape], dtype=int)
+        )[0]
+
+
+    def _beam_items(self) -> Mapping[int, int]:
+        """
+        item id -> lidar channel of the items detected by the beams.
+        """
+        return self.items_id_lidar
+
+
+    def _get_item_table(self, world_maps: np.ndarray) -> np.ndarray:
+        """
+        Lookup table of _beam_items, large enough for the ids in world_maps.
+        """
+        max_id = int(world_maps.max(initial=0))
+        table = getattr(self, "_item_table", None)
+        if table is None or max_id >= len(table):
+            table = item_lookup_table(self._beam_items(), max(max_id, self.max_item_type_count) + 1)
+            self._item_table = table
+        return table
 
-        direction_radian = {'north': np.pi, 'south': 0, 'west': 3 * np.pi / 2, 'east': np.pi / 2}
-
-        # Shoot beams in 360 degrees in front of agent
-        angles_list = np.linspace(direction_radian[player_facing] - np.pi,
-                                  direction_radian[player_facing] + np.pi,
-                                  self.num_beams + 1)[:-1]  # 0 and 360 degree is same, so removing 360
-
-        lidar_signals = np.zeros((len(self.items_id_lidar), len(angles_list)), dtype=int)
-        x, y = player_pos
-        for angle_idx, angle in enumerate(angles_list):
-            x_ratio, y_ratio = np.round(np.cos(angle), 2), np.round((np.sin(angle)), 2)
-
-            # Keep sending longer beams until hit an object or wall
-            for beam_range in range(1, self.max_beam_range + 1):
-                x_obj = x + np.round(beam_range * x_ratio)
-                y_obj = y + np.round(beam_range * y_ratio)
-                if x_obj >= world_map.shape[0] or y_obj >= world_map.shape[1] or x_obj < 0 or y_obj < 0:
-                    # prevent shooting out of the map
-                    break
-                obj_id_rc = world_map[int(x_obj), int(y_obj)]
-
-                if obj_id_rc != 0 and obj_id_rc in self.items_id_lidar:
-                    index = self.items_id_lidar[obj_id_rc]
-                    if lidar_signals[index, angle_idx] == 0:
-                        lidar_signals[index, angle_idx] = beam_range
-                    # break # dont break because we want the objects even if we have occlusions.
-        return lidar_signals
+
+    def _get_block_table(self, world_maps: np.ndarray) -> np.ndarray:
+        """
+        item id -> bool table of the blocking items, or None without occlusion.
+        """
+        if not self.occlusion:
+            return None
+        max_id = int(world_maps.max(initial=0))
+        table = getattr(self, "_block_table", None)
+        if table is None or max_id >= len(table):
+            blocking_ids = [
+                self.item_encoder.item_list[item] for item in self.blocking_items
+                if item in self.item_encoder.item_list
+            ]
+            table = item_mask_table(blocking_ids, max(max_id, self.max_item_type_count) + 1)
+            self._block_table = table
+        return table
+
+
+    def _lidar_sensors_batch(
+            self,
+            player_pos: np.ndarray,
+            player_facing: Sequence[str],
+            world_maps: np.ndarray,
+            map_shapes: np.ndarray
+        ) -> np.ndarray:
+        '''
+        Batched lidar over K maps. Each beam keeps the distance of the
+        first hit of each item until it leaves its own map, or until it
+        hits a blocking item in occlusion mode.
+        player_pos: (K, 2), world_maps: (K, H, W), map_shapes: (K, 2)
+        Returns a (K, num_lidar_items, num_beams) array.
+        '''
+        offsets = np.stack([
+            beam_offsets(facing, self.num_beams, self.max_beam_range)
+            for facing in player_facing
+        ])
+        return cast_beams(
+            player_pos, offsets, world_maps, map_shapes,
+            self._get_item_table(world_maps), len(self._beam_items()),
+            block_table=self._get_block_table(world_maps)
+        )
     
 
     # def conical_lidar_sensors(self):
@@ -308,18 +408,33 @@ class LidarAll(ObservationGenerator):
         return self.item_encoder.get_id(selected_item)
 
 
-    def _generate_inventory(self, input: dict) -> np.ndarray:
+    def _generate_inventory(self, input: dict, out: np.ndarray = None) -> np.ndarray:
         """
         Generates the inventory part of the state representation.
+        Written into out if given, which is expected to be zeroed.
         """
-        inventory = input['inventory']['slots']
-        # minus 1 to exclude air in the inventory. (0 = air for our encoder)
-        inventory_quantity_arr = np.zeros(self.max_item_type_count, dtype=int)
+        if out is None:
+            out = np.zeros(self.max_item_type_count, dtype=int)
+        return self.inventory_encoder.encode(input['inventory'], out)
+    
+
+    def _generate_inventory_batch(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Generates the (K, max_item_type_count) inventories of K states.
+        """
+        inventory_result = np.zeros((len(states), self.max_item_type_count), dtype=int)
+        for i, state_json in enumerate(states):
+            self._generate_inventory(state_json, out=inventory_result[i])
+        return inventory_result
 
-        for slot in inventory:
-            item_id = self.item_encoder.get_id(slot['item'])
-            inventory_quantity_arr[item_id] += slot['count']
-        return inventory_quantity_arr
+
+    def _get_selected_item_onehot_batch(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Generates the (K, max_item_type_count) one-hot selected items of K states.
+        """
+        selected_item_onehot = np.zeros((len(states), self.max_item_type_count), dtype=int)
+        selected_item_onehot[np.arange(len(states)), [self._get_selected_item(state_json) for state_json in states]] = 1
+        return selected_item_onehot
     
 
     #################################################################
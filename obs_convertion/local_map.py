@@ -0,0 +1,146 @@
+from functools import lru_cache
+from typing import Sequence
+import numpy as np
+from gymnasium import spaces
+
+from .lidar_all import LidarAll
+
+LOCAL_MAP_RADIUS=4
+OUT_OF_MAP_ITEM="bedrock"
+
+# number of counter-clockwise quarter turns bringing the facing direction
+# to the top of the crop. the map is indexed [x, y], south is +x and east is +y.
+FACING_ROTATIONS = {'north': 0, 'east': 1, 'south': 2, 'west': 3}
+
+
+@lru_cache(maxsize=None)
+def _crop_offsets(facing: str, radius: int) -> np.ndarray:
+    """
+    Offsets (relative to the player) of the cells of the egocentric crop,
+    as a read-only (2r+1, 2r+1, 2) int array. Rotating the offsets instead
+    of the crop lets the rotated crop be gathered in one indexing operation.
+    """
+    span = np.arange(-radius, radius + 1)
+    offsets = np.stack(np.meshgrid(span, span, indexing="ij"), axis=-1)
+    offsets = np.rot90(offsets, k=FACING_ROTATIONS[facing], axes=(0, 1)).copy()
+    offsets.flags.writeable = False
+    return offsets
+
+
+class LocalMap(LidarAll):
+    """
+    Egocentric local map observation.
+
+    The (2r+1, 2r+1) crop of the map around the player, rotated so that the
+    player faces the top of the crop, followed by the inventory and the
+    selected item. The cells hold the item ids, or one-hot item vectors
+    when one_hot is set. Cells outside of the map are seen as bedrock,
+    or as air if the encoder does not know bedrock.
+    """
+    def __init__(self,
+                 json_input: dict,
+                 radius=LOCAL_MAP_RADIUS,
+                 one_hot=False,
+                 *args,
+                 **kwargs
+        ) -> None:
+        super().__init__(json_input, *args, **kwargs)
+        self.radius = radius
+        self.one_hot = one_hot
+        self.out_of_map_id = self.item_encoder.item_list.get(OUT_OF_MAP_ITEM, 0)
+        self._item_onehot = np.eye(self.max_item_type_count, dtype=int)
+        self.observation_space = LocalMap._build_observation_space(self.max_item_type_count, radius, one_hot)
+
+
+    @staticmethod
+    def get_observation_space(
+            all_objects,
+            all_entities,
+            items_lidar_disabled=[],
+            radius=LOCAL_MAP_RADIUS,
+            one_hot=False,
+            reserved_extra_objects=2, # in case we have new objects in the world
+            item_encoder_config_path=None,
+            *args,
+            **kwargs
+        ):
+        max_item_type_count = LidarAll._get_max_item_type_count(
+            all_objects, all_entities, reserved_extra_objects, item_encoder_config_path
+        )
+        return LocalMap._build_observation_space(max_item_type_count, radius, one_hot)
+
+
+    @staticmethod
+    def _build_observation_space(max_item_type_count, radius, one_hot):
+        num_cells = (2 * radius + 1) ** 2
+        if one_hot:
+            map_low, map_high = [0] * (num_cells * max_item_type_count), [1] * (num_cells * max_item_type_count)
+        else:
+            map_low, map_high = [0] * num_cells, [max_item_type_count - 1] * num_cells
+        low = np.array(
+            map_low +
+            [0] * max_item_type_count + # inventory
+            [0] * max_item_type_count   # selected item
+        )
+        high = np.array(
+            map_high +
+            [40] * max_item_type_count + # inventory
+            [1] * max_item_type_count    # selected item
+        )
+        return spaces.Box(low, high, dtype=int)
+
+
+    def generate_observation(self, json_input: dict) -> np.ndarray:
+        """
+        generates a numpy array representing the state from the json file.
+        takes in json['state']
+        """
+        return self.generate_observations([json_input])[0]
+
+
+    def generate_observations(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Batched version of generate_observation, see LidarAll.generate_observations
+        """
+        num_states = len(states)
+        with self.perf.timer("map"):
+            world_maps, map_shapes, player_pos = self._generate_padded_maps(states)
+        with self.perf.timer("local_map"):
+            local_maps = self._local_maps_batch(
+                player_pos, [state_json['player']['facing'] for state_json in states],
+                world_maps, map_shapes
+            )
+            if self.one_hot:
+                local_maps = self._item_onehot[local_maps]
+        # inventory
+        inventory_result = self._generate_inventory_batch(states)
+        # selected item
+        selected_item_onehot = self._get_selected_item_onehot_batch(states)
+
+        return np.concatenate(
+            (local_maps.reshape(num_states, -1), inventory_result, selected_item_onehot),
+            axis=1, dtype=int
+        )
+
+
+    def _local_maps_batch(
+            self,
+            player_pos: np.ndarray,
+            player_facing: Sequence[str],
+            world_maps: np.ndarray,
+            map_shapes: np.ndarray
+        ) -> np.ndarray:
+        """
+        Gathers the egocentric crops of K maps.
+        player_pos: (K, 2), world_maps: (K, H, W), map_shapes: (K, 2)
+        Returns a (K, 2r+1, 2r+1) array of item ids.
+        """
+        num_states = len(player_facing)
+        offsets = np.stack([_crop_offsets(facing, self.radius) for facing in player_facing])
+        coords = player_pos[:, None, None, :] + offsets # (K, 2r+1, 2r+1, 2)
+
+        in_map = np.all((coords >= 0) & (coords < map_shapes[:, None, None, :]), axis=-1)
+        coords = np.where(in_map[..., None], coords, 0)
+        local_maps = world_maps[np.arange(num_states)[:, None, None], coords[..., 0], coords[..., 1]]
+        local_maps[~in_map] = self.out_of_map_id
+        return local_maps
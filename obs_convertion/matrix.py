@@ -1,13 +1,23 @@
-from typing import Tuple
 import numpy as np
 from gymnasium import spaces
 
 from utils.env_reward_rapidlearn import RapidLearnRewardGenerator
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
+from utils.inventory_encoder import InventoryEncoder
+from utils.failed_action import FailedAction
+from .base import ObservationGenerator
 from .lidar_all import LidarAll
 
 LOCAL_VIEW_SIZE=5
 TARGET_OBJ="bedrock"
+MAX_INVENTORY_COUNT=40
+
+
+def local_view_dtype(max_item_type_count: int):
+    """
+    Smallest dtype holding the item ids of the local view.
+    """
+    return np.uint8 if max_item_type_count <= np.iinfo(np.uint8).max + 1 else np.uint16
 
 
 class Matrix(LidarAll):
@@ -18,6 +28,7 @@ class Matrix(LidarAll):
                  RL_test=False,
                  local_view_size=LOCAL_VIEW_SIZE,
                  num_reserved_extra_objects=1,
+                 item_encoder_config_path=None,
                  *args,
                  **kwargs
         ) -> None:
@@ -25,37 +36,40 @@ class Matrix(LidarAll):
         The Env is instantiated using the first json input.
         """
         # Encoder for automatically encoding new objects
-        self.max_item_type_count, self.item_encoder = self._encode_items(json_input['state'], num_reserved_extra_objects)
+        self.max_item_type_count, self.item_encoder = self._encode_items(
+            json_input['state'],
+            num_reserved_extra_objects,
+            item_encoder_config_path
+        )
 
         # things to search for. only excludes disabled items
         self.items_disabled = items_lidar_disabled
         self.items = list(filter(lambda item: item not in self.items_disabled, self.item_encoder.item_list.keys()))
         self.items_id = {self.item_encoder.get_id(keys): lidar_item_idx for lidar_item_idx, keys in enumerate(self.items)}
+        self.inventory_encoder = InventoryEncoder(self.item_encoder)
 
         # Representation of the agent's local view
         self.local_view_size = local_view_size  # Size of the local view grid (5x5)
-        self.local_view = np.zeros((self.local_view_size, self.local_view_size))
-
-        # Limits for the local view (assume maximum values for now)
-        low = np.array([0] * (self.local_view_size ** 2))
-        high = np.array([self.max_item_type_count] * (self.local_view_size ** 2))
+        self.map_dtype = local_view_dtype(self.max_item_type_count)
+        self._padded_map = None
 
         # Observation space
-        self.observation_space = spaces.Box(low, high, dtype=int)
+        self.observation_space = Matrix._build_observation_space(self.max_item_type_count, self.local_view_size)
 
         # Reward generator (if applicable)
         if 'domain' not in json_input:
             self.reward_generator = None
         else:
+            failed_action = FailedAction.parse(json_input['state']['action'])
             self.reward_generator = RapidLearnRewardGenerator(
                 pddl_domain=json_input['domain'],  # Un-escape PDDL string
                 initial_state=self.get_state_for_evaluation(json_input['state']),
-                failed_action_exp=json_input['state']['action'],
+                failed_action_exp=failed_action,
                 item_encoder=self.item_encoder,
                 plan=json_input.get('plan'),
                 RL_test=RL_test  # You may need to adjust this depending on your usage
             )
-            self.failed_action = json_input['state']['action'][1:-1].replace(" ", "_")
+            self.failed_action = failed_action.name
         
         self.novel_action_set = json_input['novelActions']
         self.action_set = json_input.get('actionSet') or list(self.reward_generator.actions.keys())
@@ -68,26 +82,24 @@ class Matrix(LidarAll):
             items_lidar_disabled=[],
             local_view_size=LOCAL_VIEW_SIZE,
             reserved_extra_objects=1, # in case we have new objects in the world
+            item_encoder_config_path=None,
             *args,
             **kwargs
         ):
-        # +1 since obj encoder has one extra error margin for unknown objects
-        max_item_type_count = len(all_objects) + len(all_entities) + reserved_extra_objects + 1
-        # things to search for in lidar. only excludes disabled items
-
-        # maximum of number of possible items
-        map_items_max_count = max_item_type_count - len(items_lidar_disabled)
-
-        # Calculate the total number of cells in the local view
-        num_cells = local_view_size ** 2
+        max_item_type_count = LidarAll._get_max_item_type_count(
+            all_objects, all_entities, reserved_extra_objects, item_encoder_config_path
+        )
+        return Matrix._build_observation_space(max_item_type_count, local_view_size)
 
-        # Define the observation space for each cell
-        low_map = np.zeros((num_cells, num_cells, max_item_type_count))
-        high_map = np.ones((num_cells, num_cells, max_item_type_count)) * map_items_max_count
-        map_obs_space = spaces.Box(low_map, high_map, dtype=int)
 
-        inventory_obs_space = spaces.Box(np.zeros(max_item_type_count), np.ones(max_item_type_count) * 40)
-        selected_item_obs_space = spaces.Box([0], [max_item_type_count])
+    @staticmethod
+    def _build_observation_space(max_item_type_count, local_view_size=LOCAL_VIEW_SIZE):
+        # the map holds the item id of each cell of the local view.
+        # it is one-hot encoded by the network.
+        map_dtype = local_view_dtype(max_item_type_count)
+        map_obs_space = spaces.Box(0, max_item_type_count - 1, (local_view_size, local_view_size), dtype=map_dtype)
+        inventory_obs_space = spaces.Box(0, MAX_INVENTORY_COUNT, (max_item_type_count,), dtype=np.int16)
+        selected_item_obs_space = spaces.Box(0, max_item_type_count - 1, (1,), dtype=map_dtype)
 
         observation_space = spaces.Dict({
             "map": map_obs_space,
@@ -105,12 +117,14 @@ class Matrix(LidarAll):
         state_json = json_input
 
         # Calculate the 5x5 local view matrix
-        world_map, min_coord, _ = self._generate_map(state_json)
+        with self.perf.timer("map"):
+            world_map, min_coord, _ = self._generate_map(state_json)
         player_pos = np.array(state_json["player"]["pos"]) - min_coord
-        local_view = self._generate_local_view(player_pos, world_map)
+        with self.perf.timer("local_view"):
+            local_view = self._generate_local_view(player_pos, world_map)
 
         # inventory
-        inventory_result = self._generate_inventory(state_json)
+        inventory_result = self._generate_inventory(state_json).astype(np.int16)
 
         # selected item
         selected_item = self._get_selected_item(state_json)
@@ -119,60 +133,33 @@ class Matrix(LidarAll):
         observation = {
             "map": local_view, 
             "inventory": inventory_result, 
-            "selected_item": [selected_item]
+            "selected_item": np.array([selected_item], dtype=local_view.dtype)
         }
         return observation
 
-    #################################################################
-    # Util to generate a map
-    #################################################################
-    def _find_bounding_box(self, map) -> Tuple[np.ndarray, np.ndarray]:
-        """
-        Auxiliary function to find max and min coord when the function is first run.
-        input: json['map']
-        returns: tuple of coordinates denoting the min and max for each coord component
-        """
-        coords_ND = np.array([coord.split(",") for coord in map.keys()], dtype=np.float64) # list of all coordinates
-        min_coord_D = coords_ND.min(axis=0).astype('int')
-        max_coord_D = coords_ND.max(axis=0).astype('int')
-        return min_coord_D, max_coord_D
-
-
-    def _generate_map(self, json_data) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-        """
-        Generates a numpy map from the json data. returns the map, min_coord, max_coord
-        """
-        min_coord, max_coord = self._find_bounding_box(json_data['map'])
-        ng_map = -np.zeros((max_coord - min_coord + 1))
-
-        for key, item in json_data['map'].items():
-            curr_coord = np.array(key.split(",")).astype(int)
-            ng_map[tuple(curr_coord - min_coord)] = self.item_encoder.get_id(item)
-
-        return ng_map, min_coord, max_coord
-
+    # the lidar of LidarAll.generate_observations does not apply to the matrix
+    generate_observations = ObservationGenerator.generate_observations
 
     #################################################################
     # Util to generate a local view
     #################################################################
     def _generate_local_view(self, player_pos, world_map):
         """
-        Generates a local view matrix based on the player's position and the world map.
+        Generates the (local_view_size, local_view_size) local view around
+        the player, holding the item id of each cell. Cells outside of the map
+        use the last id.
         """
         half_local_view = self.local_view_size // 2
-        local_view = np.zeros((self.local_view_size, self.local_view_size, self.max_item_type_count))  # Add an extra dimension for channels
-
-        for i in range(self.local_view_size):
-            for j in range(self.local_view_size):
-                row = player_pos[1] - half_local_view + i
-                col = player_pos[0] - half_local_view + j
-
-                if 0 <= col < world_map.shape[0] and 0 <= row < world_map.shape[1]:
-                    # One-hot encode the value from the world map
-                    value = int(world_map[row, col])
-                    local_view[i, j, value] = 1
-                else:
-                    # Use a channel for the target_obj_encoded value
-                    local_view[i, j, self.max_item_type_count - 1] = 1
-
-        return local_view
+        padded_shape = (world_map.shape[0] + 2 * half_local_view, world_map.shape[1] + 2 * half_local_view)
+
+        # the padded map is reused between steps. only its inside is
+        # overwritten, so the padding keeps the out of map id.
+        padded_map = self._padded_map
+        if padded_map is None or padded_map.shape != padded_shape:
+            padded_map = np.full(padded_shape, self.max_item_type_count - 1, dtype=self.map_dtype)
+            self._padded_map = padded_map
+        padded_map[half_local_view:padded_shape[0] - half_local_view,
+                   half_local_view:padded_shape[1] - half_local_view] = world_map
+
+        x, y = player_pos
+        return padded_map[x:x + self.local_view_size, y:y + self.local_view_size].copy()
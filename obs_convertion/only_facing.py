@@ -1,7 +1,9 @@
 from .lidar_all import LidarAll
+from .beam_geometry import facing_beam_offsets, cast_beams
 import numpy as np
 from gymnasium import spaces
-from typing import Tuple
+from typing import Sequence, Tuple
+
 
 class OnlyFacingObs(LidarAll):
     def __init__(self, *args, **kwargs):
@@ -44,33 +46,36 @@ class OnlyFacingObs(LidarAll):
         '''
         get the item that it's facing
         '''
+        return self._facing_sensors_batch(
+            np.array([player_pos], dtype=int),
+            [player_facing],
+            world_map[None].astype(int),
+            np.array([world_map.shape], dtype=int)
+        )[0]
 
-        direction_radian = {'north': np.pi, 'south': 0, 'west': 3 * np.pi / 2, 'east': np.pi / 2}
-
-        # Shoot beams in 360 degrees in front of agent
-        angle = direction_radian[player_facing]
-
-        lidar_signals = np.zeros((len(self.items_id_lidar)), dtype=int)
-        x, y = player_pos
 
-        x_ratio, y_ratio = np.round(np.cos(angle), 2), np.round((np.sin(angle)), 2)
-
-        # Keep sending longer beams until hit an object or wall
-        for beam_range in range(1, self.max_beam_range + 1):
-            x_obj = x + np.round(beam_range * x_ratio)
-            y_obj = y + np.round(beam_range * y_ratio)
-            if x_obj >= world_map.shape[0] or y_obj >= world_map.shape[1] or x_obj < 0 or y_obj < 0:
-                # prevent shooting out of the map
-                break
-            obj_id_rc = world_map[int(x_obj), int(y_obj)]
-
-            if obj_id_rc != 0 and obj_id_rc in self.items_id_lidar:
-                index = self.items_id_lidar[obj_id_rc]
-                if lidar_signals[index] == 0:
-                    lidar_signals[index] = beam_range
-                break # dont break because we want the objects even if we have occlusions.
-        
-        return lidar_signals
+    def _facing_sensors_batch(
+            self,
+            player_pos: np.ndarray,
+            player_facing: Sequence[str],
+            world_maps: np.ndarray,
+            map_shapes: np.ndarray
+        ) -> np.ndarray:
+        '''
+        Batched facing beam over K maps. The beam stops at the first item
+        it hits, or when it leaves its own map.
+        player_pos: (K, 2), world_maps: (K, H, W), map_shapes: (K, 2)
+        Returns a (K, num_lidar_items) array.
+        '''
+        offsets = np.stack([
+            facing_beam_offsets(facing, self.max_beam_range)
+            for facing in player_facing
+        ])
+        return cast_beams(
+            player_pos, offsets, world_maps, map_shapes,
+            self._get_item_table(world_maps), len(self._beam_items()),
+            first_hit_only=True
+        )[:, :, 0]
     
 
     def generate_observation(self, json_input: dict) -> np.ndarray:
@@ -78,14 +83,24 @@ class OnlyFacingObs(LidarAll):
         generates a numpy array representing the state from the json file.
         takes in json['state']
         """
-        state_json = json_input
+        return self.generate_observations([json_input])[0]
+
+
+    def generate_observations(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Batched version of generate_observation, see LidarAll.generate_observations
+        """
         # lidar beams
-        world_map, min_coord, max_coord = self._generate_map(state_json)
-        player_pos = np.array(state_json["player"]["pos"]) - min_coord
-        sensor_result = self._lidar_sensors(tuple(player_pos), state_json['player']['facing'], world_map)
+        with self.perf.timer("map"):
+            world_maps, map_shapes, player_pos = self._generate_padded_maps(states)
+        with self.perf.timer("lidar"):
+            sensor_result = self._facing_sensors_batch(
+                player_pos, [state_json['player']['facing'] for state_json in states],
+                world_maps, map_shapes
+            )
         # inventory
-        inventory_result = self._generate_inventory(state_json)
+        inventory_result = self._generate_inventory_batch(states)
         # selected item
-        selected_item = self._get_selected_item(state_json)
+        selected_item = np.array([[self._get_selected_item(state_json)] for state_json in states], dtype=int)
 
-        return np.concatenate((sensor_result, inventory_result, [selected_item]), dtype=int)
+        return np.concatenate((sensor_result, inventory_result, selected_item), axis=1, dtype=int)
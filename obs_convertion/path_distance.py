@@ -0,0 +1,197 @@
+from typing import List, Sequence
+import numpy as np
+from gymnasium import spaces
+
+from .lidar_all import LidarAll
+from .distance_field import UNREACHED
+
+MAX_PATH_DISTANCE=80
+# items the player can walk through, besides air
+WALKABLE_ITEMS=("open_door",)
+
+
+def walk_distance(walkable: np.ndarray, start: np.ndarray, max_distance: int) -> np.ndarray:
+    """
+    BFS distance from start over the 4-connected walkable cells of a
+    (H, W) bool grid, as a wavefront over the whole grid per step.
+    The cells that are not reached within max_distance are UNREACHED.
+    """
+    dist = np.full(walkable.shape, UNREACHED, dtype=int)
+    frontier = np.zeros(walkable.shape, dtype=bool)
+    frontier[tuple(start)] = True
+    dist[tuple(start)] = 0
+    unvisited = walkable.copy()
+    unvisited[tuple(start)] = False
+    for step in range(1, max_distance + 1):
+        expanded = np.zeros_like(frontier)
+        expanded[1:] |= frontier[:-1]
+        expanded[:-1] |= frontier[1:]
+        expanded[:, 1:] |= frontier[:, :-1]
+        expanded[:, :-1] |= frontier[:, 1:]
+        frontier = expanded & unvisited
+        if not frontier.any():
+            break
+        dist[frontier] = step
+        unvisited &= ~frontier
+    return dist
+
+
+def reach_distance(dist: np.ndarray) -> np.ndarray:
+    """
+    Path distance of each cell given the walk distance of the cells, as
+    the lidar range of a cell in a straight line: the walkable cells are
+    walked onto, the others are one step from their closest neighbour.
+    """
+    bordered = np.pad(dist, 1, constant_values=UNREACHED)
+    closest_neighbour = np.minimum.reduce([
+        bordered[:-2, 1:-1], bordered[2:, 1:-1], bordered[1:-1, :-2], bordered[1:-1, 2:]
+    ])
+    return np.minimum(dist, np.minimum(closest_neighbour + 1, UNREACHED))
+
+
+class _PathCache:
+    def __init__(self, world_map: np.ndarray, min_coord: np.ndarray, player_pos: np.ndarray, distances: np.ndarray):
+        self.world_map = world_map
+        self.min_coord = min_coord
+        self.player_pos = player_pos
+        self.distances = distances
+
+
+class PathDistance(LidarAll):
+    """
+    Shortest path distance to each item type.
+
+    A BFS from the player over the walkable cells of the room (air and
+    walkable_items) gives the path distance to the nearest object of each
+    type, one more than the steps needed to stand next to it, followed by
+    the inventory and the selected item. Unreachable items, or items
+    farther than max_distance, are 0. The map of the state is already
+    restricted to the room of the player by generate_diarc_json_from_state.
+
+    The distances are only recomputed when the player moves or the map
+    changes, and reused while the player crafts or selects.
+    """
+    # the caches follow the states of one env between calls
+    batch_across_envs = False
+
+    def __init__(self,
+                 json_input: dict,
+                 max_distance=MAX_PATH_DISTANCE,
+                 walkable_items=WALKABLE_ITEMS,
+                 *args,
+                 **kwargs
+        ) -> None:
+        super().__init__(json_input, *args, **kwargs)
+        self.max_distance = max_distance
+        self.walkable_items = list(walkable_items)
+        # one cache per position in the batch, e.g. per env stepped in one process
+        self._path_caches: List[_PathCache] = []
+        self.observation_space = PathDistance._build_observation_space(
+            self.max_item_type_count, len(self.items_lidar_disabled), max_distance
+        )
+
+
+    @staticmethod
+    def get_observation_space(
+            all_objects,
+            all_entities,
+            items_lidar_disabled=[],
+            max_distance=MAX_PATH_DISTANCE,
+            reserved_extra_objects=2, # in case we have new objects in the world
+            item_encoder_config_path=None,
+            *args,
+            **kwargs
+        ):
+        max_item_type_count = LidarAll._get_max_item_type_count(
+            all_objects, all_entities, reserved_extra_objects, item_encoder_config_path
+        )
+        return PathDistance._build_observation_space(max_item_type_count, len(items_lidar_disabled), max_distance)
+
+
+    @staticmethod
+    def _build_observation_space(max_item_type_count, num_disabled, max_distance):
+        tracked_items_max_count = max_item_type_count - num_disabled
+        low = np.array(
+            [0] * tracked_items_max_count + # path distance
+            [0] * max_item_type_count +     # inventory
+            [0] * max_item_type_count       # selected item
+        )
+        high = np.array(
+            [max_distance] * tracked_items_max_count +
+            [40] * max_item_type_count +
+            [1] * max_item_type_count
+        )
+        return spaces.Box(low, high, dtype=int)
+
+
+    def generate_observation(self, json_input: dict) -> np.ndarray:
+        """
+        generates a numpy array representing the state from the json file.
+        takes in json['state']
+        """
+        return self.generate_observations([json_input])[0]
+
+
+    def generate_observations(self, states: Sequence[dict]) -> np.ndarray:
+        """
+        Batched version of generate_observation, see LidarAll.generate_observations.
+        The i-th state reuses the distances cached for the i-th state of the
+        previous call.
+        """
+        path_result = np.zeros((len(states), len(self._beam_items())), dtype=int)
+        for i, state_json in enumerate(states):
+            with self.perf.timer("map"):
+                world_map, min_coord, _ = self._generate_map(state_json)
+                world_map = world_map.astype(int)
+            with self.perf.timer("path_distance"):
+                player_pos = np.array(state_json['player']['pos']) - min_coord
+                path_result[i] = self._get_path_distances(i, world_map, min_coord, player_pos)
+        # inventory
+        inventory_result = self._generate_inventory_batch(states)
+        # selected item
+        selected_item_onehot = self._get_selected_item_onehot_batch(states)
+
+        return np.concatenate((path_result, inventory_result, selected_item_onehot), axis=1, dtype=int)
+
+
+    def _get_walkable_ids(self) -> List[int]:
+        return [0] + [
+            self.item_encoder.item_list[item] for item in self.walkable_items
+            if item in self.item_encoder.item_list
+        ]
+
+
+    def _get_path_distances(
+            self,
+            cache_idx: int,
+            world_map: np.ndarray,
+            min_coord: np.ndarray,
+            player_pos: np.ndarray
+        ) -> np.ndarray:
+        """
+        Path distance to the nearest object of each lidar item channel,
+        0 when unreachable. Cached per cache_idx until the player moves or
+        the map changes.
+        """
+        cache = self._path_caches[cache_idx] if cache_idx < len(self._path_caches) else None
+        if cache is not None \
+                and np.array_equal(cache.player_pos, player_pos) \
+                and np.array_equal(cache.min_coord, min_coord) \
+                and np.array_equal(cache.world_map, world_map):
+            return cache.distances
+
+        walkable = np.isin(world_map, self._get_walkable_ids())
+        reach = reach_distance(walk_distance(walkable, player_pos, self.max_distance))
+
+        channel_map = self._get_item_table(world_map)[world_map]
+        tracked = channel_map >= 0
+        distances = np.full(len(self._beam_items()), UNREACHED, dtype=int)
+        np.minimum.at(distances, channel_map[tracked], reach[tracked])
+        distances[distances > self.max_distance] = 0
+
+        cache = _PathCache(world_map, min_coord, player_pos, distances)
+        if cache_idx < len(self._path_caches):
+            self._path_caches[cache_idx] = cache
+        else:
+            self._path_caches.append(cache)
+        return distances
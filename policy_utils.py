@@ -7,6 +7,7 @@ from tianshou.utils.net.discrete import Actor, Critic, IntrinsicCuriosityModule
 import numpy as np
 
 from net.basic import BasicCriticNet
+from net.matrix_net import MatrixNet, MatrixCriticNet
 from net.norm_net import NormalizedNet
 from utils.hint_utils import get_novel_action_indices
 from policies import BiasedDQN
@@ -19,22 +20,50 @@ def create_policy_for_matrix(
         action_space,
         all_actions,
         novel_actions=[], 
-        hidden_sizes=[256, 128, 64],
+        hidden_sizes=[128, 64],
         buffer=None, 
         lr=None,
         device="cpu",
         checkpoint=None
     ):
-        if lr is not None:
-            lr = float(lr)
-        if hidden_sizes is None:
-            hidden_sizes = [256, 128, 64]
-        
-        if rl_algo == "ppo":
-            policy = ts.policy.PPOPolicy(
-                # TODO
-            )
+    """
+    Creates the policy for the Dict observations of obs_convertion.Matrix,
+    using the batched conv nets of net/matrix_net.py
+    """
+    if lr is not None:
+        lr = float(lr)
+    if hidden_sizes is None:
+        hidden_sizes = [128, 64]
+    action_shape = action_space.n
 
+    if rl_algo == "ppo":
+        actor = MatrixNet(state_space, action_shape, hidden_sizes=hidden_sizes, softmax=True, device=device)
+        critic = MatrixCriticNet(state_space, hidden_sizes=hidden_sizes, device=device)
+        actor_critic = ActorCritic(actor, critic).to(device)
+        optim = torch.optim.Adam(actor_critic.parameters(), lr=lr or 1e-5)
+        policy = ts.policy.PPOPolicy(
+            actor=actor,
+            critic=critic,
+            optim=optim,
+            dist_fn=torch.distributions.Categorical,
+        ).to(device)
+    elif rl_algo == "dqn":
+        net = MatrixNet(state_space, action_shape, hidden_sizes=hidden_sizes, device=device)
+        optim = torch.optim.Adam(net.parameters(), lr=lr or 1e-4)
+        policy = POLICIES[rl_algo](
+            model=net, 
+            optim=optim, 
+            discount_factor=0.99, 
+            estimation_step=3,
+        )
+    else:
+        raise NotImplementedError(f"{rl_algo} is not supported for the matrix observations.")
+
+    if checkpoint is not None:
+        checkpoint = torch.load(checkpoint, map_location=device)
+        policy.load_state_dict(checkpoint["model"])
+        policy.optim.load_state_dict(checkpoint["optim"])
+    return policy
 
 
 def create_policy(
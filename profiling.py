@@ -1,61 +1,127 @@
+# Env throughput benchmark.
+#
+# Runs a random policy on every combination of observation type, env wrapper
+# and novelty, and reports steps/sec, resets/sec, step latency percentiles
+# and the number of planner calls. Results are written as json so that
+# regressions can be tracked between commits.
+#
+# Usage: 
+#   python profiling.py --steps 2000 --output results/bench.json
+#   python profiling.py --obs_types lidar_all --envs sa pf --novelties none fence
+#   python profiling.py --obs_types lidar_all lidar_occluded --envs sa
 
-import os
 import argparse
-from envs.planning_until_failure import SingleAgentEnv
-import tianshou as ts
-import gymnasium as gym
-from net.basic import BasicNet
-import torch
-from torch.utils.tensorboard import SummaryWriter
-from tianshou.utils import TensorboardLogger
-from obs_convertion import LidarAll, OnlyFacingObs
-import numpy as np
+import json
+import subprocess
+import time
+import traceback
 from datetime import datetime
 
-from args import args, NOVELTIES
-import cProfile
+import numpy as np
+
+from config import NOVELTIES, OBS_TYPES, AVAILABLE_ENVS
+from utils.make_env import make_env, get_config_file_paths, get_rep_gen_args
+
+parser = argparse.ArgumentParser(description="Env throughput benchmark")
+parser.add_argument("--obs_types", nargs="*", default=list(OBS_TYPES.keys()), choices=OBS_TYPES.keys())
+parser.add_argument("--envs", nargs="*", default=list(AVAILABLE_ENVS.keys()), choices=AVAILABLE_ENVS.keys())
+parser.add_argument("--novelties", nargs="*", default=list(NOVELTIES.keys()), choices=NOVELTIES.keys())
+parser.add_argument("--steps", type=int, default=1000, help="Number of env steps per combination.")
+parser.add_argument("--max_time_step", type=int, default=400, help="Max steps per episode.")
+parser.add_argument("--seed", "-s", type=int, default=0)
+parser.add_argument("--output", "-o", type=str, default=None, help="Path of the json file to write the results to.")
+
+
+def get_num_planner_calls(env):
+    agent = env.unwrapped.agent_manager.agents["agent_0"].agent
+    return getattr(agent, "num_planner_calls", 0)
 
-verbose = False
 
+def run_benchmark(env_name, novelty_name, obs_type, num_steps, max_time_step, seed):
+    config_file_paths = get_config_file_paths(novelty_name)
+    env = make_env(
+        env_name=env_name,
+        config_file_paths=config_file_paths,
+        RepGenerator=OBS_TYPES[obs_type],
+        rep_gen_args=get_rep_gen_args(novelty_name, obs_type, config_file_paths),
+        max_time_step=max_time_step
+    )
+    env.action_space.seed(seed)
 
-# novelty
-novelty_name = args.novelty
-novelty_path = NOVELTIES[novelty_name]
-config_file_paths = ["config/polycraft_gym_rl_single."]
-config_file_paths.append(novelty_path)
+    reset_times = []
+    step_times = []
+    num_episodes = 0
 
+    begin = time.perf_counter()
+    env.reset(seed=seed)
+    reset_times.append(time.perf_counter() - begin)
+    # the planner calls during the reset are included
+    for _ in range(num_steps):
+        action = env.action_space.sample()
+        begin = time.perf_counter()
+        obs, reward, terminated, truncated, info = env.step(action)
+        step_times.append(time.perf_counter() - begin)
 
-env = SingleAgentEnv(
-    config_file_paths=config_file_paths,
-    agent_name="agent_0",
-    task_name="main",
-    show_action_log=False,
-    enable_render=False
-)
+        if terminated or truncated:
+            num_episodes += 1
+            begin = time.perf_counter()
+            env.reset()
+            reset_times.append(time.perf_counter() - begin)
+    num_planner_calls = get_num_planner_calls(env)
+    env.close()
 
-space = env.action_space.n
+    step_times = np.array(step_times)
+    reset_times = np.array(reset_times)
+    return {
+        "steps": len(step_times),
+        "resets": len(reset_times),
+        "episodes": num_episodes,
+        "steps_per_sec": float(len(step_times) / step_times.sum()),
+        "resets_per_sec": float(len(reset_times) / reset_times.sum()),
+        "step_latency_p50_ms": float(np.percentile(step_times, 50) * 1000),
+        "step_latency_p99_ms": float(np.percentile(step_times, 99) * 1000),
+        "reset_latency_p50_ms": float(np.percentile(reset_times, 50) * 1000),
+        "planner_calls": num_planner_calls,
+        "planner_calls_per_step": num_planner_calls / len(step_times),
+    }
 
-def run():
-    for episode in range(10000000):
-        obs, info = env.reset()
-        print()
-        print("++++++++++++++ Running episode", episode, "+++++++++++++++")
-        begin_time = datetime.now()
 
-        agent = env.env.agent_manager.agents["agent_0"]
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode("utf-8").strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
 
-        for step in range(1000):
-            action = np.random.randint(space - 2)
-            obs, reward, terminated, truncated, info = env.step(action)
-            
-            if verbose:
-                env.render()
-            if terminated or truncated:
-                print("terminated at step", step, "with reward", reward)
-                break
 
-        print("Done at", datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"))
-        print("Time Used:", str(datetime.now() - begin_time))
+if __name__ == "__main__":
+    args = parser.parse_args()
+    results = []
+    for novelty_name in args.novelties:
+        for env_name in args.envs:
+            for obs_type in args.obs_types:
+                entry = {"novelty": novelty_name, "env": env_name, "obs_type": obs_type}
+                try:
+                    entry.update(run_benchmark(
+                        env_name, novelty_name, obs_type, 
+                        args.steps, args.max_time_step, args.seed
+                    ))
+                    print("{:<16}{:<6}{:<14}{:>10.1f} steps/s {:>8.2f} resets/s  p50 {:.2f}ms  p99 {:.2f}ms  planner calls {}".format(
+                        novelty_name, env_name, obs_type, 
+                        entry["steps_per_sec"], entry["resets_per_sec"],
+                        entry["step_latency_p50_ms"], entry["step_latency_p99_ms"],
+                        entry["planner_calls"]
+                    ))
+                except Exception as e:
+                    entry["error"] = repr(e)
+                    print("{:<16}{:<6}{:<14}error: {}".format(novelty_name, env_name, obs_type, repr(e)))
+                    traceback.print_exc()
+                results.append(entry)
 
-# cProfile.run('run()', 'results/profile.txt')
-run()
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": get_commit(),
+                "time": datetime.now().isoformat(),
+                "args": vars(args),
+                "results": results
+            }, f, indent=2)
@@ -0,0 +1,68 @@
+# Measures the import time of the entry points used by train.py and by the
+# env workers. Every measurement runs in a fresh interpreter, so nothing is
+# cached between runs.
+#
+# Usage: python startup_benchmark.py --repeat 5 --output results/startup.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# name -> statement to time
+STARTUP_TARGETS = {
+    "args": "import args",
+    "config_resolve_obs_type": "from config import OBS_TYPES; OBS_TYPES['lidar_all']",
+    "env_worker": "from utils.make_env import make_env; from config import OBS_TYPES; OBS_TYPES['lidar_all']",
+    "policy_utils": "import policy_utils",
+    "torch": "import torch",
+    "tianshou": "import tianshou",
+}
+
+
+def time_statement(statement: str, repeat: int):
+    """
+    Runs the statement in `repeat` fresh interpreters and returns the wall times in seconds.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", statement], cwd=cwd, capture_output=True)
+        times.append(time.perf_counter() - begin)
+        if result.returncode != 0:
+            return None, result.stderr.decode("utf-8").strip().split("\n")[-1]
+    return times, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters per target.")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Path of the json file to write the results to.")
+    parser.add_argument("--targets", nargs="*", default=list(STARTUP_TARGETS.keys()), choices=STARTUP_TARGETS.keys())
+    args = parser.parse_args()
+
+    baseline, _ = time_statement("pass", args.repeat)
+    results = {"python_startup_s": float(np.median(baseline)), "targets": {}}
+    for name in args.targets:
+        times, error = time_statement(STARTUP_TARGETS[name], args.repeat)
+        if times is None:
+            results["targets"][name] = {"error": error}
+            print("{:<28}error: {}".format(name, error))
+            continue
+        results["targets"][name] = {
+            "median_s": float(np.median(times)),
+            "min_s": float(np.min(times)),
+            "max_s": float(np.max(times)),
+            # excluding the startup time of the interpreter itself
+            "import_median_s": float(np.median(times) - results["python_startup_s"]),
+        }
+        print("{:<28}{:.3f}s".format(name, results["targets"][name]["import_median_s"]))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
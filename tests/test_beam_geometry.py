@@ -0,0 +1,74 @@
+import numpy as np
+
+from obs_convertion.beam_geometry import (
+    DIRECTION_RADIAN, beam_offsets, facing_beam_offsets, item_lookup_table, item_mask_table, cast_beams
+)
+
+
+def test_beam_offsets():
+    offsets = beam_offsets("east", 8, 5)
+    assert offsets.shape == (8, 5, 2)
+    assert not offsets.flags.writeable
+    # cached per (facing, num_beams, range)
+    assert beam_offsets("east", 8, 5) is offsets
+
+    angles = np.linspace(DIRECTION_RADIAN["east"] - np.pi, DIRECTION_RADIAN["east"] + np.pi, 9)[:-1]
+    for beam_idx, angle in enumerate(angles):
+        x_ratio, y_ratio = np.round(np.cos(angle), 2), np.round(np.sin(angle), 2)
+        for beam_range in range(1, 6):
+            assert offsets[beam_idx, beam_range - 1, 0] == np.round(beam_range * x_ratio)
+            assert offsets[beam_idx, beam_range - 1, 1] == np.round(beam_range * y_ratio)
+
+    # east is +y
+    assert facing_beam_offsets("east", 3).tolist() == [[[0, 1], [0, 2], [0, 3]]]
+
+
+def test_cast_beams():
+    world_map = np.zeros((1, 6, 6), dtype=int)
+    world_map[0, 2, 4] = 3
+    world_map[0, 2, 5] = 4
+    item_table = item_lookup_table({3: 0, 4: 1}, 5)
+    player_pos = np.array([[2, 1]])
+    offsets = facing_beam_offsets("east", 10)[None]
+    map_shapes = np.array([[6, 6]])
+
+    signals = cast_beams(player_pos, offsets, world_map, map_shapes, item_table, 2)
+    assert signals[0, :, 0].tolist() == [3, 4]
+
+    signals = cast_beams(player_pos, offsets, world_map, map_shapes, item_table, 2, first_hit_only=True)
+    assert signals[0, :, 0].tolist() == [3, 0]
+
+
+def test_cast_beams_occlusion():
+    world_map = np.zeros((1, 6, 6), dtype=int)
+    world_map[0, 2, 3] = 3
+    world_map[0, 2, 4] = 5 # wall
+    world_map[0, 2, 5] = 4
+    item_table = item_lookup_table({3: 0, 4: 1, 5: 2}, 6)
+    player_pos = np.array([[2, 1]])
+    offsets = facing_beam_offsets("east", 10)[None]
+    map_shapes = np.array([[6, 6]])
+
+    signals = cast_beams(player_pos, offsets, world_map, map_shapes, item_table, 3)
+    assert signals[0, :, 0].tolist() == [2, 4, 3]
+
+    # the wall is seen, the item behind it is not
+    block_table = item_mask_table([5], 6)
+    signals = cast_beams(player_pos, offsets, world_map, map_shapes, item_table, 3, block_table=block_table)
+    assert signals[0, :, 0].tolist() == [2, 0, 3]
+
+
+def test_cast_beams_march():
+    rng = np.random.default_rng(0)
+    world_maps = rng.integers(0, 6, (4, 15, 11)) * (rng.random((4, 15, 11)) < 0.3)
+    map_shapes = np.array([[15, 11], [9, 9], [15, 4], [3, 11]])
+    player_pos = np.array([[7, 5], [2, 6], [14, 0], [1, 1]])
+    offsets = np.stack([beam_offsets(facing, 8, 20) for facing in ["north", "south", "east", "west"]])
+    item_table = item_lookup_table({1: 0, 2: 1, 3: 2, 4: 3, 5: 4}, 6)
+    for block_table in [None, item_mask_table([5], 6)]:
+        for first_hit_only in [False, True]:
+            args = (player_pos, offsets, world_maps, map_shapes, item_table, 5, first_hit_only, block_table)
+            # a single chunk casts every range
+            signals = cast_beams(*args, march_chunk=20)
+            for march_chunk in [1, 3, 8]:
+                assert np.array_equal(cast_beams(*args, march_chunk=march_chunk), signals)
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+from tianshou.data import Batch
+
+from utils.buffer_checkpoint import (
+    BufferCheckpointWriter, CheckpointVectorReplayBuffer, load_buffer_checkpoint
+)
+
+
+def _add_steps(buffer, num_steps, start=0):
+    for step in range(start, start + num_steps):
+        buffer.add(Batch(
+            obs=np.full((2, 3), step, dtype=float),
+            act=np.array([step % 5, step % 7]),
+            rew=np.array([1.0, -1.0]),
+            terminated=np.array([step % 4 == 3, False]),
+            truncated=np.array([False, False]),
+            obs_next=np.full((2, 3), step + 1, dtype=float),
+            info=Batch(skipped_epi_count=np.array([0, 0])),
+        ))
+
+
+def _assert_same(buffer, loaded):
+    assert len(loaded) == len(buffer)
+    assert np.array_equal(loaded.last_index, buffer.last_index)
+    indices = buffer.sample_indices(0)
+    assert np.array_equal(loaded.sample_indices(0), indices)
+    for key in ("obs", "act", "rew", "done", "obs_next"):
+        assert np.array_equal(loaded[indices][key], buffer[indices][key])
+    assert np.array_equal(loaded.prev(indices), buffer.prev(indices))
+
+
+def test_incremental_checkpoints(tmp_path):
+    checkpoint_dir = os.path.join(tmp_path, "buffer_ckpt")
+    buffer = CheckpointVectorReplayBuffer(20, buffer_num=2)
+    writer = BufferCheckpointWriter(buffer, checkpoint_dir)
+
+    _add_steps(buffer, 4)
+    writer.save()
+    _add_steps(buffer, 3, start=4)
+    writer.save().result()
+    # only the new rows are in the second segment
+    assert writer.stored_rows == 14
+    _assert_same(buffer, load_buffer_checkpoint(checkpoint_dir, 20, 2))
+
+    # the on-policy trainer resets the buffer after each update
+    buffer.reset(keep_statistics=True)
+    _add_steps(buffer, 2, start=7)
+    writer.save()
+    writer.close()
+    loaded = load_buffer_checkpoint(checkpoint_dir, 20, 2)
+    _assert_same(buffer, loaded)
+    assert len(loaded) == 4
+
+    # resuming appends to the segments of the loaded buffer
+    writer = BufferCheckpointWriter(loaded, checkpoint_dir, resume=True)
+    _add_steps(loaded, 1, start=9)
+    writer.save()
+    writer.close()
+    _assert_same(loaded, load_buffer_checkpoint(checkpoint_dir, 20, 2))
+
+
+def test_compaction(tmp_path):
+    checkpoint_dir = os.path.join(tmp_path, "buffer_ckpt")
+    buffer = CheckpointVectorReplayBuffer(20, buffer_num=2)
+    writer = BufferCheckpointWriter(buffer, checkpoint_dir)
+    for i in range(6):
+        _add_steps(buffer, 7, start=7 * i)
+        writer.save()
+    writer.close()
+    assert writer.stored_rows <= 2 * buffer.maxsize
+    assert len(os.listdir(checkpoint_dir)) < 6
+    _assert_same(buffer, load_buffer_checkpoint(checkpoint_dir, 20, 2))
@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+
+from obs_convertion import LidarAll
+from utils.advanced_item_encoder import PlaceHolderItemEncoder
+from utils.env_condition_set import ConditionSet, VECTORIZED_MIN_BOUNDS
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_add_remove_conditions():
+    conditions = ConditionSet()
+    conditions.add_condition(["and", ["holding", "air"], [">=", ["inventory", "stick"], "1"]])
+    conditions.add_condition(["holding", "air"])
+    conditions.add_condition(["increase", ["inventory", "stick"], "2"])
+    conditions.add_condition(["increase", ["world", "oak_log"], "1"])
+    assert conditions.facts == {("holding", "air")}
+    assert conditions.bounds == {("inventory", "stick"): 3, ("world", "oak_log"): 1}
+
+    # regression through an action crafting sticks from planks
+    conditions.remove_condition(["increase", ["inventory", "stick"], "4"])
+    conditions.remove_condition(["decrease", ["inventory", "planks"], "2"])
+    conditions.remove_condition(["holding", "air"])
+    conditions.add_condition(["not", ["holding", "air"]])
+    assert conditions.facts == set()
+    assert conditions.bounds == {("inventory", "stick"): 0, ("world", "oak_log"): 1}
+    assert [">=", ["world", "oak_log"], 1] in conditions.to_condition_tokens()
+
+
+def test_compile():
+    item_encoder = PlaceHolderItemEncoder({"air": 0, "oak_log": 1, "stick": 2})
+    conditions = ConditionSet()
+    conditions.add_condition([">=", ["inventory", "stick"], "2"])
+    conditions.add_condition([">=", ["world", "oak_log"], "1"])
+    conditions.add_condition([">=", ["inventory", "air"], "5"])
+    conditions.add_condition(["holding", "stick"])
+    check = conditions.compile(
+        item_encoder,
+        lambda fact: lambda state: state["holding"] == item_encoder.get_id(fact[1])
+    )
+
+    state = {"holding": 2, "inventory": np.array([0, 0, 2]), "world": np.array([0, 1, 0])}
+    assert check(state)
+    assert not check({**state, "holding": 1})
+    assert not check({**state, "world": np.array([0, 0, 0])})
+    # facts are ignored without a function to check them
+    assert conditions.compile(item_encoder)({**state, "holding": 1})
+
+
+def test_compile_bound_vector():
+    item_encoder = PlaceHolderItemEncoder({"air": 0})
+    conditions = ConditionSet()
+    for i in range(VECTORIZED_MIN_BOUNDS):
+        conditions.add_condition([">=", ["inventory", "item_" + str(i)], "1"])
+    check = conditions.compile(item_encoder)
+    inventory = np.ones(VECTORIZED_MIN_BOUNDS + 4, dtype=int)
+    assert check({"inventory": inventory})
+    inventory[item_encoder.get_id("item_3")] = 0
+    assert not check({"inventory": inventory})
+
+
+def test_plannable_state():
+    with open(os.path.join(path, 'init.json')) as f:
+        data = json.load(f)
+    env = LidarAll(data, RL_test=True)
+    reward_generator = env.reward_generator
+    # the rest of the plan after breaking the log needs it in the inventory
+    assert reward_generator.plannable_state.bounds[("inventory", "oak_log")] >= 1
+
+    state = env.get_state_for_evaluation(data['state'])
+    assert not reward_generator.plannable_state_met_checker(state)
+    check = reward_generator._make_check_function(
+        reward_generator.plannable_state.to_condition_tokens()
+    )
+    assert check(state) == reward_generator.plannable_state_met_checker(state)
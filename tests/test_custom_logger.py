@@ -0,0 +1,27 @@
+from tianshou.data import Batch
+from torch.utils.tensorboard import SummaryWriter
+
+from ts_extensions.custom_logger import CustomTensorBoardLogger
+from utils.perf_utils import PerfRecorder
+
+
+def _sample(stages):
+    perf = PerfRecorder(enabled=True, sample_interval=1)
+    for stage in stages:
+        with perf.timer(stage):
+            pass
+    perf.tick()
+    return perf.pop_sample()
+
+
+def test_perf_average_over_present_keys(tmp_path):
+    logger = CustomTensorBoardLogger(SummaryWriter(str(tmp_path)), epi_max_len=10, rew_min=-1)
+    # only the first env ran the planner stage, the stacking fills it with 0 in the other
+    info = Batch([{"perf": _sample(["lidar", "planner"])}, {"perf": _sample(["lidar"])}])
+    assert info.perf.planner_calls[1] == 0
+    logger.perf_preprocess_fn(info=info)
+
+    assert logger.perf_counts["perf/lidar_calls"] == 2
+    assert logger.perf_counts["perf/planner_calls"] == 1
+    assert logger.perf_sums["perf/planner_calls"] == 1
+    assert "perf/present" not in logger.perf_counts
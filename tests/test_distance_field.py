@@ -0,0 +1,56 @@
+import copy
+import json
+
+import numpy as np
+
+from obs_convertion import DistanceField
+from obs_convertion.distance_field import city_block_distance, UNREACHED
+
+
+def _load_state():
+    with open("tests/test_json/example_json.json") as f:
+        json_input = json.load(f)
+    return {**json_input, "actionSet": ["nop"]}, json_input["state"]
+
+
+def test_city_block_distance():
+    rng = np.random.default_rng(0)
+    sources = rng.random((3, 9, 7)) < 0.05
+    sources[2] = False
+    field = city_block_distance(sources)
+    for channel in range(2):
+        source_cells = np.argwhere(sources[channel])
+        for x in range(9):
+            for y in range(7):
+                assert field[channel, x, y] == np.abs(source_cells - [x, y]).sum(axis=1).min()
+    assert np.all(field[2] == UNREACHED)
+
+
+def test_nearest_direction():
+    json_input, state = _load_state()
+    distance_field = DistanceField(json_input=json_input)
+    obs = distance_field.generate_observation(state)
+    assert distance_field.observation_space.contains(obs)
+
+    num_tracked = len(distance_field.items_id_lidar)
+    distance, forward, right = obs[:3 * num_tracked].reshape(3, num_tracked)
+    channel = distance_field.items_id_lidar[distance_field.item_encoder.get_id("trader_103")]
+    # the trader is at 15,7 and the player at 32,28 facing east
+    assert distance[channel] == 17 + 21
+    assert forward[channel] == -1
+    assert right[channel] == -1
+
+
+def test_incremental_update():
+    json_input, state = _load_state()
+    distance_field = DistanceField(json_input=json_input)
+    distance_field.generate_observation(state)
+
+    rng = np.random.default_rng(0)
+    coords = list(state["map"].keys())
+    for _ in range(10):
+        state = copy.deepcopy(state)
+        for coord in rng.choice(coords, 3):
+            state["map"][coord] = str(rng.choice(["air", "oak_log", "diamond_ore"]))
+        fresh = DistanceField(json_input=json_input).generate_observation(state)
+        assert np.array_equal(distance_field.generate_observation(state), fresh)
@@ -1,5 +1,5 @@
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
-from utils.env_reward_rapidlearn import RapidLearnRewardGenerator, parse_failed_action_statement
+from utils.env_reward_rapidlearn import RapidLearnRewardGenerator
 import json
 from obs_convertion import LidarAll
 import numpy as np
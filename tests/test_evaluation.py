@@ -0,0 +1,87 @@
+import os
+
+import gymnasium as gym
+import numpy as np
+import torch
+from tianshou.env import DummyVectorEnv
+
+from config import REWARDS
+
+from utils.evaluation import (
+    episode_quotas, evaluate, find_model_paths, load_policy_state, make_random_act_fn,
+    merge_success_rates
+)
+
+
+class _CountdownEnv(gym.Env):
+    """
+    Terminates with the goal reward when action 1 is taken, and with the
+    failure reward when action 2 is taken. Truncated after 3 steps.
+    Every other reset reports an episode solved by the planner.
+    """
+    observation_space = gym.spaces.Box(0, 10, shape=(1,))
+    action_space = gym.spaces.Discrete(3)
+
+    def __init__(self):
+        self.num_resets = 0
+        self.steps = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.num_resets += 1
+        self.steps = 0
+        return np.zeros(1, dtype=np.float32), {"skipped_epi_count": self.num_resets % 2}
+
+    def step(self, action):
+        self.steps += 1
+        obs = np.full(1, self.steps, dtype=np.float32)
+        reward = {0: REWARDS["step"], 1: REWARDS["positive"], 2: REWARDS["negative"]}[int(action)]
+        return obs, float(reward), action != 0, self.steps >= 3, {}
+
+
+def test_episode_quotas():
+    assert episode_quotas(10, 4).tolist() == [3, 3, 2, 2]
+    assert episode_quotas(2, 4).tolist() == [1, 1, 0, 0]
+
+
+def test_evaluate():
+    venv = DummyVectorEnv([_CountdownEnv for _ in range(3)])
+    # never succeeds by itself
+    result = evaluate(venv, lambda obs, env_ids: np.zeros(len(env_ids), dtype=int), 10)
+    assert result.num_episodes == 10
+    assert result.num_successes == result.num_skipped
+    # quotas [4, 3, 3], with a skipped episode on the 1st and 3rd resets
+    assert result.num_skipped == 4
+
+    result = evaluate(venv, lambda obs, env_ids: np.ones(len(env_ids), dtype=int), 10)
+    assert result.success_rate == 1.0
+
+    # terminated by a failure
+    result = evaluate(venv, lambda obs, env_ids: np.full(len(env_ids), 2), 10)
+    assert result.num_successes == result.num_skipped
+
+    result = evaluate(venv, make_random_act_fn(venv), 7, seed=0)
+    assert 0 <= result.num_successes <= 7
+
+
+def test_merge_success_rates(tmp_path):
+    result_file = os.path.join(tmp_path, "none_full_result.csv")
+    merge_success_rates(result_file, {"1": 0.5, "2": 0.25})
+    merge_success_rates(result_file, {"2": 0.75})
+    with open(result_file) as f:
+        assert f.read().splitlines() == ["seed_no,success_rate", "1,0.5", "2,0.75"]
+
+
+def test_find_and_load_models(tmp_path):
+    model = torch.nn.Linear(2, 1)
+    os.makedirs(os.path.join(tmp_path, "1"))
+    os.makedirs(os.path.join(tmp_path, "2"))
+    torch.save(model.state_dict(), os.path.join(tmp_path, "1", "best_policy.pth"))
+    torch.save({"model": model.state_dict(), "optim": {}}, os.path.join(tmp_path, "2", "checkpoint.pth"))
+    model_paths = find_model_paths(str(tmp_path))
+    assert model_paths == {
+        "1": os.path.join(tmp_path, "1", "best_policy.pth"),
+        "2": os.path.join(tmp_path, "2", "checkpoint.pth"),
+    }
+    for path in model_paths.values():
+        assert load_policy_state(path).keys() == model.state_dict().keys()
@@ -0,0 +1,56 @@
+import json
+import os
+
+from obs_convertion import LidarAll
+from utils.env_reward_rapidlearn import RapidLearnRewardGenerator
+from utils.failed_action import FailedAction, CANNOT_PLAN_ACTION, ACTION
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_parse():
+    failed_action = FailedAction.parse("(break self oak_log)")
+    assert failed_action == FailedAction(ACTION, "break", ("self", "oak_log"))
+    assert FailedAction.parse(("break", "self", "oak_log")) == failed_action
+    assert FailedAction.parse(failed_action) is failed_action
+    assert FailedAction.parse(str(failed_action)) == failed_action
+    assert failed_action.name == "break_self_oak_log"
+
+    assert FailedAction.parse("cannotplan") is CANNOT_PLAN_ACTION
+    assert str(CANNOT_PLAN_ACTION) == "cannotplan"
+
+
+def test_json_round_trip():
+    # the diarc json stores the statement, which parses back to the record
+    failed_action = FailedAction(ACTION, "break", ("self", "oak_log"))
+    for record in (failed_action, CANNOT_PLAN_ACTION):
+        statement = json.loads(json.dumps(str(record)))
+        assert FailedAction.parse(statement) == record
+
+
+def test_reward_generator_from_record():
+    with open(os.path.join(path, 'init.json')) as f:
+        data = json.load(f)
+    env = LidarAll(data, RL_test=True)
+    state = env.get_state_for_evaluation(data['state'])
+    pos = state['pos']
+
+    def make_generator(failed_action):
+        return RapidLearnRewardGenerator(
+            pddl_domain=data['domain'].encode().decode('unicode_escape'),
+            initial_state=state,
+            failed_action_exp=failed_action,
+            item_encoder=env.item_encoder,
+            RL_test=True
+        )
+    from_record = make_generator(FailedAction.from_plan_step(("break", "oak_log")))
+    from_statement = make_generator("(break oak_log)")
+    assert from_record.action_tokens == from_statement.action_tokens
+    # the domain is only parsed once
+    assert from_record.actions is from_statement.actions
+
+    new_state = env.get_state_for_evaluation(data['state'])
+    new_state['map'][pos[0] - 2, pos[1]] = 0
+    new_state['inventory'][env.item_encoder.get_id('oak_log')] += 1
+    assert from_record.check_if_effect_met(new_state)[0]
+    assert make_generator(CANNOT_PLAN_ACTION).check_if_effect_met(state)[0]
@@ -1,5 +1,5 @@
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
-from utils.env_reward_rapidlearn import RapidLearnRewardGenerator, parse_failed_action_statement
+from utils.env_reward_rapidlearn import RapidLearnRewardGenerator
 from utils.pddl_utils import generate_obj_types
 from utils.hint_utils import get_hinted_items
 
@@ -0,0 +1,40 @@
+import copy
+from functools import partial
+
+import numpy as np
+import pytest
+
+from obs_convertion import DistanceField, PathDistance
+from ts_extensions.inproc_vector_env import InProcVectorEnv
+from utils.make_env import make_env, get_config_file_paths, get_rep_gen_args
+
+
+@pytest.mark.parametrize("obs_type,RepGenerator", [("distance_field", DistanceField), ("path_distance", PathDistance)])
+def test_stateful_generators_follow_their_env(obs_type, RepGenerator):
+    config_file_paths = get_config_file_paths("none")
+    env_fn = partial(
+        make_env,
+        env_name="sa",
+        config_file_paths=config_file_paths,
+        RepGenerator=RepGenerator,
+        rep_gen_args=get_rep_gen_args("none", obs_type, config_file_paths),
+        max_time_step=1000
+    )
+    venv = InProcVectorEnv([env_fn for _ in range(3)])
+    venv.seed(0)
+    venv.reset()
+    # generators that only see the states of one env
+    ref_gens = [copy.deepcopy(env.rep_gen) for env in venv.obs_envs]
+
+    rng = np.random.default_rng(0)
+    for ids in [[0, 1, 2], [1, 2], [2], [0, 2], [1], [0, 1, 2], [2, 0]]:
+        for _ in range(3):
+            actions = rng.integers(venv.action_space[0].n, size=len(ids))
+            obs, _, terminated, truncated, _ = venv.step(actions, id=ids)
+            for i, env_obs, done in zip(ids, obs, terminated | truncated):
+                env = venv.obs_envs[i]
+                assert np.array_equal(env_obs, ref_gens[i].generate_observation(env.deferred_obs_state))
+                if done:
+                    venv.reset(id=[i])
+                    ref_gens[i] = copy.deepcopy(env.rep_gen)
+    venv.close()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from utils.advanced_item_encoder import PlaceHolderItemEncoder
+from utils.inventory_encoder import InventoryEncoder
+
+
+def _item_encoder():
+    item_encoder = PlaceHolderItemEncoder({"air": 0, "oak_log": 1, "stick": 2})
+    item_encoder.alloc_placeholders(2)
+    return item_encoder
+
+
+def test_counts_match_slots():
+    inventory_encoder = InventoryEncoder(_item_encoder())
+    slots = {
+        "slots": [
+            {"item": "oak_log", "count": 3},
+            {"item": "stick", "count": 0},
+            {"item": "air", "count": 0},
+        ]
+    }
+    counts = {"counts": {"oak_log": 3}}
+    from_slots = inventory_encoder.encode(slots, np.zeros(5, dtype=int))
+    from_counts = inventory_encoder.encode(counts, np.zeros(5, dtype=int))
+    assert from_slots.tolist() == [0, 3, 0, 0, 0]
+    assert np.array_equal(from_slots, from_counts)
+
+
+def test_new_item_uses_placeholder():
+    item_encoder = _item_encoder()
+    inventory_encoder = InventoryEncoder(item_encoder)
+    out = inventory_encoder.encode({"counts": {"pogo_stick": 1}}, np.zeros(5, dtype=int))
+    assert out[item_encoder.item_list["pogo_stick"]] == 1
+    out = inventory_encoder.encode({"counts": {"pogo_stick": 2}}, np.zeros(5, dtype=int))
+    assert out[item_encoder.item_list["pogo_stick"]] == 2
+
+
+def test_id_to_index():
+    inventory_encoder = InventoryEncoder(_item_encoder(), {1: 1, 2: 0})
+    out = inventory_encoder.encode({"counts": {"oak_log": 3, "stick": 4}}, np.zeros(2, dtype=int))
+    assert out.tolist() == [4, 3]
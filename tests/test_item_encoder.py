@@ -17,3 +17,17 @@ def test_item_encoder():
     assert item_encoder.reverse_look_up_table == {0: "air", 1: "oak_log", 2: "plank"}
 
 # TODO test it with lidar
+
+
+def test_version():
+    item_encoder = PlaceHolderItemEncoder({"air": 0}, placeholder_count=1)
+    version = item_encoder.version
+    item_encoder.get_id("air")
+    assert item_encoder.version == version
+    # taking a placeholder and allocating a new id both change the encoding
+    item_encoder.get_id("oak_log")
+    assert item_encoder.version == version + 1
+    item_encoder.get_id("plank")
+    assert item_encoder.version == version + 2
+    item_encoder.create_alias({"log": "oak_log"})
+    assert item_encoder.version == version + 3
@@ -1,12 +1,13 @@
 from utils.advanced_item_encoder import PlaceHolderItemEncoder
-from utils.env_reward_rapidlearn import RapidLearnRewardGenerator, parse_failed_action_statement
+from utils.env_reward_rapidlearn import RapidLearnRewardGenerator
 from utils.pddl_utils import generate_obj_types, get_entities
 
 import json
-from obs_convertion import LidarAll
+from obs_convertion import LidarAll, OnlyFacingObs
 from gym_novel_gridworlds2.utils.json_parser import load_json, ConfigParser
 import numpy as np
 import os
+import pytest
 
 JSON_CONFIG_PATH = "config/polycraft_gym_main.yaml"
 
@@ -18,3 +19,25 @@ def test_observation_space():
     print(obs_space)
     print(obs_space.shape)
     assert obs_space.shape == ((len(all_objects.items()) + len(all_entities.items()) + 1) * (8 + 1) + 1,)
+
+
+@pytest.mark.parametrize("RepGenerator", [LidarAll, OnlyFacingObs])
+def test_batched_observations(RepGenerator):
+    with open("tests/test_json/example_json.json") as f:
+        json_input = json.load(f)
+    # observations of the per-state implementation before the batched one
+    with open("tests/test_json/lidar_reference.json") as f:
+        reference = json.load(f)[RepGenerator.__name__]
+    lidar = RepGenerator(json_input={**json_input, "actionSet": ["nop"]})
+
+    facings = ["north", "south", "east", "west"]
+    states = []
+    for facing in facings:
+        state = json.loads(json.dumps(json_input["state"]))
+        state["player"]["facing"] = facing
+        states.append(state)
+    batched = lidar.generate_observations(states)
+    assert batched.shape == (len(states), len(reference["north"]))
+    for facing, state, obs in zip(facings, states, batched):
+        assert np.array_equal(obs, reference[facing])
+        assert np.array_equal(lidar.generate_observation(state), reference[facing])
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+from obs_convertion import LocalMap
+
+# cell in front of the player for each facing, the map being indexed [x, y]
+FRONT_OFFSETS = {
+    "north": (-1, 0),
+    "south": (1, 0),
+    "east": (0, 1),
+    "west": (0, -1),
+}
+
+
+def _load_state():
+    with open("tests/test_json/example_json.json") as f:
+        json_input = json.load(f)
+    return {**json_input, "actionSet": ["nop"]}, json_input["state"]
+
+
+@pytest.mark.parametrize("facing", list(FRONT_OFFSETS.keys()))
+def test_facing_is_up(facing):
+    json_input, state = _load_state()
+    local_map = LocalMap(json_input=json_input, radius=2)
+    state = json.loads(json.dumps(state))
+    state["player"]["facing"] = facing
+
+    world_map, min_coord, _ = local_map._generate_map(state)
+    x, y = np.array(state["player"]["pos"]) - min_coord
+    dx, dy = FRONT_OFFSETS[facing]
+
+    obs = local_map.generate_observation(state)
+    crop = obs[:25].reshape(5, 5)
+    assert crop[2, 2] == world_map[x, y]
+    assert crop[1, 2] == world_map[x + dx, y + dy]
+    assert local_map.observation_space.contains(obs)
+
+
+def test_one_hot_matches_ids():
+    json_input, state = _load_state()
+    ids = LocalMap(json_input=json_input, radius=3)
+    one_hot = LocalMap(json_input=json_input, radius=3, one_hot=True)
+
+    num_cells = 7 * 7
+    id_obs = ids.generate_observation(state)
+    one_hot_obs = one_hot.generate_observation(state)
+    assert one_hot.observation_space.contains(one_hot_obs)
+    cells = one_hot_obs[:num_cells * one_hot.max_item_type_count].reshape(num_cells, -1)
+    assert np.array_equal(cells.argmax(axis=1), id_obs[:num_cells])
+    assert np.array_equal(one_hot_obs[num_cells * one_hot.max_item_type_count:], id_obs[num_cells:])
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+import torch
+from tianshou.data import Batch
+
+from obs_convertion import Matrix
+from net.matrix_net import MatrixNet, MatrixCriticNet
+
+
+def _load_matrix():
+    with open("tests/test_json/example_json.json") as f:
+        json_input = json.load(f)
+    return Matrix(json_input={**json_input, "actionSet": ["nop"]}), json_input["state"]
+
+
+def test_observation_in_space():
+    matrix, state = _load_matrix()
+    obs = matrix.generate_observation(state)
+    for key, space in matrix.observation_space.items():
+        assert space.contains(obs[key])
+
+
+def test_local_view_centered_on_player():
+    matrix, state = _load_matrix()
+    world_map, min_coord, _ = matrix._generate_map(state)
+    x, y = np.array(state["player"]["pos"]) - min_coord
+
+    local_view = matrix._generate_local_view((x, y), world_map)
+    half = matrix.local_view_size // 2
+    assert local_view[half, half] == world_map[x, y]
+    assert local_view[half + 1, half] == world_map[x + 1, y]
+    assert local_view[half, half + 1] == world_map[x, y + 1]
+
+
+def test_batched_net():
+    matrix, state = _load_matrix()
+    obs = Batch.stack([Batch(matrix.generate_observation(state))] * 4)
+
+    actor = MatrixNet(matrix.observation_space, 7, softmax=True)
+    probs, _ = actor(obs)
+    assert probs.shape == (4, 7)
+    assert probs.dtype == torch.float32
+    assert torch.allclose(probs.sum(dim=1), torch.ones(4))
+
+    critic = MatrixCriticNet(matrix.observation_space)
+    assert critic(obs).shape == (4, 1)
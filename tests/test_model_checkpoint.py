@@ -0,0 +1,58 @@
+import os
+import threading
+
+import pytest
+import torch
+
+from utils.model_checkpoint import CHECKPOINT_NAME, CheckpointWriter, to_cpu
+
+
+def test_to_cpu_copies():
+    weight = torch.ones(3)
+    state = {"model": {"weight": weight}, "optim": {"state": [weight]}}
+    copied = to_cpu(state)
+    weight += 1
+    assert torch.equal(copied["model"]["weight"], torch.ones(3))
+    # shared tensors are copied once
+    assert copied["model"]["weight"] is copied["optim"]["state"][0]
+
+
+def test_rolling_checkpoints(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), num_rolling=2)
+    model = torch.nn.Linear(2, 1)
+    for epoch in range(1, 5):
+        with torch.no_grad():
+            model.weight.fill_(epoch)
+        writer.save_rolling(epoch, {"model": model.state_dict()})
+    writer.save({"best_policy.pth": model.state_dict()})
+    writer.close()
+
+    assert writer.list_rolling() == [3, 4]
+    latest = torch.load(os.path.join(tmp_path, CHECKPOINT_NAME))
+    assert torch.equal(latest["model"]["weight"], torch.full((1, 2), 4.0))
+    assert os.path.exists(os.path.join(tmp_path, "best_policy.pth"))
+    assert not any(file_name.endswith(".tmp") for file_name in os.listdir(tmp_path))
+
+
+def test_saves_do_not_wait_for_the_writer(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), max_pending=2)
+    release = threading.Event()
+    writer._executor.submit(release.wait)
+
+    # queued behind the blocked writer, like save_best_fn and save_checkpoint_fn in one epoch
+    best = writer.save({"best_policy.pth": {"weight": torch.ones(1)}})
+    rolling = writer.save_rolling(1, {"model": {"weight": torch.ones(1)}})
+    assert not best.done() and not rolling.done()
+
+    release.set()
+    writer.close()
+    assert os.path.exists(os.path.join(tmp_path, "best_policy.pth"))
+    assert writer.list_rolling() == [1]
+
+
+def test_write_errors_are_raised(tmp_path):
+    writer = CheckpointWriter(os.path.join(tmp_path, "missing"))
+    writer.save({"best_policy.pth": {}}).exception()
+    with pytest.raises(RuntimeError, match="does not exist"):
+        writer.save({"best_policy.pth": {}})
+    writer.close()
@@ -0,0 +1,72 @@
+import copy
+import json
+
+import numpy as np
+
+from obs_convertion import PathDistance
+
+
+def _load_state():
+    with open("tests/test_json/example_json.json") as f:
+        json_input = json.load(f)
+    return {**json_input, "actionSet": ["nop"]}, json_input["state"]
+
+
+def _walled_state(state):
+    """
+    5x7 room, the player at 2,0 and a log at 2,3 behind a wall with a
+    gap at x = 4:
+        . . W . . . W
+        . . W . . . .
+        P . W L . . .
+        . . W . . . .
+        . . . . . . W
+    """
+    state = copy.deepcopy(state)
+    state["map"] = {"0,6": "wall", "4,6": "wall", "2,0": "self", "2,3": "oak_log"}
+    for x in range(4):
+        state["map"]["{},2".format(x)] = "wall"
+    state["player"] = {"pos": [2, 0], "facing": "east"}
+    return state
+
+
+def _distance(path_distance, obs, item):
+    return obs[path_distance.items_id_lidar[path_distance.item_encoder.get_id(item)]]
+
+
+def test_detour_around_wall():
+    json_input, state = _load_state()
+    path_distance = PathDistance(json_input=json_input)
+    state = _walled_state(state)
+
+    obs = path_distance.generate_observation(state)
+    assert path_distance.observation_space.contains(obs)
+    # around the wall through 4,2, next to the log at 3,3
+    assert _distance(path_distance, obs, "oak_log") == 7
+    assert _distance(path_distance, obs, "wall") == 2
+
+    # closing the gap makes the log unreachable
+    state["map"]["4,2"] = "wall"
+    obs = path_distance.generate_observation(state)
+    assert _distance(path_distance, obs, "oak_log") == 0
+
+
+def test_reused_until_move():
+    json_input, state = _load_state()
+    path_distance = PathDistance(json_input=json_input)
+    state = _walled_state(state)
+
+    path_distance.generate_observation(state)
+    distances = path_distance._path_caches[0].distances
+    # crafting or selecting does not change the map or the position
+    state["player"]["facing"] = "north"
+    state["inventory"]["selectedItem"] = "oak_log"
+    path_distance.generate_observation(state)
+    assert path_distance._path_caches[0].distances is distances
+
+    del state["map"]["2,0"]
+    state["map"]["3,0"] = "self"
+    state["player"]["pos"] = [3, 0]
+    obs = path_distance.generate_observation(state)
+    assert path_distance._path_caches[0].distances is not distances
+    assert _distance(path_distance, obs, "oak_log") == 6
@@ -1,3 +1,4 @@
+from utils import pddl_utils
 from utils.pddl_utils import KnowledgeBase
 from utils.plan_utils import call_planner
 from gym_novel_gridworlds2.utils.json_parser import load_json, ConfigParser
@@ -24,6 +25,30 @@ def test_plan():
         print(t)
 
 
+def test_type_tables_cached_per_content(monkeypatch):
+    config_paths = ["config/polycraft_gym_rl_single.yaml"]
+    KnowledgeBase(config=config_paths)
+    all_actions = pddl_utils.get_all_actions(config_paths)
+
+    num_parsed = 0
+    generate_obj_types = pddl_utils._generate_obj_types
+    def counting_generate_obj_types(*args, **kwargs):
+        nonlocal num_parsed
+        num_parsed += 1
+        return generate_obj_types(*args, **kwargs)
+    monkeypatch.setattr(pddl_utils, "_generate_obj_types", counting_generate_obj_types)
+    monkeypatch.setattr(pddl_utils, "ConfigParser", None)
+
+    # every call loads a new copy of the config
+    for _ in range(3):
+        kb = KnowledgeBase(config=config_paths)
+        assert pddl_utils.get_all_actions(config_paths) == all_actions
+    assert num_parsed == 0
+
+    # a modified config gets its own tables
+    kb.config["entities"]["new_trader"] = {"id": 1234, "type": "trader"}
+    assert pddl_utils.get_entities(kb.config)["entity_1234"] == "trader"
+
 
 if __name__ == "__main__":
     test_generate_pddl()
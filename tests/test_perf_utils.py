@@ -0,0 +1,33 @@
+from utils.perf_utils import PerfRecorder, NULL_PERF_RECORDER
+
+
+def test_disabled_recorder():
+    with NULL_PERF_RECORDER.timer("lidar"):
+        pass
+    NULL_PERF_RECORDER.count("planner_calls")
+    NULL_PERF_RECORDER.tick()
+    assert NULL_PERF_RECORDER.pop_sample() is None
+    assert len(NULL_PERF_RECORDER.times) == 0
+
+
+def test_sampled_recorder():
+    perf = PerfRecorder(enabled=True, sample_interval=2)
+    with perf.timer("lidar"):
+        pass
+    perf.count("planner_calls")
+    perf.tick()
+    assert perf.pop_sample() is None
+
+    with perf.timer("lidar"):
+        pass
+    perf.tick()
+    sample = perf.pop_sample()
+    assert sample["sampled"] == 1
+    assert sample["steps"] == 2
+    assert sample["lidar_calls"] == 1
+    assert sample["planner_calls"] == 0.5
+    assert sample["lidar_ms"] >= 0
+
+    # a new window is started after the sample
+    assert perf.steps == 0
+    assert perf.pop_sample() is None
@@ -0,0 +1,79 @@
+import pytest
+
+from utils import plan_utils
+from utils.plan_utils import _output_to_plan, get_translation_table, plan_to_action_indices, translate_action
+from utils.planner_telemetry import PLANNER_TELEMETRY, PlannerTelemetry
+
+FF_OUTPUT = """
+ff: parsing domain file
+domain 'POLYCRAFT_GENERATED' defined
+ ... done.
+
+Cueing down from goal distance:    3 into depth [1]
+                                   2            [1]
+
+ff: found legal plan as follows
+
+step    0: APPROACH AIR OAK_LOG
+        1: BREAK OAK_LOG
+        2: SELECT AIR IRON_PICKAXE
+        3: CRAFT_PLANKS
+        4: REACH-GOAL
+
+time spent:    0.00 seconds instantiating 120 easy, 0 hard action templates
+               0.00 seconds total time
+"""
+
+PDDL_DOMAIN = """
+(:action approach
+    :parameters    (?physobj01 - physobj ?physobj02 - physobj )
+)
+(:action break
+    :parameters    (?physobj - hand_breakable)
+)
+(:action select
+    :parameters    (?prev_holding - physobj ?obj_to_select - physobj)
+)
+; (:action collect_from_safe
+(:action craft_planks
+    :parameters ()
+)
+"""
+
+
+def test_output_to_plan():
+    plan, translated = _output_to_plan(FF_OUTPUT)
+    assert plan == [
+        ("approach", "air", "oak_log"),
+        ("break", "oak_log"),
+        ("select", "air", "iron_pickaxe"),
+        ("craft_planks",),
+    ]
+    assert translated == ["approach_oak_log", "break_block", "select_iron_pickaxe", "craft_planks"]
+
+
+def test_output_to_plan_unsolvable():
+    assert _output_to_plan("ff: goal can be simplified to FALSE. No plan will solve it") == (None, None)
+    assert _output_to_plan("best first search space empty! problem proven unsolvable.") == (None, None)
+
+
+def test_translation_table():
+    table = get_translation_table(PDDL_DOMAIN)
+    assert set(table.keys()) == {"approach", "break", "select", "craft_planks"}
+    plan, translated = _output_to_plan(FF_OUTPUT, table)
+    assert translated == [translate_action(action) for action in plan]
+
+
+def test_plan_to_action_indices():
+    action_index = {"approach_oak_log": 3, "break_block": 1, "craft_planks": 7}
+    indices = plan_to_action_indices(["approach_oak_log", "break_block", "select_iron_pickaxe", "craft_planks"], action_index)
+    assert indices.tolist() == [3, 1, -1, 7]
+
+
+def test_call_planner_records_in_given_telemetry(monkeypatch):
+    monkeypatch.setattr(plan_utils, "FF_PATH", "/nonexistent/ff")
+    telemetry = PlannerTelemetry()
+    with pytest.raises(OSError):
+        plan_utils.call_planner("domain.pddl", "problem.pddl", telemetry=telemetry)
+    assert telemetry.pop_summary()["crash_rate"] == 1
+    assert PLANNER_TELEMETRY.pop_summary() is None
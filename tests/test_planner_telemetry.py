@@ -0,0 +1,56 @@
+import json
+
+from utils.planner_telemetry import PlannerTelemetry, PlannerOutcome
+
+
+def test_empty_summary():
+    telemetry = PlannerTelemetry()
+    assert telemetry.pop_summary() is None
+
+
+def test_summary():
+    telemetry = PlannerTelemetry()
+    problem_size = {"num_objects": 10, "num_init_facts": 30}
+    telemetry.record(0.004, PlannerOutcome.PLAN, 6, problem_size)
+    telemetry.record(0.1, PlannerOutcome.TIMEOUT, 0, problem_size)
+
+    summary = telemetry.pop_summary()
+    assert summary["sampled"] == 1
+    assert summary["calls"] == 2
+    assert summary["plan_rate"] == 0.5
+    assert summary["timeout_rate"] == 0.5
+    assert summary["crash_rate"] == 0
+    # the timeout has no plan
+    assert summary["mean_plan_len"] == 6
+    assert summary["mean_objects"] == 10
+    assert summary["mean_init_facts"] == 30
+    assert summary["max_ms"] == 100
+    assert summary["le_5ms"] == 0.5
+    assert summary["le_100ms"] == 1
+    assert summary["translation_cache_hit_rate"] == 0
+
+    # a new window is started after each summary
+    assert telemetry.pop_summary() is None
+
+    telemetry.record(0.01, PlannerOutcome.CRASH)
+    assert telemetry.pop_summary()["mean_plan_len"] == 0
+
+
+def test_translation_cache_hit_rate():
+    telemetry = PlannerTelemetry()
+    for hit in [False, True, True, True]:
+        telemetry.record_translation_lookup(hit)
+        telemetry.record(0.001, PlannerOutcome.PLAN, 1)
+    assert telemetry.pop_summary()["translation_cache_hit_rate"] == 0.75
+
+
+def test_trace(tmp_path):
+    telemetry = PlannerTelemetry()
+    telemetry.set_trace_dir(str(tmp_path))
+    telemetry.record(0.01, PlannerOutcome.UNSOLVABLE)
+    telemetry.record(0.02, PlannerOutcome.CRASH)
+
+    with open(telemetry.trace_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["outcome"] for record in records] == ["unsolvable", "crash"]
+    assert records[0]["num_objects"] == 0
@@ -0,0 +1,25 @@
+import time
+
+from utils.profile_utils import StackSampler
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stack_sampler(tmp_path):
+    out_path = str(tmp_path / "main.folded")
+    sampler = StackSampler(out_path, interval=0.001, dump_interval=0.01)
+    sampler.start()
+    _busy_wait(0.1)
+    sampler.stop()
+
+    with open(out_path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) > 0
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    assert any("_busy_wait (test_profile_utils.py" in line for line in lines)
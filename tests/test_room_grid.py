@@ -0,0 +1,46 @@
+from utils.room_grid import RoomGrid, NO_ROOM, get_room_grid
+
+
+def _room(start, end):
+    return {(x, y) for x in range(start[0], end[0] + 1) for y in range(start[1], end[1] + 1)}
+
+
+class _State:
+    """
+    The room_coords and get_map_size of a NovelGridWorlds state, with the
+    rooms of novelties/evaluation1/multi_rooms.
+    """
+    def __init__(self):
+        self.room_coords = [_room((10, 0), (15, 15)), _room((0, 0), (10, 15))]
+
+    def get_map_size(self):
+        return (17, 16)
+
+
+def _first_room(state, loc):
+    for coord in state.room_coords:
+        if tuple(loc) in coord:
+            return coord
+    return None
+
+
+def test_same_room_as_linear_search():
+    state = _State()
+    room_grid = RoomGrid(state.room_coords, state.get_map_size())
+    for x in range(-1, 18):
+        for y in range(-1, 17):
+            assert room_grid.room_coord([x, y]) is _first_room(state, [x, y])
+    # the shared wall belongs to the first room
+    assert room_grid.room_id([10, 3]) == 0
+    assert room_grid.room_id([16, 3]) == NO_ROOM
+
+
+def test_built_once_per_state():
+    state = _State()
+    room_grid = get_room_grid(state)
+    assert get_room_grid(state) is room_grid
+    assert get_room_grid(_State()) is not room_grid
+
+    state.room_coords = state.room_coords[:1]
+    assert get_room_grid(state) is not room_grid
+    assert get_room_grid(state).room_id([3, 3]) == NO_ROOM
@@ -0,0 +1,47 @@
+import json
+import os
+
+import numpy as np
+
+from utils.env_reward_rapidlearn import scan_tokens
+from utils.subgoal_compiler import compile_subgoals, step_increments
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+with open(os.path.join(path, 'init.json')) as f:
+    data = json.load(f)
+domain = data['domain'].encode().decode('unicode_escape')
+plan = scan_tokens(data['plan'], allow_multiple_statements=True)
+
+
+def test_step_increments():
+    assert step_increments(domain, ("break", "oak_log")) == {
+        ("inventory", "oak_log"): 1,
+        ("world", "air"): 1,
+        ("world", "oak_log"): -1,
+    }
+    assert step_increments(domain, ("approach", "air", "oak_log")) == {}
+    assert step_increments(domain, ("unknown_operator",)) == {}
+
+
+def test_compile_subgoals():
+    subgoal_plan = compile_subgoals(domain, plan)
+    subgoal_steps = [plan[step][0] for step in subgoal_plan.steps]
+    assert subgoal_steps[:5] == [
+        "break_holding_iron_pickaxe", "break_diamond_ore", "break", "craft_planks", "craft_stick"
+    ]
+    assert subgoal_steps[-1] == "craft_pogo_stick"
+    assert "air" not in subgoal_plan.items
+    assert subgoal_plan.describe(1) == {"inventory": {"diamond": 9}}
+    assert not subgoal_plan.world.any()
+
+    inventory_increase = subgoal_plan.counts({"diamond": 10}) - subgoal_plan.counts({"diamond": 1})
+    world_increase = np.zeros(len(subgoal_plan.items), dtype=int)
+    assert subgoal_plan.is_met(1, inventory_increase, world_increase)
+    assert not subgoal_plan.is_met(0, inventory_increase, world_increase)
+
+
+def test_world_subgoal():
+    subgoal_plan = compile_subgoals(domain, [("place", "crafting_table"), ("approach", "air", "oak_log")])
+    assert len(subgoal_plan) == 1
+    assert subgoal_plan.describe(0) == {"world": {"crafting_table": 1}}
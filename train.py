@@ -9,15 +9,20 @@ import pickle
 from torch.utils.tensorboard import SummaryWriter
 from ts_extensions.custom_logger import CustomTensorBoardLogger
 
-from args import parser, NOVELTIES, OBS_TYPES, HINTS, POLICIES, POLICY_PROPS, NOVEL_ACTIONS, OBS_GEN_ARGS, AVAILABLE_ENVS
-from utils.hint_utils import get_hinted_actions, get_novel_action_indices, get_hinted_items
-from utils.pddl_utils import get_all_actions, KnowledgeBase
-from policy_utils import create_policy
+from args import parser, get_default_device, OBS_TYPES, HINTS, POLICIES, POLICY_PROPS, NOVEL_ACTIONS, AVAILABLE_ENVS
+from utils.hint_utils import get_hinted_actions, get_novel_action_indices
+from utils.pddl_utils import get_all_actions
+from policy_utils import create_policy, create_policy_for_matrix
 from utils.train_utils import set_train_eps, create_save_best_fn, generate_min_rew_stop_fn, create_save_checkpoint_fn
+from utils.buffer_checkpoint import BufferCheckpointWriter, CheckpointVectorReplayBuffer, load_buffer_checkpoint
+from utils.model_checkpoint import CheckpointWriter
 
-from utils.make_env import make_env
+from utils.make_env import make_env, make_vector_env, get_config_file_paths, get_rep_gen_args
+from utils.profile_utils import start_stack_sampler
 
 args = parser.parse_args()
+if args.device is None:
+    args.device = get_default_device()
 seed = args.seed
 if seed == None:
     seed = np.random.randint(0, 10000000)
@@ -31,28 +36,22 @@ log_path = os.path.join(
     args.rl_algo,
     str(seed)
 )
+profile_dir = os.path.join(log_path, "profile") if args.profile else None
 
 
 if __name__ == "__main__":
     # novelty
     novelty_name = args.novelty
-    novelty_path = NOVELTIES.get(novelty_name)
-    config_file_paths = ["config/polycraft_gym_rl_single.yaml"]
-    if novelty_name is not None and novelty_name != "none":
-        config_file_paths.append(novelty_path)
+    config_file_paths = get_config_file_paths(novelty_name)
 
-    # object list
-    kb_tmp = KnowledgeBase(config=config_file_paths)
-    all_objects = kb_tmp.get_all_objects()
-    hinted_objects = get_hinted_items(all_objects, HINTS.get(novelty_name) or "", True)
+    # observation generator, with the object list and hints of the novelty
+    RepGenerator = OBS_TYPES[args.obs_type]
+    rep_gen_args = get_rep_gen_args(novelty_name, args.obs_type, config_file_paths)
+    hinted_objects = rep_gen_args["hinted_objects"]
 
     # action list
     all_actions = get_all_actions(config_file_paths)
 
-    # observation generator
-    RepGenerator = OBS_TYPES[args.obs_type]
-    rep_gen_args = OBS_GEN_ARGS.get(args.obs_type, {})
-
     # env
     if args.num_threads is None:
         if novelty_name == "none":
@@ -69,26 +68,29 @@ if __name__ == "__main__":
                     env_name=args.env, 
                     config_file_paths=config_file_paths,
                     RepGenerator=RepGenerator,
-                    rep_gen_args={
-                        "hints": HINTS.get(novelty_name) or "",
-                        "hinted_objects": hinted_objects,
-                        "novel_objects": [], # TODO
-                        "num_reserved_extra_objects": 2 if novelty_name == "none" else 0,
-                        "item_encoder_config_path": "config/items.json",
-                        **rep_gen_args
-                    },
-                    max_time_step=max_time_step
+                    rep_gen_args=rep_gen_args,
+                    max_time_step=max_time_step,
+                    perf_sample_interval=args.perf,
+                    planner_trace_dir=log_path if args.planner_trace else None,
+                    profile_dir=profile_dir
                 )
         for _ in range(num_threads)
     ]
     # tianshou env
-    venv = ts.env.SubprocVectorEnv(envs)
+    venv = make_vector_env(envs, args.vector_mode)
+    if profile_dir is not None:
+        # started after the env workers are forked, so that they only sample themselves
+        start_stack_sampler(profile_dir, "main")
 
     hints = str(HINTS.get(args.novelty))
     novel_actions = (NOVEL_ACTIONS.get(args.novelty) or []) + get_hinted_actions(all_actions, hints, True)
 
     # net
-    state_shape = venv.observation_space[0].shape or venv.observation_space[0].n
+    observation_space = venv.observation_space[0]
+    if isinstance(observation_space, gym.spaces.Dict):
+        state_shape = {key: space.shape for key, space in observation_space.items()}
+    else:
+        state_shape = observation_space.shape or observation_space.n
     action_shape = venv.action_space[0].shape or venv.action_space[0].n
 
     if args.hidden_sizes is not None:
@@ -100,13 +102,23 @@ if __name__ == "__main__":
         checkpoint = os.path.join(log_path, "checkpoint.pth")
     else:
         checkpoint = args.checkpoint
-    policy = create_policy(
-        args.rl_algo, state_shape, action_shape, 
-        all_actions, novel_actions, 
-        checkpoint=args.checkpoint, lr=args.lr, 
-        hidden_sizes=hidden_sizes,
-        device=args.device
-    )
+    if isinstance(observation_space, gym.spaces.Dict):
+        # spatial observations, e.g. matrix
+        policy = create_policy_for_matrix(
+            args.rl_algo, observation_space, venv.action_space[0],
+            all_actions, novel_actions,
+            checkpoint=args.checkpoint, lr=args.lr,
+            hidden_sizes=hidden_sizes,
+            device=args.device
+        )
+    else:
+        policy = create_policy(
+            args.rl_algo, state_shape, action_shape, 
+            all_actions, novel_actions, 
+            checkpoint=args.checkpoint, lr=args.lr, 
+            hidden_sizes=hidden_sizes,
+            device=args.device
+        )
 
     print("----------- Run Info -----------")
     print("using", num_threads, "threads")
@@ -141,15 +153,20 @@ if __name__ == "__main__":
     logger = CustomTensorBoardLogger(writer, epi_max_len=max_time_step, rew_min=rew_min)
 
     # collector
+    buffer_ckpt_dir = os.path.join(log_path, "buffer_ckpt")
     if args.resume:
         try:
-            path = os.path.join(log_path, "buffer_ckpt.pth")
-            train_buffer = ts.data.VectorReplayBuffer.load_hdf5(path)
-        except:
-            train_buffer = ts.data.VectorReplayBuffer(20000, buffer_num=num_threads)
+            train_buffer = load_buffer_checkpoint(buffer_ckpt_dir, 20000, buffer_num=num_threads)
+        except FileNotFoundError:
+            train_buffer = CheckpointVectorReplayBuffer(20000, buffer_num=num_threads)
     else:
-        train_buffer = ts.data.VectorReplayBuffer(20000, buffer_num=num_threads)
-    train_collector = ts.data.Collector(policy, venv, train_buffer, exploration_noise=True)
+        train_buffer = CheckpointVectorReplayBuffer(20000, buffer_num=num_threads)
+    buffer_writer = BufferCheckpointWriter(train_buffer, buffer_ckpt_dir, resume=args.resume)
+    checkpoint_writer = CheckpointWriter(log_path, num_rolling=args.num_checkpoints)
+    train_collector = ts.data.Collector(
+        policy, venv, train_buffer, exploration_noise=True,
+        preprocess_fn=logger.perf_preprocess_fn if args.perf > 0 else None
+    )
     test_collector = ts.data.Collector(policy, venv, exploration_noise=True)
     
     if novelty_name == "none":
@@ -180,11 +197,13 @@ if __name__ == "__main__":
             min_length=22, 
             min_rew_threshold=(950 if args.env == "pf" else 900)
         ),
-        save_best_fn=create_save_best_fn(log_path),
-        save_checkpoint_fn=create_save_checkpoint_fn(log_path, policy, train_buffer),
+        save_best_fn=create_save_best_fn(checkpoint_writer),
+        save_checkpoint_fn=create_save_checkpoint_fn(checkpoint_writer, policy, buffer_writer),
         logger=logger,
         resume_from_log=args.resume
     )
     
+    buffer_writer.close()
+    checkpoint_writer.close()
     print(f'Finished training! Use {result["duration"]}')
 
@@ -1,11 +1,67 @@
+from collections import defaultdict
 from tianshou.utils import TensorboardLogger
+from tianshou.data import Batch
 import numpy as np
 
+from utils.perf_utils import PERF_INFO_KEYS
+
 class CustomTensorBoardLogger(TensorboardLogger):
     def __init__(self, writer, epi_max_len, rew_min):
         super().__init__(writer)
         self.epi_max_len = epi_max_len
         self.rew_min = rew_min
+
+        # sums and counts of the sampled env perf and planner info,
+        # see utils/perf_utils.py and utils/planner_telemetry.py
+        self.perf_sums = defaultdict(float)
+        self.perf_counts = defaultdict(int)
+
+    def perf_preprocess_fn(self, **kwargs) -> Batch:
+        """
+        Used as the preprocess_fn of the collector. Gathers the sampled
+        perf and planner info of the envs without modifying the collected data.
+        """
+        info = kwargs.get("info")
+        if info is None or not isinstance(info, Batch):
+            return Batch()
+        for group in PERF_INFO_KEYS:
+            self._gather_perf_group(group, info.get(group))
+        return Batch()
+
+    def _gather_perf_group(self, group: str, sample) -> None:
+        if sample is None or not isinstance(sample, Batch) or "sampled" not in sample.keys():
+            return
+        sampled = np.asarray(sample.sampled) > 0
+        if not np.any(sampled):
+            return
+        # keys missing in the sample of an env are filled with 0 by the
+        # stacking, only the envs that marked them as present are counted
+        present = sample.get("present")
+        for key, value in sample.items():
+            if key == "sampled" or isinstance(value, Batch):
+                continue
+            mask = sampled
+            if isinstance(present, Batch):
+                mask = sampled & (np.asarray(present.get(key, 0)) > 0)
+                if not np.any(mask):
+                    continue
+            self.perf_sums[f"{group}/{key}"] += float(np.sum(np.asarray(value)[mask]))
+            self.perf_counts[f"{group}/{key}"] += int(np.sum(mask))
+
+    def log_train_data(self, collect_result: dict, step: int) -> None:
+        """
+        Logs the training statistics, plus the env perf info
+        as perf/* and planner/* if any has been sampled.
+        """
+        super().log_train_data(collect_result, step)
+        if len(self.perf_counts) > 0:
+            log_data = {
+                key: self.perf_sums[key] / self.perf_counts[key]
+                for key in self.perf_counts.keys()
+            }
+            self.write("train/env_step", step, log_data)
+            self.perf_sums.clear()
+            self.perf_counts.clear()
     
     def log_test_data(self, collect_result: dict, step: int) -> None:
         """Use writer to log statistics generated during evaluating.
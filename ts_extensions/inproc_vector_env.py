@@ -0,0 +1,124 @@
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.wrappers import TimeLimit
+from tianshou.env import DummyVectorEnv
+
+from envs import SingleAgentWrapper
+from utils.advanced_item_encoder import PlaceHolderItemEncoder
+
+
+def _find_deferrable_env(env: gym.Env) -> Optional[SingleAgentWrapper]:
+    """
+    Returns the SingleAgentWrapper under env if its observations reach the
+    vector env unchanged, i.e. if it is only wrapped in TimeLimit.
+    """
+    while isinstance(env, TimeLimit):
+        env = env.env
+    if type(env) is SingleAgentWrapper:
+        return env
+    return None
+
+
+def _save_encoder_state(encoder: PlaceHolderItemEncoder) -> tuple:
+    return (
+        dict(encoder.item_list), dict(encoder.reverse_look_up_table),
+        list(encoder.placeholders), encoder.curr_id
+    )
+
+
+def _restore_encoder_state(encoder: PlaceHolderItemEncoder, state: tuple):
+    item_list, reverse_look_up_table, placeholders, curr_id = state
+    encoder.item_list.clear()
+    encoder.item_list.update(item_list)
+    encoder.reverse_look_up_table = reverse_look_up_table
+    encoder.placeholders = placeholders
+    encoder.curr_id = curr_id
+    encoder.version += 1
+
+
+class InProcVectorEnv(DummyVectorEnv):
+    """
+    Steps all the envs in the main process, without the pickling and
+    IPC of the subprocess workers.
+
+    When every env is a (TimeLimit wrapped) SingleAgentWrapper, the envs
+    only keep the state of their observation, and the observations of all
+    the stepped envs are generated with one generate_observations call
+    when their generators allow it (see _generate_deferred_obs).
+    Otherwise it behaves like DummyVectorEnv.
+    """
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], **kwargs):
+        super().__init__(env_fns, **kwargs)
+        obs_envs = [_find_deferrable_env(worker.env) for worker in self.workers]
+        if all(env is not None for env in obs_envs):
+            for env in obs_envs:
+                env.defer_obs = True
+            self.obs_envs = obs_envs
+        else:
+            self.obs_envs = None
+        # item encoding -> small id, and (encoder, version, encoding id) of
+        # each env, so that the encodings are only compared when they change
+        self._encoding_ids: Dict[tuple, int] = {}
+        self._env_encodings: List[Optional[tuple]] = [None] * self.env_num
+
+    def reset(self, id: Optional[Union[int, List[int], np.ndarray]] = None, **kwargs):
+        obs, infos = super().reset(id, **kwargs)
+        if self.obs_envs is not None:
+            obs = self._generate_deferred_obs(self._wrap_id(id))
+        return obs, infos
+
+    def step(self, action: np.ndarray, id: Optional[Union[int, List[int], np.ndarray]] = None):
+        obs, rew, terminated, truncated, info = super().step(action, id)
+        if self.obs_envs is not None:
+            obs = self._generate_deferred_obs(self._wrap_id(id))
+        return obs, rew, terminated, truncated, info
+
+    def _encoding_id(self, env_id: int, encoder: PlaceHolderItemEncoder) -> int:
+        """
+        Id of the item encoding of an env, the same for the envs with the
+        same encoding.
+        """
+        cached = self._env_encodings[env_id]
+        if cached is None or cached[0] is not encoder or cached[1] != encoder.version:
+            encoding = tuple(sorted(encoder.item_list.items()))
+            encoding_id = self._encoding_ids.setdefault(encoding, len(self._encoding_ids))
+            cached = self._env_encodings[env_id] = (encoder, encoder.version, encoding_id)
+        return cached[2]
+
+    def _generate_deferred_obs(self, ids: Sequence[int]) -> np.ndarray:
+        """
+        Generates the observations of the given envs. The envs sharing the
+        same item encoding are generated in one batch by the observation
+        generator of the first of them, if the generator keeps no state
+        between calls (batch_across_envs). Otherwise, or if the batch would
+        add items to the shared encoder, every env uses its own generator.
+        """
+        envs = [self.obs_envs[i] for i in ids]
+        batches = {}
+        obs_list = [None] * len(envs)
+        for idx, (env_id, env) in enumerate(zip(ids, envs)):
+            if not env.rep_gen.batch_across_envs:
+                obs_list[idx] = env.rep_gen.generate_observation(env.deferred_obs_state)
+                continue
+            encoding_id = self._encoding_id(env_id, env.rep_gen.item_encoder)
+            batches.setdefault((type(env.rep_gen), encoding_id), []).append(idx)
+
+        for indices in batches.values():
+            rep_gen = envs[indices[0]].rep_gen
+            encoder_state = _save_encoder_state(rep_gen.item_encoder)
+            version = rep_gen.item_encoder.version
+            batch_obs = rep_gen.generate_observations([envs[idx].deferred_obs_state for idx in indices])
+            if rep_gen.item_encoder.version != version:
+                # new items are encoded by each env, in the order it sees them
+                _restore_encoder_state(rep_gen.item_encoder, encoder_state)
+                batch_obs = [
+                    envs[idx].rep_gen.generate_observation(envs[idx].deferred_obs_state) for idx in indices
+                ]
+            for idx, obs in zip(indices, batch_obs):
+                obs_list[idx] = obs
+        try:
+            return np.stack(obs_list)
+        except ValueError:  # different len(obs)
+            return np.array(obs_list, dtype=object)
@@ -8,6 +8,9 @@ class PlaceHolderItemEncoder:
     def __init__(self, item_list=None, initial_id=1, id_limit=0, placeholder_count=0):
         self.curr_id = initial_id - 1
         self.item_list: Mapping[str, int] = {}
+        # incremented whenever the encoding changes, so that users can
+        # tell if what they derived from item_list is still valid
+        self.version = 0
         self.reverse_look_up_table = {}
         self.id_limit = id_limit
         if item_list is not None:
@@ -37,6 +40,7 @@ class PlaceHolderItemEncoder:
             self.curr_id = max(value, self.curr_id)
             self.reverse_look_up_table[value] = key
         self.item_list = item_list
+        self.version += 1
 
 
     def load_json(self, file_name: str):
@@ -73,6 +77,7 @@ class PlaceHolderItemEncoder:
                 self.curr_id += 1
                 self.item_list[key] = self.curr_id
                 self.reverse_look_up_table[self.curr_id] = key
+            self.version += 1
             return self.curr_id
     
     def modify_name(self, old_key, new_key, remove_old=False):
@@ -88,6 +93,7 @@ class PlaceHolderItemEncoder:
             self.item_list[new_key] = self.item_list[old_key]
             if remove_old:
                 del self.item_list[old_key]
+            self.version += 1
     
     def reverse_look_up(self, id: int):
         return self.reverse_look_up_table[id]
@@ -99,6 +105,7 @@ class PlaceHolderItemEncoder:
         for alias, key in alias_dict.items():
             if key in self.item_list and alias not in self.item_list:
                 self.item_list[alias] = self.item_list[key]
+                self.version += 1
 
     def save_json(self, file_name: str):
         """
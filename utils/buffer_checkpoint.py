@@ -0,0 +1,190 @@
+# Incremental checkpoints of the replay buffer.
+#
+# Saving the whole VectorReplayBuffer with save_hdf5 rewrites every slot
+# on every checkpoint, from the training loop. Instead, the buffer
+# records the slots written since the last checkpoint, and a checkpoint
+# only copies those rows and appends them, with the state of the buffer,
+# as a new compressed HDF5 segment. The segment is written on a
+# background thread and renamed into place when complete, so a job
+# preempted while writing keeps the previous checkpoint.
+# Loading replays the segments in order. When the segments hold more
+# rows than COMPACT_RATIO times the buffer, the next checkpoint writes
+# every row as one segment and removes the older ones.
+
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import h5py
+import numpy as np
+import tianshou as ts
+from tianshou.data import Batch
+from tianshou.data.batch import _alloc_by_keys_diff, _create_value
+from tianshou.data.utils.converter import from_hdf5, to_hdf5
+
+SEGMENT_PATTERN = re.compile(r"^segment_(\d+)\.h5$")
+COMPACT_RATIO = 2
+COMPRESSION = "gzip"
+
+
+class CheckpointVectorReplayBuffer(ts.data.VectorReplayBuffer):
+    """
+    VectorReplayBuffer recording the slots written since the last
+    checkpoint (see BufferCheckpointWriter).
+    """
+    def __init__(self, total_size: int, buffer_num: int, **kwargs):
+        super().__init__(total_size, buffer_num, **kwargs)
+        self.dirty = np.zeros(self.maxsize, dtype=bool)
+
+    def add(self, batch: Batch, buffer_ids=None):
+        result = super().add(batch, buffer_ids)
+        self.dirty[result[0]] = True
+        return result
+
+
+def _segment_path(checkpoint_dir: str, segment_id: int) -> str:
+    return os.path.join(checkpoint_dir, f"segment_{segment_id:06d}.h5")
+
+
+def _list_segments(checkpoint_dir: str) -> List[int]:
+    if not os.path.isdir(checkpoint_dir):
+        return []
+    segment_ids = []
+    for file_name in os.listdir(checkpoint_dir):
+        match = SEGMENT_PATTERN.match(file_name)
+        if match is not None:
+            segment_ids.append(int(match.group(1)))
+    return sorted(segment_ids)
+
+
+def _get_buffer_state(buffer: ts.data.VectorReplayBuffer) -> dict:
+    """
+    The indices of the buffer and of its sub-buffers, see ReplayBufferManager.
+    """
+    return {
+        "last_index": buffer.last_index.copy(),
+        "lengths": buffer._lengths.copy(),
+        "index": np.array([buf._index for buf in buffer.buffers]),
+        "size": np.array([buf._size for buf in buffer.buffers]),
+        "ep_rew": np.array([buf._ep_rew for buf in buffer.buffers]),
+        "ep_len": np.array([buf._ep_len for buf in buffer.buffers]),
+        "ep_idx": np.array([buf._ep_idx for buf in buffer.buffers]),
+    }
+
+
+def _set_buffer_state(buffer: ts.data.VectorReplayBuffer, state: dict):
+    buffer.last_index = state["last_index"].copy()
+    buffer._lengths = state["lengths"].copy()
+    for i, buf in enumerate(buffer.buffers):
+        buf._index = int(state["index"][i])
+        buf._size = int(state["size"][i])
+        buf.last_index = np.array([state["last_index"][i] - buffer._offset[i]])
+        buf._ep_rew = state["ep_rew"][i]
+        buf._ep_len = int(state["ep_len"][i])
+        buf._ep_idx = int(state["ep_idx"][i])
+
+
+def _write_segment(path: str, indices: np.ndarray, rows: Batch, state: dict):
+    tmp_path = path + ".tmp"
+    with h5py.File(tmp_path, "w") as f:
+        to_hdf5({"indices": indices, "rows": rows, "state": state}, f, compression=COMPRESSION)
+    os.replace(tmp_path, path)
+
+
+class BufferCheckpointWriter:
+    """
+    Writes the incremental checkpoints of a CheckpointVectorReplayBuffer
+    into checkpoint_dir, one segment file per checkpoint.
+    The segments of a previous run are kept when resuming (the buffer was
+    loaded from them), and removed otherwise.
+    """
+    def __init__(self, buffer: CheckpointVectorReplayBuffer, checkpoint_dir: str, resume: bool = False):
+        self.buffer = buffer
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        segment_ids = _list_segments(checkpoint_dir)
+        if not resume:
+            for segment_id in segment_ids:
+                os.remove(_segment_path(checkpoint_dir, segment_id))
+            segment_ids = []
+        self.next_segment_id = segment_ids[-1] + 1 if len(segment_ids) > 0 else 0
+        # number of rows in the segments, to know when to compact them
+        self.stored_rows = 0
+        for segment_id in segment_ids:
+            with h5py.File(_segment_path(checkpoint_dir, segment_id), "r") as f:
+                self.stored_rows += len(f["indices"])
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="buffer_ckpt")
+        self._pending: Optional[Future] = None
+
+    def save(self) -> Future:
+        """
+        Snapshots the rows written since the last checkpoint and writes
+        them on the background thread. Waits for the previous write, so
+        that at most one snapshot is held in memory, and raises its error.
+        """
+        self.wait()
+        buffer = self.buffer
+        compact = self.stored_rows + np.count_nonzero(buffer.dirty) > COMPACT_RATIO * buffer.maxsize
+        if compact:
+            # every row of the sub-buffers
+            indices = np.concatenate([
+                offset + np.arange(buf._size) for offset, buf in zip(buffer._offset, buffer.buffers)
+            ])
+            previous_segments = _list_segments(self.checkpoint_dir)
+        else:
+            indices = np.flatnonzero(buffer.dirty)
+            previous_segments = []
+        rows = buffer._meta[indices] if len(indices) > 0 else Batch()
+        state = _get_buffer_state(buffer)
+        buffer.dirty[:] = False
+
+        segment_path = _segment_path(self.checkpoint_dir, self.next_segment_id)
+        self.next_segment_id += 1
+        self.stored_rows = len(indices) if compact else self.stored_rows + len(indices)
+
+        def write():
+            _write_segment(segment_path, indices, rows, state)
+            for segment_id in previous_segments:
+                os.remove(_segment_path(self.checkpoint_dir, segment_id))
+        self._pending = self._executor.submit(write)
+        return self._pending
+
+    def wait(self):
+        """
+        Waits for the pending write, if any.
+        """
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+
+def load_buffer_checkpoint(checkpoint_dir: str, total_size: int, buffer_num: int) -> CheckpointVectorReplayBuffer:
+    """
+    Rebuilds the buffer from the segments in checkpoint_dir.
+    Raises FileNotFoundError if there is no checkpoint.
+    """
+    segment_ids = _list_segments(checkpoint_dir)
+    if len(segment_ids) == 0:
+        raise FileNotFoundError("No buffer checkpoint in " + checkpoint_dir)
+
+    buffer = CheckpointVectorReplayBuffer(total_size, buffer_num)
+    state = None
+    for segment_id in segment_ids:
+        with h5py.File(_segment_path(checkpoint_dir, segment_id), "r") as f:
+            segment = from_hdf5(f)
+        indices, rows, state = segment["indices"], segment["rows"], segment["state"]
+        if len(indices) == 0:
+            continue
+        if buffer._meta.is_empty():
+            buffer._meta = _create_value(rows, buffer.maxsize, stack=False)
+        else:
+            _alloc_by_keys_diff(buffer._meta, rows, buffer.maxsize, False)
+        buffer._set_batch_for_children()
+        buffer._meta[indices] = rows
+    _set_buffer_state(buffer, state)
+    return buffer
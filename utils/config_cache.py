@@ -0,0 +1,127 @@
+# Process-wide cache of the resolved NovelGridWorlds configs.
+#
+# Resolving a config ("extends" chain + novelty files) parses a number of
+# yaml / json files. The resolved config is cached per process, keyed by the
+# paths and the modification times of every file in the "extends" chain,
+# and can optionally be serialized to disk so that freshly spawned env
+# workers do not need to parse the yaml files again.
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+from gym_novel_gridworlds2.utils.json_parser import load_json
+
+# set to a directory to also cache the resolved configs on disk
+CONFIG_CACHE_DIR = os.environ.get("NOVELGYM_CONFIG_CACHE_DIR")
+
+EXTENDS_REGEX = re.compile(r'^\s*"?extends"?\s*:\s*"?([^"\s,]+)"?', re.MULTILINE)
+
+# cache key -> pickled resolved config
+_resolved_config_cache: Dict[tuple, bytes] = {}
+
+
+def _find_config_dependencies(config_path: str, visited=None) -> List[str]:
+    """
+    Returns the list of files the config depends on, by following the
+    "extends" statements. Only scans the text, does not parse the file.
+    """
+    if visited is None:
+        visited = set()
+    config_path = os.path.abspath(config_path)
+    if config_path in visited:
+        return []
+    visited.add(config_path)
+    dependencies = [config_path]
+    try:
+        with open(config_path, "r") as f:
+            content = f.read()
+    except OSError:
+        return dependencies
+    for extended in EXTENDS_REGEX.findall(content):
+        extended_path = os.path.join(os.path.dirname(config_path), extended)
+        dependencies += _find_config_dependencies(extended_path, visited)
+    return dependencies
+
+
+def _config_cache_key(config_file_paths: Tuple[str, ...]) -> tuple:
+    """
+    Key of a resolved config: the requested paths, and the modification
+    time of every file in their "extends" chains.
+    """
+    visited = set()
+    mtimes = []
+    for path in config_file_paths:
+        for dependency in _find_config_dependencies(path, visited):
+            try:
+                mtimes.append((dependency, os.stat(dependency).st_mtime_ns))
+            except OSError:
+                mtimes.append((dependency, None))
+    return (config_file_paths, tuple(mtimes))
+
+
+def _disk_cache_path(cache_dir: str, key: tuple) -> str:
+    key_hash = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"config_{key_hash}.pkl")
+
+
+def _read_disk_cache(cache_dir: str, key: tuple) -> Optional[bytes]:
+    try:
+        with open(_disk_cache_path(cache_dir, key), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk_cache(cache_dir: str, key: tuple, blob: bytes):
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temp file and rename so that concurrent workers never read half-written files
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, _disk_cache_path(cache_dir, key))
+
+
+def config_cache_key(config_file_paths: Union[str, List[str]]) -> tuple:
+    """
+    Key of the config load_config(config_file_paths) resolves to. Changes
+    when any file of the configs is modified.
+    """
+    if isinstance(config_file_paths, str):
+        return (True,) + _config_cache_key((config_file_paths,))
+    return (False,) + _config_cache_key(tuple(config_file_paths))
+
+
+def load_config(config_file_paths: Union[str, List[str]], cache_dir: Optional[str] = None) -> dict:
+    """
+    Loads and resolves the config(s), equivalent to
+    load_json(path) for a single path or 
+    load_json(config_json={"extends": paths}) for a list of paths.
+
+    Each call returns an independent copy, so callers can modify the config.
+    cache_dir: if set (or if NOVELGYM_CONFIG_CACHE_DIR is set), the resolved
+               config is also cached on disk.
+    """
+    if isinstance(config_file_paths, str):
+        paths = (config_file_paths,)
+    else:
+        paths = tuple(config_file_paths)
+    cache_dir = cache_dir or CONFIG_CACHE_DIR
+
+    key = config_cache_key(config_file_paths)
+    blob = _resolved_config_cache.get(key)
+    if blob is None and cache_dir is not None:
+        blob = _read_disk_cache(cache_dir, key)
+    if blob is None:
+        if isinstance(config_file_paths, str):
+            config = load_json(config_file_paths)
+        else:
+            config = load_json(config_json={"extends": list(paths)}, verbose=False)
+        blob = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+        if cache_dir is not None:
+            _write_disk_cache(cache_dir, key, blob)
+    _resolved_config_cache[key] = blob
+    return pickle.loads(blob)
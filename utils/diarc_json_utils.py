@@ -2,6 +2,8 @@ from gym_novel_gridworlds2.contrib.polycraft.states import PolycraftState
 from gym_novel_gridworlds2.state.dynamic import Dynamic
 from gym_novel_gridworlds2.contrib.polycraft.objects import PolycraftEntity
 from .pddl_utils import generate_obj_types, simplified_name_convert
+from .room_grid import get_room_grid
+from .failed_action import FailedAction
 
 from typing import List, Tuple, Optional
 
@@ -11,46 +13,53 @@ def generate_diarc_json_from_state(
         player_id: int, 
         state: PolycraftState, 
         dynamic: Dynamic,
-        failed_action: tuple, 
+        failed_action: Optional[FailedAction], 
         success: bool,
         object_types: Optional[List[Tuple[str, str]]] = None,
+        include_slots: bool = True,
     ):
+    """
+    The json of the state, as seen by the player.
+    The inventory counts are in inventory.counts (item name -> count).
+    The inventory slots of every known item are only listed with
+    include_slots, for the consumers that need them; the observation
+    generators only need the counts.
+    """
     entity: PolycraftEntity = state.get_entity_by_id(player_id)
 
-    # item count
-    # need to put everything in the list so that RL knows what elements are there
-    inventory_dict = {}
-
-    # initialize the dict with every known item, excepting for entities
-    if object_types is None:
-        object_types = dynamic.all_objects
-    for item_name, item_type in dynamic.all_objects.items():
-        if item_type not in ["agent", "trader", "pogoist"]:
-            inventory_dict[item_name] = 0
-    # fill in the actual counts
-    for item_name, count in entity.inventory.items():
-        inventory_dict[item_name] = count
-    
     inventory_info = {
-        "slots": [
+        "counts": dict(entity.inventory),
+        "selectedItem": entity.selectedItem or "air"
+    }
+
+    if include_slots:
+        # item count
+        # need to put everything in the list so that RL knows what elements are there
+        inventory_dict = {}
+
+        # initialize the dict with every known item, excepting for entities
+        if object_types is None:
+            object_types = dynamic.all_objects
+        for item_name, item_type in dynamic.all_objects.items():
+            if item_type not in ["agent", "trader", "pogoist"]:
+                inventory_dict[item_name] = 0
+        # fill in the actual counts
+        for item_name, count in entity.inventory.items():
+            inventory_dict[item_name] = count
+
+        inventory_info["slots"] = [
             {
                 "item": item_name,
                 "count": count
             } for item_name, count in inventory_dict.items()
-        ],
-        "selectedItem": entity.selectedItem or "air"
-    }
+        ]
 
     # other info
     player_info = {
         "pos": entity.loc,
         "facing": entity.facing.lower()
     }
-    room_coord = None
-    for coord in state.room_coords:
-        if tuple(entity.loc) in coord:
-            room_coord = coord
-            break
+    room_coord = get_room_grid(state).room_coord(entity.loc)
 
     map_info = {
         loc.replace(",17,", ","): obj['name'] \
@@ -60,11 +69,13 @@ def generate_diarc_json_from_state(
                         ).items() \
             if obj['name'] != "air" and obj['name'] != "minecraft:air"
     }
+    # the json holds the "(operator args...)" statement, as DIARC sends it
+    failed_action_statement = None if failed_action is None else str(failed_action)
     return {
         "inventory": inventory_info,
         "player": player_info,
         "map": map_info,
-        "action": failed_action,
+        "action": failed_action_statement,
         "actionSuccess": success,
-        "failedAction": failed_action,
+        "failedAction": failed_action_statement,
     }
@@ -1,6 +1,12 @@
-from typing import Mapping, Tuple, List
+from typing import Callable, Dict, Optional, Set
+
+import numpy as np
 
 QUANTITY_CMDS = ["increase", "decrease", ">="]
+# quantities of the state representation (see LidarAll.get_state_for_evaluation)
+STATE_QUANTITIES = ["inventory", "world"]
+# from this many bounds on a quantity, they are checked as a numpy vector
+VECTORIZED_MIN_BOUNDS = 16
 
 
 def q_token_to_rep(tokens):
@@ -10,25 +16,70 @@ def rep_to_q_token(tokens_str: str):
     return tokens_str.split("-")
 
 
+def to_fact(tokens) -> tuple:
+    """
+    Canonical, hashable form of the tokens of a condition.
+    """
+    if isinstance(tokens, (list, tuple)):
+        return tuple(to_fact(token) for token in tokens)
+    return tokens
+
+
+def to_tokens(fact) -> list:
+    """
+    Tokens of a canonical fact, as lists.
+    """
+    if isinstance(fact, tuple):
+        return [to_tokens(token) for token in fact]
+    return fact
+
+
+def _make_bound_check(quantity_of: str, item_bounds: Dict[int, int]) -> Callable[[dict], bool]:
+    """
+    Checks state[quantity_of][item id] >= bound for every item.
+    Many bounds are compared at once with a dense bound vector indexed by
+    item id, a few are compared one by one, which is cheaper than the
+    overhead of the numpy call.
+    """
+    if len(item_bounds) < VECTORIZED_MIN_BOUNDS:
+        id_bounds = tuple(item_bounds.items())
+        def check_bounds(state):
+            quantities = state[quantity_of]
+            for item_id, bound in id_bounds:
+                if quantities[item_id] < bound:
+                    return False
+            return True
+        return check_bounds
+
+    lower_bounds = np.zeros(max(item_bounds) + 1, dtype=int)
+    lower_bounds[list(item_bounds.keys())] = list(item_bounds.values())
+    size = len(lower_bounds)
+    def check_bound_vector(state):
+        return bool((state[quantity_of][:size] >= lower_bounds).all())
+    return check_bound_vector
+
+
 class ConditionSet:
     """
     Assumes all and
+
+    The facts are kept as a set of canonical tuples, and the quantity
+    requirements as lower bounds, e.g. {("inventory", "oak_log"): 2}.
+    compile() turns them into a predicate over the state representation.
     """
     def __init__(self) -> None:
-        self.conditions: list = []
+        self.facts: Set[tuple] = set()
+
+        # quantity expression -> lower bound
+        self.bounds: Dict[tuple, int] = {}
 
-        # dict of 
-        # list of {"op": ">=", "quantity": 2}
-        self.quantities: Mapping[str, List[Mapping[str, int]]] = {}
-    
     def to_condition_tokens(self):
         """
         Converts itself into tokens for creation of a reward function
         """
-        conditions = ["and"] + self.conditions
-        for key, req_list in self.quantities.items():
-            for req in req_list:
-                conditions.append([req['op'], rep_to_q_token(key), req['quantity']])
+        conditions = ["and"] + [to_tokens(fact) for fact in self.facts]
+        for quantity_exp, bound in self.bounds.items():
+            conditions.append([">=", to_tokens(quantity_exp), bound])
         return conditions
 
 
@@ -41,117 +92,102 @@ class ConditionSet:
         if new_cond[0] == "not":
             self.remove_condition(new_cond[1])
         elif new_cond[0] == "and":
-            for cond in new_cond[1]:
+            for cond in new_cond[1:]:
                 self.add_condition(cond)
         elif new_cond[0] in QUANTITY_CMDS:
             self._add_quantity_condition(new_cond)
         else:
-            self._add_fact_condition(new_cond)
-
+            self.facts.add(to_fact(new_cond))
 
-    def _add_fact_condition(self, new_cond) -> None:
-        """
-        Addes fact-based condition to the list
-        """
-        if new_cond not in self.conditions:
-            self.conditions.append(new_cond)
-    
 
     def _add_quantity_condition(self, cond):
         """
-        Adds quantity-based condition (>=, increase, etc) to the list
+        Adds quantity-based condition (>=, increase, etc) to the bounds
         """
-        # assert q_token_to_rep(cond1[1]) == q_token_to_rep(cond2[1])
-        cond_rep = q_token_to_rep(cond[1])
-        quantity_requirements = self.quantities.get(cond_rep)
-        if quantity_requirements is None:
-            quantity_requirements = []
-            self.quantities[cond_rep] = quantity_requirements
-        
+        quantity_exp = to_fact(cond[1])
+        quantity = int(cond[2])
+        bound = self.bounds.get(quantity_exp)
+
         if cond[0] == "increase":
-            # increase of requirements
-            if len(quantity_requirements) == 0:
-                # if there's no such requirement for this value before,
-                # which is equivalent to the requirement that it is >= 0,
-                # We need to add this to the list to make sure an increase 
-                # of the quantity happened
-                quantity_requirements.append({
-                    "op": ">=", 
-                    "quantity": int(cond[2])
-                })
-            else:
-                # increase / decrease the limits accordingly
-                for item in quantity_requirements:
-                    item["quantity"] += int(cond[2])
+            # increase of requirements. no requirement for this value before
+            # is equivalent to the requirement that it is >= 0
+            self.bounds[quantity_exp] = (bound or 0) + quantity
         elif cond[0] == "decrease":
-            # decrease of requirements
-            if len(quantity_requirements) != 0:
-                for item in quantity_requirements:
-                    item["quantity"] -= int(cond[2])
-                    if item["quantity"] < 0:
-                        # make sure we never get to negative
-                        item["quantity"] = 0
+            # decrease of requirements, we never get to negative
+            if bound is not None:
+                self.bounds[quantity_exp] = max(bound - quantity, 0)
         else:
-            # just limits, we compare and take the sufficient requirements
-            for item in quantity_requirements:
-                if item["op"] == cond[0]:
-                    if item["op"] == ">=":
-                        item["quantity"] = max(item["quantity"], int(cond[2]))
-                    elif item["op"] == "<=":
-                        item["quantity"] = min(item["quantity"], int(cond[2]))
-                
+            # just limits, take the sufficient requirement
+            self.bounds[quantity_exp] = max(bound or 0, quantity)
 
 
     def remove_condition(self, condition) -> None:
         """
-        Removes a condition to the ConditionSet.
-        new_cond is the tokens represented as a list.
+        Removes a condition from the ConditionSet, e.g. the effect of an
+        action that makes the condition hold.
+        condition is the tokens represented as a list.
         """
-        # Generic add condition function that accounts for the add_condition list
-        # TODO: does not account for NOT: assuming not condition 
+        # TODO: does not account for NOT: assuming not condition
         #       will never specify quantities
         if condition[0] in QUANTITY_CMDS:
-            # self._add_quantity_condition(condition)
-            # print(self.quantities)
-            pass
+            self._remove_quantity_condition(condition)
         else:
-            if condition in self.conditions:
-                self.conditions.remove(condition)
+            self.facts.discard(to_fact(condition))
 
 
-    def _remove_fact_condition(self, condition):
+    def _remove_quantity_condition(self, cond):
         """
-        Addes fact-based condition to the list
+        An action increasing a quantity lowers the requirement on it
+        before the action, decreasing it raises the requirement.
         """
-        try:
-            self.conditions.remove(condition)
-        except ValueError:
-            pass
-
-    def _remove_quantity_conditon(self, cond):
-        # assert q_token_to_rep(cond1[1]) == q_token_to_rep(cond2[1])
-        cond_rep = q_token_to_rep(cond[1])
-        quantity_requirements = self.quantities.get(cond_rep)
-        if quantity_requirements is None:
-            quantity_requirements = []
-            self.quantities[cond_rep] = quantity_requirements
-        
-        if cond[0] == "decrease":
-            # decrease of requirements, removal means increase
-            for item in quantity_requirements:
-                item["quantity"] += int(cond[2])
-        elif cond[0] == "increase":
-            # decrease of requirements, removal means decrease
-            for item in quantity_requirements:
-                item["quantity"] -= int(cond[2])
-                if item["quantity"] < 0:
-                    # make sure we never get to negative
-                    item["quantity"] = 0
-        else:
-            # just limits, we compare and take the sufficient requirements
-            for item in quantity_requirements:
-                if item["op"] == cond[0]:
-                    if item["op"] == ">=":
-                        item["quantity"] = max(item["quantity"], cond[2])
-                    elif item["op"] == "<=":
-                        item["quantity"] = min(item["quantity"], cond[2])
+        quantity_exp = to_fact(cond[1])
+        bound = self.bounds.get(quantity_exp)
+        if bound is None:
+            return
+        if cond[0] == "increase":
+            self.bounds[quantity_exp] = max(bound - int(cond[2]), 0)
+        elif cond[0] == "decrease":
+            self.bounds[quantity_exp] = bound + int(cond[2])
+
+
+    def compile(
+            self,
+            item_encoder,
+            make_fact_check: Optional[Callable[[list], Callable[[dict], bool]]] = None
+        ) -> Callable[[dict], bool]:
+        """
+        Returns a predicate on the state representation checking that
+        every condition holds. The bounds are grouped by state quantity
+        (see _make_bound_check). The facts are checked with the functions
+        made by make_fact_check, and are ignored without it.
+        Bounds on air, or on quantities not in the state, always hold.
+        """
+        # quantity -> item id -> bound
+        id_bounds: Dict[str, Dict[int, int]] = {}
+        for quantity_exp, bound in self.bounds.items():
+            quantity_of, item = quantity_exp[0], quantity_exp[-1]
+            if bound <= 0 or item == "air" or quantity_of not in STATE_QUANTITIES:
+                continue
+            # encodes the item if it is new
+            item_encoder.get_id(item)
+            item_id = item_encoder.item_list[item]
+            item_bounds = id_bounds.setdefault(quantity_of, {})
+            item_bounds[item_id] = max(item_bounds.get(item_id, 0), bound)
+
+        bound_checks = [
+            _make_bound_check(quantity_of, item_bounds)
+            for quantity_of, item_bounds in id_bounds.items()
+        ]
+        fact_checks = []
+        if make_fact_check is not None:
+            fact_checks = [make_fact_check(to_tokens(fact)) for fact in self.facts]
+
+        def check_conditions(state: dict) -> bool:
+            for fact_check in fact_checks:
+                if not fact_check(state):
+                    return False
+            for bound_check in bound_checks:
+                if not bound_check(state):
+                    return False
+            return True
+        return check_conditions
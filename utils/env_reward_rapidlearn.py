@@ -2,9 +2,11 @@ from typing import List, Mapping, Tuple
 from xmlrpc.client import Boolean
 import numpy as np
 import re
+import warnings
 from functools import lru_cache
 
 from .env_condition_set import ConditionSet
+from .failed_action import FailedAction, CANNOT_PLAN
 
 # from env_utils import SimpleItemEncoder
 from .advanced_item_encoder import PlaceHolderItemEncoder
@@ -76,26 +78,43 @@ def scan_tokens(pddl_content: str, allow_multiple_statements: bool=False):
     return list[0] if len(list) == 1 else list
 
 
-def parse_failed_action_statement(statement: str):
-    return re.findall(r'[^\s(),]+', statement)
+@lru_cache(maxsize=8)
+def parse_domain(pddl_domain: str) -> Tuple[list, Mapping[str, list]]:
+    """
+    Tokens of the domain and its actions by name. The domain is the same
+    for every reset of an env, so it is only tokenized once.
+    The results are cached and shared by every caller (the reward
+    generators, utils/subgoal_compiler.py): they are read-only, copy them
+    before modifying.
+    """
+    domain_tokens = scan_tokens(pddl_content=pddl_domain)
+    actions = {}
+    for pddl_statement in domain_tokens:
+        if isinstance(pddl_statement, list) and \
+                            pddl_statement[0] == ":action" and \
+                            ":effect" in pddl_statement:
+            actions[pddl_statement[1]] = pddl_statement
+    return domain_tokens, actions
 
 
 class RapidLearnRewardGenerator:
     # known bug: please don't reuse item_encoder among different Env / task!!!
     def __init__(self, pddl_domain, initial_state, failed_action_exp, item_encoder, plan=None, RL_test=False):
+        """
+        failed_action_exp: the FailedAction, or its "(operator args...)" statement
+        """
         # compatibility layer for RL vs DIARC
         self.RL_test = RL_test
 
         self.item_encoder = item_encoder
         # self.state = [None] # acts like a pointer so that the proper state can be captured.
         self.update_state(initial_state)
-        self.domain_tokens = scan_tokens(pddl_content=pddl_domain)
-        self.actions: Mapping[str, list] = {}
-        self.action_name_set = []
-        self.load_action_list(self.domain_tokens)
+        self.domain_tokens, self.actions = parse_domain(pddl_domain)
+        self.action_name_set = list(self.actions.keys())
         # change back if we're using pddl again: 
         # raw_plan_tokens = scan_tokens(pddl_content=plan_exp, allow_multiple_statements=True)
-        raw_action_tokens = parse_failed_action_statement(failed_action_exp)
+        self.failed_action = FailedAction.parse(failed_action_exp)
+        raw_action_tokens = list(self.failed_action.tokens)
         self.action_tokens = self._transform_action(tuple(raw_action_tokens))
         self.param_map = self.get_param_mapping(self.domain_tokens, self.action_tokens)
         self.check_func = self.load_check_effect_func(self.domain_tokens, self.action_tokens)
@@ -108,16 +127,22 @@ class RapidLearnRewardGenerator:
 
         if plan is not None and len(plan) > 0:
             self.plan_tokens = scan_tokens(pddl_content=plan, allow_multiple_statements=True)
+            if len(self.plan_tokens) > 0 and isinstance(self.plan_tokens[0], str):
+                # a plan of a single statement
+                self.plan_tokens = [self.plan_tokens]
 
             # plannable state.
             self.plannable_state = ConditionSet()
-            # TODO uncomment this to use plannable state
-            # self._populate_plannable_state(self.plan_tokens, raw_action_tokens)
-
-            # # create a function that checks whether plannable from the conditionset.
-            # self.plannable_state_met_checker = self._make_check_function(
-            #     self.plannable_state.to_condition_tokens()
-            # )
+            if self.failed_action.kind != CANNOT_PLAN:
+                try:
+                    self._populate_plannable_state(self.plan_tokens, raw_action_tokens)
+                    # compiles the conditionset into a function that checks whether plannable.
+                    self.plannable_state_met_checker = self.plannable_state.compile(
+                        self.item_encoder, self._make_check_function
+                    )
+                except Exception as e:
+                    warnings.warn("Plannable state check disabled: " + str(e))
+                    self.plannable_state = ConditionSet()
 
 
     def update_state(self, state):
@@ -168,16 +193,6 @@ class RapidLearnRewardGenerator:
         return new_conditions
 
     
-    def load_action_list(self, tokens):
-        self.actions = {}
-        for pddl_statement in tokens:
-            if isinstance(pddl_statement, list) and \
-                                pddl_statement[0] == ":action" and \
-                                ":effect" in pddl_statement:
-                self.actions[pddl_statement[1]] = pddl_statement
-                self.action_name_set.append(pddl_statement[1])
-    
-
     def _populate_plannable_state(self, plan_tokens, failed_action_tokens):
         """
         Populates self.plannable_state.
@@ -212,12 +227,12 @@ class RapidLearnRewardGenerator:
             # if the precondition of the current operator is not in the 
             # effects of the failed operator
             if not is_subset:
-                for precondition in action_def["preconditions"]:
-                    # print("added", precondition)
-                    self.plannable_state.add_condition(precondition)
+                # regression through the action: what the action makes
+                # true is no longer required before it, its preconditions are
                 for effect in action_def["effects"]:
-                    # print("removed", effect)
                     self.plannable_state.remove_condition(effect)
+                for precondition in action_def["preconditions"]:
+                    self.plannable_state.add_condition(precondition)
 
             
     def _get_action_def(self, action_name: str, action_tokens: List[str]=None) -> dict:
@@ -264,7 +279,7 @@ class RapidLearnRewardGenerator:
             return at
         
         # transformations
-        if at[0] == "cannotplan":
+        if at[0] == CANNOT_PLAN:
             return at
         if at[0] in self.actions:
             return at
@@ -301,32 +316,31 @@ class RapidLearnRewardGenerator:
 
 
     def load_check_effect_func(self, tokens, action_params):
-        if action_params[0] == "cannotplan":
+        """
+        tokens: unused, the actions of the domain are looked up by name in self.actions
+        """
+        if action_params[0] == CANNOT_PLAN:
             return self._maker_map['always_true']
-        for statement in tokens:
-            if isinstance(statement, list) and \
-                                statement[0] == ":action" and \
-                                ":effect" in statement:
-                if statement[1] != action_params[0]:
-                    continue
-                # print(statement[1])
-                param_index = statement.index(":parameters") + 1
-
-                # create an alias from the parameters to its actual object
-                mapping = self.get_param_mapping(statement[param_index], action_params)
-
-                # process the list, replacing the parameters with the actual object
-                effect_index = statement.index(":effect") + 1
-                effects = statement[effect_index]
-                transformed_effects = self._substitute_params(effects, param_mapping=mapping)
-
-                # print("effects_tokens: ", transformed_effects)
-                try:
-                    return self._make_check_function(transformed_effects)
-                except PlaceHolderItemEncoder.TooManyItemTypes as e:
-                    raise Exception("Error while creating effect function for (" + ",".join(statement) + ")") from e
-        print(action_params[0], "action not found!")
-        return self._maker_map['always_false']
+        statement = self.actions.get(action_params[0])
+        if statement is None:
+            print(action_params[0], "action not found!")
+            return self._maker_map['always_false']
+
+        param_index = statement.index(":parameters") + 1
+
+        # create an alias from the parameters to its actual object
+        mapping = self.get_param_mapping(statement[param_index], action_params)
+
+        # process the list, replacing the parameters with the actual object
+        effect_index = statement.index(":effect") + 1
+        effects = statement[effect_index]
+        transformed_effects = self._substitute_params(effects, param_mapping=mapping)
+
+        # print("effects_tokens: ", transformed_effects)
+        try:
+            return self._make_check_function(transformed_effects)
+        except PlaceHolderItemEncoder.TooManyItemTypes as e:
+            raise Exception("Error while creating effect function for (" + ",".join(statement) + ")") from e
     
     def get_state(self):
         return self.state
@@ -334,9 +348,9 @@ class RapidLearnRewardGenerator:
 
     def check_if_effect_met(self, new_state) -> Tuple[Boolean, Boolean]:
         is_done = self.check_func(new_state)
-        # is_plannable_state = self.plannable_state_met_checker(new_state)
+        is_plannable_state = self.plannable_state_met_checker(new_state)
         self.update_state(new_state)
-        return is_done, False #is_plannable_state
+        return is_done, is_plannable_state
 
 
     ##########################################################################
@@ -350,12 +364,17 @@ class RapidLearnRewardGenerator:
         else: 
             return self._maker_map['always_true']
         
-    def _make_check_holding_item(self, _, actor, item):
+    def _make_check_holding_item(self, *args):
+        if self.RL_test:
+            _, item = args
+        else:
+            _, actor, item = args
+
         def check_holding_item(new_state):
             if new_state["holding"] == self.item_encoder.get_id(item):
                 return True
             elif item in self.type_dict:
-                for alt_name in self.type_dict:
+                for alt_name in self.type_dict[item]:
                     alt_id = self.item_encoder.get_id(alt_name)
                     if new_state["holding"] == alt_id:
                         return True
@@ -0,0 +1,160 @@
+# Parallel evaluation of a policy on a vector env.
+#
+# Every env of the vector env runs its own share of the episodes, so that
+# the result does not favour the envs with short episodes, and the
+# actions of all the running envs are computed in one batched call.
+# An episode is a success when it ends with the positive reward of
+# reaching the goal, since the envs also terminate on failures. Episodes
+# solved by the planner alone (skipped_epi_count in the reset info of the
+# planning until failure env) count as successes.
+
+import csv
+import os
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+import torch
+from tianshou.data import Batch, to_numpy
+
+from config import REWARDS
+
+# (observations of the running envs, their env ids) -> actions
+ActFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class EvaluationResult(NamedTuple):
+    num_episodes: int
+    num_successes: int
+    # successes of the episodes the planner solved without rl
+    num_skipped: int
+
+    @property
+    def success_rate(self) -> float:
+        return self.num_successes / self.num_episodes if self.num_episodes > 0 else 0.0
+
+
+def episode_quotas(num_episodes: int, num_envs: int) -> np.ndarray:
+    """
+    Number of episodes run by each env.
+    """
+    quotas = np.full(num_envs, num_episodes // num_envs, dtype=int)
+    quotas[:num_episodes % num_envs] += 1
+    return quotas
+
+
+def make_policy_act_fn(policy) -> ActFn:
+    """
+    Batched inference of a tianshou policy.
+    """
+    def act(obs: np.ndarray, env_ids: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            result = policy(Batch(obs=obs, info={}))
+        return policy.map_action(to_numpy(result.act))
+    return act
+
+
+def make_random_act_fn(venv) -> ActFn:
+    def act(obs: np.ndarray, env_ids: np.ndarray) -> np.ndarray:
+        return np.array([venv.action_space[env_id].sample() for env_id in env_ids])
+    return act
+
+
+def evaluate(
+        venv,
+        act_fn: ActFn,
+        num_episodes: int,
+        seed: Optional[int] = None,
+        success_reward: float = REWARDS["positive"]
+    ) -> EvaluationResult:
+    """
+    Runs num_episodes episodes over the envs of venv. An episode is a
+    success when it terminates with a reward of at least success_reward.
+    """
+    if seed is not None:
+        # env i is seeded with seed + i
+        venv.seed(seed)
+    remaining = episode_quotas(num_episodes, venv.env_num)
+    num_successes = 0
+    num_skipped = 0
+
+    def start_episodes(env_ids: np.ndarray):
+        """
+        Resets the envs, and returns the ids and observations of the ones
+        that still have an episode to run after the skipped ones.
+        """
+        nonlocal num_successes, num_skipped
+        obs, infos = venv.reset(id=env_ids)
+        running = np.ones(len(env_ids), dtype=bool)
+        for i, (env_id, info) in enumerate(zip(env_ids, infos)):
+            skipped = min(int(info.get("skipped_epi_count", 0)), remaining[env_id])
+            remaining[env_id] -= skipped
+            num_successes += skipped
+            num_skipped += skipped
+            running[i] = remaining[env_id] > 0
+        return env_ids[running], obs[running]
+
+    env_ids, obs = start_episodes(np.flatnonzero(remaining > 0))
+    while len(env_ids) > 0:
+        actions = act_fn(obs, env_ids)
+        obs_next, rew, terminated, truncated, _ = venv.step(actions, id=env_ids)
+        done = terminated | truncated
+        num_successes += int(np.count_nonzero(terminated & (rew >= success_reward)))
+        remaining[env_ids[done]] -= 1
+
+        restart_ids = env_ids[done & (remaining[env_ids] > 0)]
+        env_ids, obs = env_ids[~done], obs_next[~done]
+        if len(restart_ids) > 0:
+            restart_ids, restart_obs = start_episodes(restart_ids)
+            env_ids = np.concatenate([env_ids, restart_ids])
+            obs = np.concatenate([obs, restart_obs])
+    return EvaluationResult(num_episodes, num_successes, num_skipped)
+
+
+def merge_success_rates(result_file: str, success_rates: Dict[str, float]):
+    """
+    Writes the success rate of each model seed into the csv, replacing
+    the rows of the seeds evaluated again.
+    """
+    rows: Dict[str, str] = {}
+    if os.path.exists(result_file):
+        with open(result_file, newline="") as f:
+            for row in csv.DictReader(f):
+                rows[row["seed_no"]] = row["success_rate"]
+    for seed_no, success_rate in success_rates.items():
+        rows[str(seed_no)] = str(success_rate)
+
+    tmp_file = result_file + ".tmp"
+    with open(tmp_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["seed_no", "success_rate"])
+        for seed_no, success_rate in rows.items():
+            writer.writerow([seed_no, success_rate])
+    os.replace(tmp_file, result_file)
+
+
+def find_model_paths(model_folder: str, file_names: Sequence[str] = ("best_policy.pth", "checkpoint.pth")) -> Dict[str, str]:
+    """
+    The model of each seed folder in model_folder, the first of
+    file_names that exists.
+    """
+    model_paths = {}
+    if not os.path.isdir(model_folder):
+        return model_paths
+    for seed_dir in sorted(os.listdir(model_folder)):
+        for file_name in file_names:
+            path = os.path.join(model_folder, seed_dir, file_name)
+            if os.path.isfile(path):
+                model_paths[seed_dir] = path
+                break
+    return model_paths
+
+
+def load_policy_state(path: str, device="cpu") -> dict:
+    """
+    The policy state dict of a best_policy.pth, or of a checkpoint with
+    the model and the optimizer.
+    """
+    state = torch.load(path, map_location=device)
+    if "model" in state and "optim" in state:
+        return state["model"]
+    return state
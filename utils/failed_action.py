@@ -0,0 +1,58 @@
+import re
+from typing import NamedTuple, Sequence, Tuple, Union
+
+# kinds of failed actions
+ACTION = "action"
+CANNOT_PLAN = "cannotplan"
+
+
+class FailedAction(NamedTuple):
+    """
+    What the planning agent got stuck on: the operator and the arguments
+    of a plan step that failed, or the CANNOT_PLAN kind when no plan could
+    be found. Passed as is from the agent to the reward generator, the
+    string form is only for the json consumers.
+    """
+    kind: str
+    operator: str
+    args: Tuple[str, ...] = ()
+
+    @staticmethod
+    def from_plan_step(tokens: Sequence[str]) -> "FailedAction":
+        """
+        From the tokens of a plan step, e.g. ("break", "self", "oak_log").
+        """
+        if tokens[0] == CANNOT_PLAN:
+            return CANNOT_PLAN_ACTION
+        return FailedAction(ACTION, tokens[0], tuple(tokens[1:]))
+
+    @staticmethod
+    def parse(failed_action: Union["FailedAction", str, Sequence[str]]) -> "FailedAction":
+        """
+        From a FailedAction, the tokens of a plan step, or the
+        "(operator args...)" or "cannotplan" statement of a DIARC json.
+        """
+        if isinstance(failed_action, FailedAction):
+            return failed_action
+        if isinstance(failed_action, str):
+            failed_action = re.findall(r'[^\s(),]+', failed_action)
+        return FailedAction.from_plan_step(failed_action)
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        return (self.operator, *self.args)
+
+    @property
+    def name(self) -> str:
+        """
+        The tokens joined by underscores, e.g. "break_self_oak_log".
+        """
+        return "_".join(self.tokens)
+
+    def __str__(self) -> str:
+        if self.kind == CANNOT_PLAN:
+            return CANNOT_PLAN
+        return "(" + " ".join(self.tokens) + ")"
+
+
+CANNOT_PLAN_ACTION = FailedAction(CANNOT_PLAN, CANNOT_PLAN)
@@ -0,0 +1,53 @@
+# Inventory -> count vector encoding of the observation generators.
+#
+# The diarc json lists the inventory as {"item", "count"} slots of every
+# known item, which is what the external consumers of the json expect.
+# The observations only need the counts, so the envs also put the
+# name -> count dict of the entity in the json ("counts"), and it is
+# written straight into a preallocated vector through a cached
+# name -> index table.
+
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+
+from .advanced_item_encoder import PlaceHolderItemEncoder
+
+
+class InventoryEncoder:
+    """
+    Writes the item counts of an inventory json into a count vector,
+    indexed by item id, or by id_to_index[item id] if given.
+    """
+    def __init__(self, item_encoder: PlaceHolderItemEncoder, id_to_index: Optional[Mapping[int, int]] = None):
+        self.item_encoder = item_encoder
+        self.id_to_index = id_to_index
+        self._index: Dict[str, int] = {}
+
+    def index(self, item_name: str) -> int:
+        index = self._index.get(item_name)
+        if index is None:
+            # encodes the item if it is new
+            self.item_encoder.get_id(item_name)
+            item_id = self.item_encoder.item_list[item_name]
+            index = item_id if self.id_to_index is None else self.id_to_index[item_id]
+            self._index[item_name] = index
+        return index
+
+    def encode(self, inventory: dict, out: np.ndarray) -> np.ndarray:
+        """
+        Adds the counts of inventory (json['inventory']) to out.
+        """
+        counts = inventory.get('counts')
+        if counts is not None:
+            items = counts.items()
+        else:
+            items = ((slot['item'], slot['count']) for slot in inventory['slots'])
+
+        cached_index = self._index
+        for item_name, count in items:
+            index = cached_index.get(item_name)
+            if index is None:
+                index = self.index(item_name)
+            out[index] += count
+        return out
@@ -0,0 +1,45 @@
+from collections.abc import Mapping
+from importlib import import_module
+
+
+def resolve_dotted_path(path: str):
+    """
+    Imports and returns the object given by a dotted path, e.g.
+    "obs_convertion.LidarAll".
+    """
+    module_name, _, attr_name = path.rpartition(".")
+    return getattr(import_module(module_name), attr_name)
+
+
+class LazyRegistry(Mapping):
+    """
+    A read-only dict whose values are given as dotted paths (or lists of
+    dotted paths). The values are only imported on first access, so
+    listing the keys (e.g. for argparse choices) does not import anything.
+    """
+    def __init__(self, entries: dict):
+        self._entries = dict(entries)
+        self._resolved = {}
+
+    @staticmethod
+    def _resolve(value):
+        if value is None:
+            return None
+        elif isinstance(value, list):
+            return [resolve_dotted_path(path) for path in value]
+        else:
+            return resolve_dotted_path(value)
+
+    def __getitem__(self, key):
+        if key not in self._resolved:
+            self._resolved[key] = self._resolve(self._entries[key])
+        return self._resolved[key]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"LazyRegistry({self._entries})"
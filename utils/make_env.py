@@ -1,7 +1,43 @@
 from gym_novel_gridworlds2.envs.sequential import NovelGridWorldSequentialEnv
 from envs import SingleAgentWrapper, RealTimeRSWrapper, RSPreplannedSubgoal, RapidLearnWrapper, RSPreplannedStateSubgoal
 from gym_novel_gridworlds2.utils.json_parser import ConfigParser, load_json
+from config import VECTOR_MODES, NOVELTIES, HINTS, OBS_GEN_ARGS
+from utils.config_cache import load_config
+from utils.hint_utils import get_hinted_items
+from utils.pddl_utils import KnowledgeBase
+from utils.profile_utils import start_stack_sampler
 from gymnasium.wrappers.time_limit import TimeLimit
+
+BASE_CONFIG_PATH = "config/polycraft_gym_rl_single.yaml"
+
+
+def get_config_file_paths(novelty_name):
+    """
+    The base config, followed by the config of the novelty if any.
+    """
+    config_file_paths = [BASE_CONFIG_PATH]
+    if novelty_name is not None and novelty_name != "none":
+        config_file_paths.append(NOVELTIES[novelty_name])
+    return config_file_paths
+
+
+def get_rep_gen_args(novelty_name, obs_type, config_file_paths):
+    """
+    Observation generator args of the envs of a novelty, shared by
+    training, evaluation and the benchmarks.
+    """
+    all_objects = KnowledgeBase(config=config_file_paths).get_all_objects()
+    hinted_objects = get_hinted_items(all_objects, HINTS.get(novelty_name) or "", True)
+    return {
+        "hints": HINTS.get(novelty_name) or "",
+        "hinted_objects": hinted_objects,
+        "novel_objects": [], # TODO
+        "num_reserved_extra_objects": 2 if novelty_name == "none" else 0,
+        "item_encoder_config_path": "config/items.json",
+        **OBS_GEN_ARGS.get(obs_type, {})
+    }
+
+
 def make_env(
         env_name, 
         config_file_paths, 
@@ -12,9 +48,14 @@ def make_env(
         base_env_args={},
         show_action_log=False,
         max_time_step=2400,
+        perf_sample_interval=0,
+        planner_trace_dir=None,
+        profile_dir=None,
     ):
+    if profile_dir is not None:
+        start_stack_sampler(profile_dir, "env")
     if config_content is None:
-        config_content = load_json(config_json={"extends": config_file_paths}, verbose=False)
+        config_content = load_config(config_file_paths)
 
     base_ngw_env = NovelGridWorldSequentialEnv(
         config_dict=config_content,
@@ -30,7 +71,8 @@ def make_env(
             base_env=base_ngw_env,
             agent_name="agent_0",
             RepGenerator=RepGenerator,
-            rep_gen_args=rep_gen_args
+            rep_gen_args=rep_gen_args,
+            perf_sample_interval=perf_sample_interval
         )
     else:
         single_agent_env = SingleAgentWrapper(
@@ -38,9 +80,13 @@ def make_env(
             agent_name="agent_0",
             RepGenerator=RepGenerator,
             rep_gen_args=rep_gen_args,
-            show_action_log=show_action_log
+            show_action_log=show_action_log,
+            perf_sample_interval=perf_sample_interval
         )
 
+    if planner_trace_dir is not None:
+        single_agent_env.planner_telemetry.set_trace_dir(planner_trace_dir)
+
     if env_name == "pf":
         single_agent_env = RapidLearnWrapper(single_agent_env, skip_epi_when_rl_done=False)
     if env_name == "rs":
@@ -48,3 +94,10 @@ def make_env(
     elif env_name == "rs_s":
         single_agent_env = RSPreplannedStateSubgoal(single_agent_env)
     return TimeLimit(single_agent_env, max_episode_steps=max_time_step)
+
+
+def make_vector_env(env_fns, vector_mode="subproc"):
+    """
+    Creates the tianshou vector env running env_fns, see VECTOR_MODES.
+    """
+    return VECTOR_MODES[vector_mode](env_fns)
@@ -0,0 +1,138 @@
+# Model checkpoints written off the training thread.
+#
+# The state dicts are copied to the CPU on the training thread, which is
+# the only part that has to see a consistent model, and serialized with
+# torch.save on a background thread. Every file is written to a temporary
+# path and renamed into place, so a job preempted mid-write never leaves
+# a half-written checkpoint behind.
+
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional
+
+import torch
+
+CHECKPOINT_NAME = "checkpoint.pth"
+ROLLING_CHECKPOINT_PATTERN = re.compile(r"^checkpoint_(\d+)\.pth$")
+# snapshots queued for the writer before a save waits for the oldest one
+MAX_PENDING = 2
+
+
+def to_cpu(state: Any, memo: Optional[Dict[int, torch.Tensor]] = None) -> Any:
+    """
+    Copy of a (nested) state dict with every tensor copied to the CPU.
+    A tensor found several times is only copied once.
+    """
+    if memo is None:
+        memo = {}
+    if isinstance(state, torch.Tensor):
+        copied = memo.get(id(state))
+        if copied is None:
+            copied = memo[id(state)] = state.detach().to("cpu", copy=True)
+        return copied
+    elif isinstance(state, dict):
+        return type(state)((key, to_cpu(value, memo)) for key, value in state.items())
+    elif isinstance(state, (list, tuple)):
+        return type(state)(to_cpu(value, memo) for value in state)
+    return state
+
+
+def atomic_save(obj: Any, path: str):
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _atomic_link(src: str, dst: str):
+    """
+    Points dst to the content of src without writing it again if the
+    file system supports hard links.
+    """
+    tmp_path = dst + ".tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        with open(src, "rb") as f_src, open(tmp_path, "wb") as f_dst:
+            f_dst.write(f_src.read())
+    os.replace(tmp_path, dst)
+
+
+class CheckpointWriter:
+    """
+    Writes the checkpoints of a run into log_path on a background thread.
+    Keeps the last num_rolling checkpoint_<epoch>.pth files, and
+    checkpoint.pth as the latest one, which is what --resume loads.
+    The writes are queued in order, and a save only waits when
+    max_pending snapshots are already queued.
+    """
+    def __init__(self, log_path: str, num_rolling: int = 3, max_pending: int = MAX_PENDING):
+        self.log_path = log_path
+        self.num_rolling = num_rolling
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model_ckpt")
+        self._pending: Deque[Future] = deque()
+
+    def list_rolling(self) -> List[int]:
+        """
+        Epochs of the rolling checkpoints on disk, oldest first.
+        """
+        epochs = []
+        for file_name in os.listdir(self.log_path):
+            match = ROLLING_CHECKPOINT_PATTERN.match(file_name)
+            if match is not None:
+                epochs.append(int(match.group(1)))
+        return sorted(epochs)
+
+    def _submit(self, write) -> Future:
+        # the errors of the completed writes are raised here, without
+        # waiting for the one in progress
+        while len(self._pending) > 0 and self._pending[0].done():
+            self._pending.popleft().result()
+        # bounds the snapshots held in memory
+        while len(self._pending) >= self.max_pending:
+            self._pending.popleft().result()
+        future = self._executor.submit(write)
+        self._pending.append(future)
+        return future
+
+    def save(self, files: Dict[str, Any]) -> Future:
+        """
+        Saves each state to log_path/<file name>.
+        """
+        files = to_cpu(files)
+
+        def write():
+            for file_name, state in files.items():
+                atomic_save(state, os.path.join(self.log_path, file_name))
+        return self._submit(write)
+
+    def save_rolling(self, epoch: int, state: Any) -> Future:
+        """
+        Saves the checkpoint of an epoch, updates checkpoint.pth and
+        removes the rolling checkpoints older than the last num_rolling.
+        """
+        state = to_cpu(state)
+        epoch_path = os.path.join(self.log_path, f"checkpoint_{epoch}.pth")
+
+        def write():
+            atomic_save(state, epoch_path)
+            _atomic_link(epoch_path, os.path.join(self.log_path, CHECKPOINT_NAME))
+            epochs = self.list_rolling()
+            for old_epoch in epochs[:max(len(epochs) - self.num_rolling, 0)]:
+                os.remove(os.path.join(self.log_path, f"checkpoint_{old_epoch}.pth"))
+        return self._submit(write)
+
+    def wait(self):
+        """
+        Waits for the queued writes, if any.
+        """
+        while len(self._pending) > 0:
+            self._pending.popleft().result()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
@@ -1,10 +1,14 @@
-from typing import List, Mapping, Tuple
+from typing import Dict, List, Mapping, Tuple
+from functools import lru_cache
 from gym_novel_gridworlds2.utils.json_parser import import_module, load_json, ConfigParser
 from gym_novel_gridworlds2.contrib.polycraft.states import PolycraftState
 from gym_novel_gridworlds2.contrib.polycraft.utils.map_utils import getBlockInFront
 from gym_novel_gridworlds2.state.dynamic import Dynamic
 from gym_novel_gridworlds2.contrib.polycraft.objects.polycraft_entity import PolycraftEntity
+from .config_cache import config_cache_key, load_config
 import os
+import json
+import hashlib
 import numpy as np
 
 PDDL_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "pddl_template.pddl")
@@ -14,12 +18,20 @@ with open(PDDL_TEMPLATE_PATH, 'r') as f:
 with open(PDDL_PROBLEM_TEMPLATE_PATH, 'r') as f:
     PDDL_PROBLEM_TEMPLATE = f.read()
 
+# sections of the config that determine the object types and the entities
+OBJ_TYPES_CONFIG_KEYS = ("object_types", "objects", "recipes", "trades")
+ENTITIES_CONFIG_KEYS = ("entities",)
+
+# process-wide caches of the type tables, keyed by the content hash of the config
+_obj_types_cache: Dict[str, Mapping[str, str]] = {}
+_entities_cache: Dict[str, Mapping[str, str]] = {}
+# keyed by the content hash of the config, or the config_cache_key of its paths
+_all_actions_cache: Dict[Tuple[tuple, str], List[str]] = {}
+
 class KnowledgeBase:
     def __init__(self, config, object_placeholder=0):
-        if type(config) == str:
-            config = load_json(config)
-        elif isinstance(config, list):
-            config = load_json(config_json={"extends": config})
+        if type(config) == str or isinstance(config, list):
+            config = load_config(config)
     
         self.config = config
         self.default_obj_types = generate_obj_types(config)
@@ -27,6 +39,7 @@ class KnowledgeBase:
 
         self.additional_items = {}
         self.additional_entities = {}
+        self.problem_size = None
     
     def get_all_objects(self):
         return {
@@ -57,6 +70,11 @@ class KnowledgeBase:
         initial_state = generate_initial_state(self.config, state, dynamics, obj_types)
         pddl_problem = pddl_problem.replace(";{{init}}", "\n        ".join(initial_state))
 
+        # size of the last generated problem, for the planner telemetry
+        self.problem_size = {
+            "num_objects": len(all_objs),
+            "num_init_facts": len(initial_state),
+        }
         return pddl_domain, pddl_problem
 
 
@@ -97,20 +115,55 @@ class KnowledgeBase:
         )
 
 
+def _config_content_hash(ng2_config, keys: Tuple[str, ...]) -> str:
+    """
+    Hash of the sections of the config listed in keys. Computed on every
+    call, so that a modified config gets a new hash, and no reference to
+    the config is kept.
+    """
+    content = json.dumps({key: ng2_config.get(key) for key in keys}, sort_keys=True, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _import_module_cached(module_path: str):
+    return import_module(module_path)
+
+
 def get_entities(ng2_config):
+    """
+    Returns the entity table of the config. Cached per config content.
+    """
+    key = _config_content_hash(ng2_config, ENTITIES_CONFIG_KEYS)
+    if key not in _entities_cache:
+        _entities_cache[key] = _get_entities(ng2_config)
+    return dict(_entities_cache[key])
+
+
+def _get_entities(ng2_config):
     entities = {}
     for entity_nickname, entity in ng2_config["entities"].items():
         entities[f"entity_{entity['id']}"] = entity["type"]
     return entities
 
 def get_all_actions(ng2_config, agent_name="agent_0"):
-    if type(ng2_config) == str:
-        ng2_config = load_json(ng2_config)
+    """
+    Returns the list of actions of the agent.
+    The action set is only parsed once per config content, or once per
+    version of the config files when given their paths.
+    """
+    if type(ng2_config) == str or isinstance(ng2_config, list):
+        key = (config_cache_key(ng2_config), agent_name)
+        if key in _all_actions_cache:
+            return list(_all_actions_cache[key])
+        ng2_config = load_config(ng2_config)
     else:
-        ng2_config = load_json(config_json={"extends": ng2_config})
-    parser = ConfigParser()
-    _, _, agent_manager = parser.parse_json(json_content=ng2_config, rendering=False)
-    return [action for action, _ in agent_manager.agents[agent_name].action_set.actions]
+        key = ((_config_content_hash(ng2_config, tuple(sorted(ng2_config.keys()))),), agent_name)
+    if key not in _all_actions_cache:
+        parser = ConfigParser()
+        _, _, agent_manager = parser.parse_json(json_content=ng2_config, rendering=False)
+        _all_actions_cache[key] = [action for action, _ in agent_manager.agents[agent_name].action_set.actions]
+    return list(_all_actions_cache[key])
 
 def simplified_name_convert(name, item=None):
     if isinstance(item, PolycraftEntity):
@@ -241,6 +294,17 @@ def generate_actions(ng2_config):
 
 
 def generate_obj_types(ng2_config):
+    """
+    Returns the object type table of the config. Computed once per config
+    content and shared within the process.
+    """
+    key = _config_content_hash(ng2_config, OBJ_TYPES_CONFIG_KEYS)
+    if key not in _obj_types_cache:
+        _obj_types_cache[key] = _generate_obj_types(ng2_config)
+    return dict(_obj_types_cache[key])
+
+
+def _generate_obj_types(ng2_config):
     object_types = {}
 
     # add explicitly defined object types
@@ -248,9 +312,9 @@ def generate_obj_types(ng2_config):
         if obj_type == "default":
             continue
         if type(info) == str:
-            Module = import_module(info)
+            Module = _import_module_cached(info)
         else:
-            Module = import_module(info["module"])
+            Module = _import_module_cached(info["module"])
         
         # append object according to its type
         if obj_type not in object_types:
@@ -0,0 +1,110 @@
+import time
+from collections import defaultdict
+from typing import Mapping, Optional
+
+
+# env info keys carrying the sampled perf data: the stage timers of the
+# env (see PerfRecorder) and the planner calls (see utils/planner_telemetry.py)
+PERF_INFO_KEYS = ("perf", "planner")
+
+
+class _NullTimer:
+    """
+    No-op context manager returned by a disabled PerfRecorder.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("recorder", "stage", "begin")
+
+    def __init__(self, recorder: "PerfRecorder", stage: str):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.recorder.add_time(self.stage, time.perf_counter() - self.begin)
+        return False
+
+
+class PerfRecorder:
+    """
+    Counters and monotonic timers for the stages of an env step.
+
+    Disabled by default, in which case timer() returns a shared no-op
+    context manager and every other call returns immediately.
+
+    When enabled, the stage times are aggregated over sample_interval env
+    steps and handed out by pop_sample() as a dict of per step
+    averages, e.g. {"sampled": 1, "steps": 100, "lidar_ms": 0.3, "lidar_calls": 1.0, "present": {...}}
+    The "present" dict marks the keys of the sample with 1: the samples of
+    the envs are stacked into one Batch, which fills the keys missing in an
+    env with 0, so the logger only averages the keys an env has sampled.
+    """
+    def __init__(self, enabled=False, sample_interval=100):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.times: Mapping[str, float] = defaultdict(float)
+        self.calls: Mapping[str, int] = defaultdict(int)
+        self.counters: Mapping[str, int] = defaultdict(int)
+
+    def timer(self, stage: str):
+        """
+        Context manager that times a stage.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, stage)
+
+    def add_time(self, stage: str, seconds: float):
+        self.times[stage] += seconds
+        self.calls[stage] += 1
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def tick(self):
+        """
+        Marks the end of an env step.
+        """
+        if self.enabled:
+            self.steps += 1
+
+    def pop_sample(self) -> Optional[dict]:
+        """
+        Returns the per step averages once every sample_interval steps
+        and starts a new window. Returns None otherwise.
+        """
+        if not self.enabled or self.steps < self.sample_interval:
+            return None
+        sample = {"sampled": 1, "steps": self.steps}
+        for stage, seconds in self.times.items():
+            sample[f"{stage}_ms"] = seconds * 1000 / self.steps
+            sample[f"{stage}_calls"] = self.calls[stage] / self.steps
+        for name, count in self.counters.items():
+            sample[name] = count / self.steps
+        sample["present"] = {key: 1 for key in sample.keys()}
+        self.reset()
+        return sample
+
+
+# shared disabled recorder, used as the default everywhere
+NULL_PERF_RECORDER = PerfRecorder(enabled=False)
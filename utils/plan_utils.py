@@ -9,70 +9,187 @@ import subprocess
 import os
 import re
 import copy
+import time
+from functools import lru_cache
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from utils.planner_telemetry import PLANNER_TELEMETRY, PlannerOutcome, PlannerTelemetry
 
 FF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "planners", "Metric-FF-v2.1", "ff")
 
-def call_planner(domain, problem, timeout=0.1, verbose=False):
+# markers of the plan section in the Metric-FF output
+PLAN_START_MARKER = "found legal plan"
+PLAN_STEP_REGEX = re.compile(r"^\s*(?:step)?\s*\d+: (.+)$", re.IGNORECASE)
+
+# a translation rule is (prefix, arg_index). When arg_index is None the
+# game action is the prefix itself, otherwise it is prefix + action[arg_index].
+TranslationRule = Tuple[str, Optional[int]]
+
+
+def call_planner(
+        domain, problem, timeout=0.1, translation_table=None, verbose=False, problem_size=None,
+        telemetry: PlannerTelemetry = PLANNER_TELEMETRY
+    ):
     '''
         Given a domain and a problem file
         This function return the ffmetric Planner output.
         In the action format.
         timeout in seconds
+        translation_table: optional operator -> game action table,
+            see get_translation_table.
+        problem_size: optional {"num_objects": .., "num_init_facts": ..}
+            of the problem, recorded in the planner telemetry.
+        telemetry: the planner telemetry the call is recorded in.
     '''
     # run the planner.
     # using mode 0 because that's the most basic and stable mode.
     run_script = [FF_PATH, "-o", domain, "-f", problem, "-s", "0"]
+    start_time = time.perf_counter()
     try:
         output = subprocess.check_output(run_script, timeout=timeout).decode('utf-8')
-        plan, game_action_set = _output_to_plan(output, {})
+        plan, game_action_set = _output_to_plan(output.splitlines(), translation_table)
+        if plan is None:
+            outcome, plan_len = PlannerOutcome.UNSOLVABLE, 0
+        else:
+            outcome, plan_len = PlannerOutcome.PLAN, len(plan)
+        telemetry.record(time.perf_counter() - start_time, outcome, plan_len, problem_size)
         return plan, game_action_set
     except subprocess.TimeoutExpired:
         # planner timed out
+        telemetry.record(time.perf_counter() - start_time, PlannerOutcome.TIMEOUT, 0, problem_size)
         if verbose:
             print("Planner timed out")
         return None, None
     except subprocess.CalledProcessError as e:
-        # planner failed
+        # planner failed. ff also exits with an error on some unsolvable problems.
+        error_output = e.output.decode('utf-8')
+        if "unsolvable" in error_output.lower():
+            outcome = PlannerOutcome.UNSOLVABLE
+        else:
+            outcome = PlannerOutcome.CRASH
+        telemetry.record(time.perf_counter() - start_time, outcome, 0, problem_size)
         if verbose:
             print("--------------------")
             print("Encountered Planner Error:::")
-            print(e.output.decode('utf-8'))
+            print(error_output)
             print("--------------------")
         return None, None
+    except OSError:
+        # planner could not be started
+        telemetry.record(time.perf_counter() - start_time, PlannerOutcome.CRASH, 0, problem_size)
+        raise
+
 
-def _output_to_plan(output, action_map, show_error=False):
+def _parse_plan_section(output_lines: Iterable[str]) -> Optional[List[tuple]]:
     '''
-    Helper function to perform regex on the output from the planner.
-    ### I/P: Takes in the ffmetric output and
+    Reads the output of the planner line by line, and only parses the
+    plan section. Stops reading as soon as the plan section ends.
+    Returns None if the problem is unsolvable.
+    '''
+    in_plan = False
+    ff_plan = []
+    for line in output_lines:
+        if not in_plan:
+            lowered = line.lower()
+            if "unsolvable" in lowered or "simplified to false" in lowered:
+                return None
+            if PLAN_START_MARKER in lowered:
+                in_plan = True
+            continue
+
+        match = PLAN_STEP_REGEX.match(line)
+        if match is not None:
+            ff_plan.append(tuple(match.group(1).strip().lower().split(" ")))
+        elif len(ff_plan) > 0 and line.strip() == "":
+            # first empty line after the steps denotes the end of the plan
+            break
+    return ff_plan
+
+
+def _output_to_plan(output_lines: Iterable[str], translation_table=None, show_error=False):
+    '''
+    Helper function to parse the output from the planner.
+    ### I/P: Takes in the lines of the ffmetric output and
     ### O/P: converts it to a action sequence list.
     '''
+    if isinstance(output_lines, str):
+        output_lines = output_lines.splitlines()
 
-    if "unsolvable" in output:
+    action_set = _parse_plan_section(output_lines)
+    if action_set is None:
         if show_error:
-            print ("Plan not found with FF! Error: {}".format(
-                output))
+            print("Plan not found with FF!")
         return None, None
 
-    ff_plan = re.findall(r"\d+?: (.+)", output.lower()) # matches the string to find the plan bit from the ffmetric output.
-    action_set = [tuple(statement.split(" ")) for statement in ff_plan]
-
-    if len(ff_plan) == 0:
+    if len(action_set) == 0:
         return ["nop", "nop"], ["nop", "nop"]
     
-    if ff_plan[-1] == "reach-goal":
-        ff_plan = ff_plan[:-1]
+    if action_set[-1] == ("reach-goal",):
+        action_set = action_set[:-1]
     
     # convert the action set to the actions permissable in the domain
-    game_action_set = [translate_action(action) for action in action_set]
-
-    # for i in range(len(game_action_set)):
-    #     if game_action_set[i].split(" ")[0] != "approach" and game_action_set[i].split("_")[0] != "Select":
-    #         game_action_set[i] = action_map[game_action_set[i]]
-    # for i in range(len(game_action_set)):
-    #     if game_action_set[i] in action_map:
-    #         game_action_set[i] = env.actions_id[game_action_set[i]]
+    if translation_table is None:
+        game_action_set = [translate_action(action) for action in action_set]
+    else:
+        game_action_set = [apply_translation(translation_table, action) for action in action_set]
     return action_set, game_action_set
 
+
+def _translation_rule(operator: str) -> TranslationRule:
+    """
+    Computes how an operator in the pddl domain maps to an action in the game.
+    Mirrors translate_action, but is only evaluated once per operator.
+    """
+    if "approach" in operator:
+        return ("approach_", 2)
+    elif operator == "select":
+        return ("select_", 2)
+    elif "break" in operator:
+        return ("break_block", None)
+    elif "collect" in operator:
+        return ("collect", None)
+    elif "place" in operator:
+        return ("place", None)
+    else:
+        return (operator, None)
+
+
+@lru_cache(maxsize=32)
+def get_translation_table(pddl_domain: str) -> Mapping[str, TranslationRule]:
+    """
+    Builds the operator -> game action translation table from the list of
+    actions in a pddl domain. Cached per domain.
+    """
+    # strip comments so that commented-out actions are not picked up
+    cleaned_domain = re.sub(r';.*$', '', pddl_domain, flags=re.MULTILINE).lower()
+    operators = re.findall(r'\(:action\s+([^\s()]+)', cleaned_domain)
+    return {operator: _translation_rule(operator) for operator in operators}
+
+
+def apply_translation(translation_table: Mapping[str, TranslationRule], action: tuple) -> str:
+    """
+    Translates an action in the plan into the game action using the table.
+    Falls back to translate_action for operators not in the table.
+    """
+    rule = translation_table.get(action[0])
+    if rule is None:
+        return translate_action(action)
+    prefix, arg_index = rule
+    if arg_index is None:
+        return prefix
+    return prefix + action[arg_index]
+
+
+def plan_to_action_indices(game_action_set: List[str], action_index: Mapping[str, int]) -> np.ndarray:
+    """
+    Converts the translated plan into an array of action indices of the
+    agent's action set. Actions not in the action set are marked as -1.
+    """
+    return np.array([action_index.get(action, -1) for action in game_action_set], dtype=int)
+
+
 def translate_action(action):
     if "approach" in action[0]:
         return f"approach_{action[2]}"
@@ -86,4 +203,3 @@ def translate_action(action):
         return "place"
     else:
         return action[0]
-
@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from collections import defaultdict
+from enum import Enum
+from typing import Mapping, Optional
+
+
+class PlannerOutcome(str, Enum):
+    PLAN = "plan"
+    UNSOLVABLE = "unsolvable"
+    TIMEOUT = "timeout"
+    CRASH = "crash"
+
+
+# upper bounds (in ms) of the planner latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class PlannerTelemetry:
+    """
+    Per process aggregate of the planner calls.
+
+    Every call is recorded with its duration, outcome, plan length and
+    problem size, along with the hits of the translation table cache
+    (get_translation_table), the only cache on the planning path. pop_summary() hands out the aggregate of the calls since
+    the last summary as a flat dict of numbers, so that it can be passed on
+    through the env info, e.g.
+    {"sampled": 1, "calls": 4, "timeout_rate": 0.25, "mean_ms": 12.3, ...}
+
+    When a trace path is set, every call is also appended to it as a json line.
+    """
+    def __init__(self, trace_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.outcomes: Mapping[PlannerOutcome, int] = defaultdict(int)
+        self.latency_hist = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_plan_len = 0
+        self.total_objects = 0
+        self.total_init_facts = 0
+        self.translation_lookups = 0
+        self.translation_hits = 0
+
+    def set_trace_dir(self, trace_dir: Optional[str]):
+        """
+        Traces the planner calls recorded here to
+        trace_dir/planner_trace_<pid>.jsonl, which the telemetries of the
+        envs of a process share. None disables the trace.
+        """
+        if trace_dir is None:
+            self.trace_path = None
+        else:
+            os.makedirs(trace_dir, exist_ok=True)
+            self.trace_path = os.path.join(trace_dir, f"planner_trace_{os.getpid()}.jsonl")
+
+    def record(
+            self,
+            duration: float,
+            outcome: PlannerOutcome,
+            plan_len: int = 0,
+            problem_size: Optional[Mapping[str, int]] = None
+        ):
+        """
+        Records a planner call. duration is in seconds.
+        """
+        duration_ms = duration * 1000
+        num_objects = 0 if problem_size is None else problem_size.get("num_objects", 0)
+        num_init_facts = 0 if problem_size is None else problem_size.get("num_init_facts", 0)
+
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.outcomes[outcome] += 1
+        self.latency_hist[self._bucket_index(duration_ms)] += 1
+        self.total_plan_len += plan_len
+        self.total_objects += num_objects
+        self.total_init_facts += num_init_facts
+
+        if self.trace_path is not None:
+            record = {
+                "time": time.time(),
+                "pid": os.getpid(),
+                "duration_ms": duration_ms,
+                "outcome": outcome.value,
+                "plan_len": plan_len,
+                "num_objects": num_objects,
+                "num_init_facts": num_init_facts,
+            }
+            with open(self.trace_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def record_translation_lookup(self, hit: bool):
+        """
+        Records a lookup of the translation table of a domain.
+        """
+        self.translation_lookups += 1
+        self.translation_hits += int(hit)
+
+    @staticmethod
+    def _bucket_index(duration_ms: float) -> int:
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                return i
+        return len(LATENCY_BUCKETS_MS)
+
+    def pop_summary(self) -> Optional[dict]:
+        """
+        Returns the aggregate of the calls since the last summary and
+        starts a new one. Returns None if the planner has not been called.
+        """
+        if self.calls == 0:
+            return None
+        calls = self.calls
+        num_plans = self.outcomes[PlannerOutcome.PLAN]
+        summary = {
+            "sampled": 1,
+            "calls": calls,
+            "mean_ms": self.total_ms / calls,
+            "max_ms": self.max_ms,
+            # over the calls that returned a plan, failed calls have none
+            "mean_plan_len": self.total_plan_len / num_plans if num_plans > 0 else 0,
+            "mean_objects": self.total_objects / calls,
+            "mean_init_facts": self.total_init_facts / calls,
+            "translation_cache_hit_rate":
+                self.translation_hits / self.translation_lookups if self.translation_lookups > 0 else 0,
+        }
+        for outcome in PlannerOutcome:
+            summary[f"{outcome.value}_rate"] = self.outcomes[outcome] / calls
+        # cumulative histogram, i.e. share of the calls that took <= bound
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_hist):
+            cumulative += count
+            summary[f"le_{bound}ms"] = cumulative / calls
+        self.reset()
+        return summary
+
+
+# aggregate of the planner calls made outside of an env. each env wrapper
+# keeps its own, see SingleAgentWrapper
+PLANNER_TELEMETRY = PlannerTelemetry(trace_path=None)
@@ -0,0 +1,100 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from multiprocessing import util as mp_util
+from typing import Dict, Optional
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler, in the spirit of py-spy.
+
+    A background thread samples the stack of the target thread (by default
+    the thread that created the sampler) every interval seconds, and
+    periodically writes the counts of the collapsed stacks to out_path,
+    one "frame;frame;frame count" line per stack. The file can be fed
+    directly to flamegraph.pl, speedscope or inferno.
+    """
+    def __init__(self, out_path: str, interval=0.01, dump_interval=30, thread_id=None):
+        self.out_path = out_path
+        self.interval = interval
+        self.dump_interval = dump_interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._labels = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        # atexit is skipped by the forked env workers,
+        # which run the multiprocessing finalizers instead.
+        atexit.register(self.stop)
+        mp_util.Finalize(None, self.stop, exitpriority=10)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.dump()
+
+    def _run(self):
+        last_dump = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+            if time.monotonic() - last_dump >= self.dump_interval:
+                self.dump()
+                last_dump = time.monotonic()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.counts[";".join(stack)] += 1
+
+    def dump(self):
+        """
+        Atomically (re)writes the collapsed stacks sampled so far.
+        """
+        tmp_path = self.out_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for stack, count in list(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, self.out_path)
+
+
+# samplers started in this process, keyed by pid so that
+# forked children do not inherit the sampler of their parent
+_samplers: Dict[int, StackSampler] = {}
+
+
+def start_stack_sampler(profile_dir: str, role: str, **kwargs) -> StackSampler:
+    """
+    Starts sampling the calling thread, writing the stacks to
+    profile_dir/<role>_<pid>.folded. Only one sampler is started per process.
+    """
+    pid = os.getpid()
+    if pid not in _samplers:
+        os.makedirs(profile_dir, exist_ok=True)
+        sampler = StackSampler(os.path.join(profile_dir, f"{role}_{pid}.folded"), **kwargs)
+        sampler.start()
+        _samplers[pid] = sampler
+    return _samplers[pid]
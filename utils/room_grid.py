@@ -0,0 +1,66 @@
+# Cell -> room lookup for the NovelGridWorlds states.
+#
+# Finding the room of the player by testing it against every entry of
+# state.room_coords costs one membership test per room at every step.
+# The rooms do not change during an episode, so the room id of every cell
+# is computed once per state into an integer grid, and the room of a cell
+# is then a single array lookup.
+
+import weakref
+from typing import Optional, Sequence
+
+import numpy as np
+
+# no room at this cell
+NO_ROOM = -1
+
+
+class RoomGrid:
+    """
+    Room id (index in room_coords) of every cell of a map_size map,
+    NO_ROOM for the cells outside of every room. When rooms share cells
+    (e.g. their walls), the first room of room_coords wins.
+    """
+    def __init__(self, room_coords: Sequence, map_size: Sequence[int]):
+        self.room_coords = room_coords
+        self.num_rooms = len(room_coords)
+        self.grid = np.full(tuple(map_size), NO_ROOM, dtype=np.int16)
+        # reversed so that the first matching room is written last
+        for room_id in reversed(range(self.num_rooms)):
+            coord = room_coords[room_id]
+            for cell in np.ndindex(self.grid.shape):
+                if cell in coord:
+                    self.grid[cell] = room_id
+        # nested lists, indexing them is faster than numpy for single cells
+        self._rows = self.grid.tolist()
+
+    def room_id(self, loc: Sequence[int]) -> int:
+        x, y = loc[0], loc[1]
+        if 0 <= x < len(self._rows) and 0 <= y < len(self._rows[x]):
+            return self._rows[x][y]
+        return NO_ROOM
+
+    def room_coord(self, loc: Sequence[int]):
+        """
+        The entry of room_coords containing loc, None if there is none.
+        """
+        room_id = self.room_id(loc)
+        return None if room_id == NO_ROOM else self.room_coords[room_id]
+
+    def is_valid_for(self, state) -> bool:
+        return state.room_coords is self.room_coords and len(state.room_coords) == self.num_rooms
+
+
+# state -> RoomGrid, dropped with the state at the end of the episode
+_room_grids = weakref.WeakKeyDictionary()
+
+
+def get_room_grid(state) -> RoomGrid:
+    """
+    The RoomGrid of the state, built on first use.
+    """
+    room_grid: Optional[RoomGrid] = _room_grids.get(state)
+    if room_grid is None or not room_grid.is_valid_for(state):
+        room_grid = RoomGrid(state.room_coords, state.get_map_size())
+        _room_grids[state] = room_grid
+    return room_grid
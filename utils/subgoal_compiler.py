@@ -0,0 +1,142 @@
+# Subgoals of the plan for the reward shaping wrappers.
+#
+# A plan step is a subgoal when its operator increases the count of an
+# item, in the inventory or in the world. The increments are read from
+# the effects of the operators in the pddl domain, so new recipes and
+# trades of a novelty are subgoals without any hand-written table.
+# The subgoals of a plan are compiled once per reset into arrays over
+# the items they reference, so a step only compares count vectors.
+
+from functools import lru_cache
+from typing import List, Mapping, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .env_reward_rapidlearn import parse_domain
+
+# quantities of the domain a subgoal can increase
+INVENTORY = "inventory"
+WORLD = "world"
+SUBGOAL_QUANTITIES = (INVENTORY, WORLD)
+
+# (quantity, item token, increment), the item token may be a parameter
+QuantityEffect = Tuple[str, str, int]
+
+
+@lru_cache(maxsize=256)
+def _operator_effects(pddl_domain: str, operator: str) -> Tuple[Tuple[str, ...], Tuple[QuantityEffect, ...]]:
+    """
+    The parameters of an operator of the domain and the increase / decrease
+    effects of the operator on the inventory and the world.
+    Decreases have a negative increment.
+    """
+    statement = parse_domain(pddl_domain)[1].get(operator)
+    if statement is None:
+        return (), ()
+    params = tuple(
+        token for token in statement[statement.index(":parameters") + 1]
+        if token[0] == '?'
+    )
+    effects = statement[statement.index(":effect") + 1]
+    effects = effects[1:] if effects[0] == "and" else [effects]
+
+    quantity_effects = []
+    for effect in effects:
+        if effect[0] not in ("increase", "decrease") or effect[1][0] not in SUBGOAL_QUANTITIES:
+            continue
+        increment = int(effect[2]) if effect[0] == "increase" else -int(effect[2])
+        # the last argument of the quantity is the item, see _make_get_quantity
+        quantity_effects.append((effect[1][0], effect[1][-1], increment))
+    return params, tuple(quantity_effects)
+
+
+def step_increments(pddl_domain: str, plan_step: Sequence[str]) -> Mapping[Tuple[str, str], int]:
+    """
+    Net increments of a plan step, e.g. ("craft_stick",) ->
+    {("inventory", "stick"): 4, ("inventory", "planks"): -2}.
+    """
+    operator = plan_step[0].lower()
+    params, quantity_effects = _operator_effects(pddl_domain, operator)
+    param_map = dict(zip(params, (arg.lower() for arg in plan_step[1:])))
+
+    increments = {}
+    for quantity_of, item, increment in quantity_effects:
+        key = (quantity_of, param_map.get(item, item))
+        increments[key] = increments.get(key, 0) + increment
+    return increments
+
+
+class SubgoalPlan(NamedTuple):
+    """
+    The subgoals of a plan, in plan order.
+    Subgoal i is met when the inventory counts of the items increased by
+    at least inventory[i], and the world counts by at least world[i].
+    """
+    # items referenced by the subgoals, the columns of the increments
+    items: Tuple[str, ...]
+    # index of the plan step of each subgoal
+    steps: np.ndarray
+    inventory: np.ndarray
+    world: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def counts(self, counts: Mapping[str, int]) -> np.ndarray:
+        """
+        The counts of the subgoal items, e.g. from an inventory dict.
+        """
+        return np.array([counts.get(item, 0) for item in self.items], dtype=int)
+
+    def is_met(self, subgoal: int, inventory_increase: np.ndarray, world_increase: np.ndarray) -> bool:
+        return bool(
+            (inventory_increase >= self.inventory[subgoal]).all() and
+            (world_increase >= self.world[subgoal]).all()
+        )
+
+    def describe(self, subgoal: int) -> dict:
+        """
+        The increments of a subgoal by quantity and item, for printing.
+        """
+        description = {}
+        for quantity_of, increments in ((INVENTORY, self.inventory), (WORLD, self.world)):
+            item_increments = {
+                item: int(increment)
+                for item, increment in zip(self.items, increments[subgoal]) if increment > 0
+            }
+            if len(item_increments) > 0:
+                description[quantity_of] = item_increments
+        return description
+
+
+def compile_subgoals(pddl_domain: str, plan: Sequence[Sequence[str]]) -> SubgoalPlan:
+    """
+    Compiles the subgoals of a plan, given as the tokens of its steps
+    (e.g. agent.plan_tokens), from the effects of the operators in the domain.
+    Only the items whose count a step increases are part of its subgoal,
+    air is never a subgoal.
+    """
+    steps: List[int] = []
+    subgoal_increments: List[Mapping[Tuple[str, str], int]] = []
+    items = {}
+    for step_index, plan_step in enumerate(plan):
+        if len(plan_step) == 0:
+            continue
+        increments = {
+            key: increment for key, increment in step_increments(pddl_domain, plan_step).items()
+            if increment > 0 and key[1] != "air"
+        }
+        if len(increments) == 0:
+            continue
+        steps.append(step_index)
+        subgoal_increments.append(increments)
+        for _, item in increments:
+            items.setdefault(item, len(items))
+
+    inventory = np.zeros((len(steps), len(items)), dtype=int)
+    world = np.zeros((len(steps), len(items)), dtype=int)
+    quantity_arrays = {INVENTORY: inventory, WORLD: world}
+    for subgoal, increments in enumerate(subgoal_increments):
+        for (quantity_of, item), increment in increments.items():
+            quantity_arrays[quantity_of][subgoal, items[item]] = increment
+    return SubgoalPlan(tuple(items), np.array(steps, dtype=int), inventory, world)
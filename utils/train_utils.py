@@ -1,6 +1,7 @@
-import torch
 import os
-import tianshou as ts
+
+from utils.buffer_checkpoint import BufferCheckpointWriter
+from utils.model_checkpoint import CheckpointWriter, CHECKPOINT_NAME
 
 
 def set_train_eps(epoch, env_step):
@@ -11,35 +12,41 @@ def set_train_eps(epoch, env_step):
     else:
         return max_eps - (max_eps - min_eps) / 10 * epoch
 
-def create_save_best_fn(log_path):
+def create_save_best_fn(checkpoint_writer: CheckpointWriter):
+    """
+    checkpoint_writer: writes the checkpoints in the background,
+    see utils/model_checkpoint.py
+    """
     def save_best_fn(policy):
-        torch.save(policy.state_dict(), os.path.join(log_path, "best_policy.pth"))
-        ckpt_path = os.path.join(log_path, "best_checkpoint.pth")
-        # Example: saving by epoch num
-        # ckpt_path = os.path.join(log_path, f"checkpoint_{epoch}.pth")
-        torch.save(
-            {
-                "model": policy.state_dict(),
+        policy_state = policy.state_dict()
+        checkpoint_writer.save({
+            "best_policy.pth": policy_state,
+            "best_checkpoint.pth": {
+                "model": policy_state,
                 "optim": policy.optim.state_dict(),
-            }, ckpt_path
-        )
+            },
+        })
     return save_best_fn
 
-def create_save_checkpoint_fn(log_path, policy, buffer: ts.data.ReplayBuffer):
+def create_save_checkpoint_fn(checkpoint_writer: CheckpointWriter, policy, buffer_writer: BufferCheckpointWriter):
+    """
+    checkpoint_writer: writes the model checkpoints in the background,
+    see utils/model_checkpoint.py
+    buffer_writer: writes the replay buffer checkpoint in the background,
+    see utils/buffer_checkpoint.py
+    """
     def save_checkpoint_fn(epoch, env_step, gradient_step):
         # see also: https://pytorch.org/tutorials/beginner/saving_loading_models.html
-        ckpt_path = os.path.join(log_path, "checkpoint.pth")
-        buffer_path = os.path.join(log_path, "buffer_ckpt.pth")
-        # Example: saving by epoch num
-        # ckpt_path = os.path.join(log_path, f"checkpoint_{epoch}.pth")
-        torch.save(
+        # saved as checkpoint_{epoch}.pth, checkpoint.pth is the latest one
+        checkpoint_writer.save_rolling(
+            epoch,
             {
                 "model": policy.state_dict(),
                 "optim": policy.optim.state_dict(),
-            }, ckpt_path
+            }
         )
-        buffer.save_hdf5(buffer_path)
-        return ckpt_path, buffer_path
+        buffer_writer.save()
+        return os.path.join(checkpoint_writer.log_path, CHECKPOINT_NAME), buffer_writer.checkpoint_dir
     return save_checkpoint_fn
 
 def generate_stop_fn(length, avg_rew_threshold):
@@ -0,0 +1,100 @@
+# Vector env benchmark.
+#
+# Steps the same envs, with the same seeds and the same random actions,
+# under every vector mode (see --vector_mode in train.py) and reports the
+# env steps/sec of each mode. The sum of all the observations is reported
+# as well, so that the modes can be checked to produce the same rollouts.
+#
+# Usage:
+#   python vector_env_benchmark.py --obs_type facing_only --num_envs 8 --steps 500
+#   python vector_env_benchmark.py --obs_type lidar_lite --modes subproc inproc
+
+import argparse
+import json
+import time
+from functools import partial
+
+import numpy as np
+
+from config import NOVELTIES, OBS_TYPES, AVAILABLE_ENVS, VECTOR_MODES
+from profiling import get_commit
+from utils.make_env import make_env, make_vector_env, get_config_file_paths, get_rep_gen_args
+
+parser = argparse.ArgumentParser(description="Vector env benchmark")
+parser.add_argument("--modes", nargs="*", default=list(VECTOR_MODES.keys()), choices=VECTOR_MODES.keys())
+parser.add_argument("--obs_type", default="facing_only", choices=OBS_TYPES.keys())
+parser.add_argument("--env", default="sa", choices=AVAILABLE_ENVS.keys())
+parser.add_argument("--novelty", default="none", choices=NOVELTIES.keys())
+parser.add_argument("--num_envs", type=int, default=8)
+parser.add_argument("--steps", type=int, default=200, help="Number of vector env steps per mode.")
+parser.add_argument("--max_time_step", type=int, default=400, help="Max steps per episode.")
+parser.add_argument("--seed", "-s", type=int, default=0)
+parser.add_argument("--output", "-o", type=str, default=None, help="Path of the json file to write the results to.")
+
+
+def run_benchmark(vector_mode, env_name, novelty_name, obs_type, num_envs, num_steps, max_time_step, seed):
+    config_file_paths = get_config_file_paths(novelty_name)
+    env_fn = partial(
+        make_env,
+        env_name=env_name,
+        config_file_paths=config_file_paths,
+        RepGenerator=OBS_TYPES[obs_type],
+        rep_gen_args=get_rep_gen_args(novelty_name, obs_type, config_file_paths),
+        max_time_step=max_time_step
+    )
+    venv = make_vector_env([env_fn for _ in range(num_envs)], vector_mode)
+    num_actions = venv.action_space[0].n
+    rng = np.random.default_rng(seed)
+
+    begin = time.perf_counter()
+    obs_sum = 0.0
+    for env_id in range(num_envs):
+        obs, _ = venv.reset(id=env_id, seed=seed + env_id)
+        obs_sum += float(np.sum(obs))
+    reset_time = time.perf_counter() - begin
+
+    num_resets = 0
+    begin = time.perf_counter()
+    for _ in range(num_steps):
+        actions = rng.integers(num_actions, size=num_envs)
+        obs, reward, terminated, truncated, info = venv.step(actions)
+        obs_sum += float(np.sum(obs))
+        done_ids = np.where(terminated | truncated)[0]
+        if len(done_ids) > 0:
+            num_resets += len(done_ids)
+            obs, _ = venv.reset(id=done_ids)
+            obs_sum += float(np.sum(obs))
+    step_time = time.perf_counter() - begin
+    venv.close()
+
+    return {
+        "env_steps": num_steps * num_envs,
+        "resets": num_resets,
+        "env_steps_per_sec": num_steps * num_envs / step_time,
+        "initial_reset_sec": reset_time,
+        "obs_sum": obs_sum,
+    }
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    results = []
+    for vector_mode in args.modes:
+        entry = {"vector_mode": vector_mode}
+        entry.update(run_benchmark(
+            vector_mode, args.env, args.novelty, args.obs_type,
+            args.num_envs, args.steps, args.max_time_step, args.seed
+        ))
+        print("{:<10}{:>10.1f} env steps/s  initial reset {:.2f}s  resets {}  obs sum {:.1f}".format(
+            vector_mode, entry["env_steps_per_sec"], entry["initial_reset_sec"],
+            entry["resets"], entry["obs_sum"]
+        ))
+        results.append(entry)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": get_commit(),
+                "args": vars(args),
+                "results": results
+            }, f, indent=2)
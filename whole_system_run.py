@@ -1,26 +1,46 @@
-import numpy as np
+# Whole system evaluation.
+#
+# Evaluates the trained model of every seed of an experiment with the
+# planner in the loop (the pf env by default), and merges the success
+# rate of each model seed into results/<exp_name>/<novelty>_full_result.csv.
+# The episodes of a model run in parallel over a vector env of
+# --num_envs envs (one worker process each with the default
+# --vector_mode), with one batched policy call per step.
+#
+# Usage:
+#   python whole_system_run.py --exp_name my_exp -n <novelty> -b lidar_all -a ppo --num_envs 16
+#   python whole_system_run.py --exp_name my_exp -n <novelty> --random 10
+
 import os
-from envs.planning_until_failure import PlanningUntilFailureEnv
-import tianshou as ts
-from tqdm import tqdm
+import time
+from functools import partial
+
+import numpy as np
 import gymnasium as gym
-from net.basic import BasicNet
-import torch
-from torch.utils.tensorboard import SummaryWriter
-from tianshou.utils import TensorboardLogger
-from obs_convertion import LidarAll, OnlyFacingObs
-from args import parser, NOVELTIES
+from tqdm import tqdm
 
-from policy_utils import create_policy
+from args import parser, get_default_device, OBS_TYPES, HINTS, NOVEL_ACTIONS
+from policy_utils import create_policy, create_policy_for_matrix
+from utils.evaluation import (
+    evaluate, find_model_paths, load_policy_state, make_policy_act_fn,
+    make_random_act_fn, merge_success_rates
+)
+from utils.hint_utils import get_hinted_actions
+from utils.make_env import make_env, make_vector_env, get_config_file_paths, get_rep_gen_args
 from utils.pddl_utils import get_all_actions
 
 parser.add_argument(
     "--num_episodes",
     type=int,
     default=100,
-    help="The path of the saved model to check.",
+    help="Number of episodes to evaluate each model on.",
+)
+parser.add_argument(
+    "--num_envs",
+    type=int,
+    default=None,
+    help="Number of envs running the episodes in parallel. Defaults to the number of cores.",
 )
-
 parser.add_argument(
     "--random",
     type=int,
@@ -29,121 +49,95 @@ parser.add_argument(
 )
 
 
-args = parser.parse_args()
-random = args.random
-model_seed = args.seed or np.random.randint(0, 1000)
-SEEDS = [model_seed + i for i in range(10)]
-num_episodes = args.num_episodes
-
-verbose = False
-
-novelty_name = args.novelty
-exp_name = args.exp_name or "default_exp"
-dir_name = "results" + os.sep + exp_name
-result_file = f"{dir_name}{os.sep}{novelty_name}_full_result.csv"
-
-rate_hist = []
-
-def log_info(seed_no, success_rate):
-    with open(result_file, "a") as f:
-        f.write(f"{seed_no},{success_rate}\n")
-    rate_hist.append(success_rate)
-
-
-def find_model_paths(novelty_name, exp_name, rl_algo, obs_type, result_folder="results"):
-    if random is not None:
-        # return dummy placeholder for random
-        return {i: None for i in range(random)}
-    files = {}
-    result_folder = os.path.join(result_folder, exp_name, novelty_name, obs_type, rl_algo)
-    for directory in os.listdir(result_folder):
-        if not os.path.isdir(os.path.join(result_folder, directory)):
-            continue
-        for file in os.listdir(os.path.join(result_folder, directory)):
-            if file.endswith(".pth"):
-                files[directory] = os.path.join(result_folder, directory, file)
-    return files
-
-
-# novelty
-novelty_name = args.novelty
-novelty_path = NOVELTIES[novelty_name]
-config_file_paths = ["config/polycraft_gym_rl_single."]
-config_file_paths.append(novelty_path)
-
-env_seed = args.seed
+def create_eval_policy(rl_algo, venv, all_actions, novel_actions, hidden_sizes, device):
+    """
+    The policy in the same way as in train.py, in eval mode.
+    """
+    observation_space = venv.observation_space[0]
+    if isinstance(observation_space, gym.spaces.Dict):
+        policy = create_policy_for_matrix(
+            rl_algo, observation_space, venv.action_space[0],
+            all_actions, novel_actions,
+            hidden_sizes=hidden_sizes, device=device
+        )
+    else:
+        state_shape = observation_space.shape or observation_space.n
+        action_shape = venv.action_space[0].shape or venv.action_space[0].n
+        policy = create_policy(
+            rl_algo, state_shape, action_shape,
+            all_actions, novel_actions,
+            hidden_sizes=hidden_sizes, device=device
+        )
+    policy.eval()
+    return policy
 
 
 if __name__ == "__main__":
-    if not os.path.exists(dir_name):
-        os.makedirs(dir_name)
-    if not os.path.exists(result_file):
-        with open(result_file, "w") as f:
-            f.write("seed_no,success_rate\n")
-    env = PlanningUntilFailureEnv(
+    args = parser.parse_args()
+    if args.device is None:
+        args.device = get_default_device()
+    novelty_name = args.novelty
+    exp_name = args.exp_name or "default_exp"
+    dir_name = os.path.join(args.logdir, exp_name)
+    result_file = os.path.join(dir_name, f"{novelty_name}_full_result.csv")
+    os.makedirs(dir_name, exist_ok=True)
+
+    config_file_paths = get_config_file_paths(novelty_name)
+    all_actions = get_all_actions(config_file_paths)
+    hints = str(HINTS.get(novelty_name))
+    novel_actions = (NOVEL_ACTIONS.get(novelty_name) or []) + get_hinted_actions(all_actions, hints, True)
+    hidden_sizes = None if args.hidden_sizes is None else [int(x) for x in args.hidden_sizes.split(",")]
+
+    if args.random is not None:
+        # dummy placeholders for random
+        model_paths = {str(i): None for i in range(args.random)}
+    else:
+        model_folder = os.path.join(
+            args.logdir, exp_name, args.env, novelty_name, args.obs_type, args.rl_algo
+        )
+        model_paths = find_model_paths(model_folder)
+    print("Found Files:", model_paths)
+    if len(model_paths) == 0:
+        exit(0)
+
+    # the envs are shared by all the models
+    num_envs = args.num_envs or os.cpu_count() or 1
+    max_time_step = 1200 if novelty_name == "none" else 400
+    env_fn = partial(
+        make_env,
+        env_name=args.env,
         config_file_paths=config_file_paths,
-        agent_name="agent_0",
-        task_name="main",
-        show_action_log=False,
-        enable_render=False,
-        skip_epi_when_rl_done=False
+        RepGenerator=OBS_TYPES[args.obs_type],
+        rep_gen_args=get_rep_gen_args(novelty_name, args.obs_type, config_file_paths),
+        max_time_step=max_time_step
     )
-    # get create policy
-    all_actions = get_all_actions(config_file_paths)
-    state_shape = env.observation_space.shape or env.observation_space.n
-    action_shape = env.action_space.shape or env.action_space.n
+    venv = make_vector_env([env_fn for _ in range(num_envs)], args.vector_mode)
 
-    model_paths = find_model_paths(novelty_name, exp_name, args.rl_algo, args.obs_type)
-    print("Found Files:", model_paths)
+    success_rates = {}
     for model_seed, model_path in tqdm(model_paths.items(), leave=False):
-        if random is None:
-            policy = create_policy(args.rl_algo, state_shape, action_shape, all_actions)
+        if model_path is None:
+            act_fn = make_random_act_fn(venv)
+        else:
+            policy = create_eval_policy(
+                args.rl_algo, venv, all_actions, novel_actions, hidden_sizes, args.device
+            )
             try:
-                policy.load_state_dict(torch.load(model_path))
-            except:
-                print("Failed to load model from", model_path)
+                policy.load_state_dict(load_policy_state(model_path, args.device))
+            except Exception as e:
+                print("Failed to load model from", model_path, ":", e)
                 continue
-        
-        success_count = 0
-        skipped_episodes = 0
-        env.reset(seed=env_seed)
-        for episode in tqdm(range(num_episodes), leave=False):
-            if skipped_episodes > 0:
-                # skips through the steps of the episode
-                # due to previously skipped episodes
-                skipped_episodes -= 1
-                success_count += 1
-                continue
-
-            # reset the environment, potentially skipping episodes due to planner
-            # finishing the whole task
-            obs, info = env.reset()
-
-            # gather the skipped episodes
-            skipped_episodes = info['skipped_epi_count']
-
-            # beginning of the RL episode
-            agent = env.env.agent_manager.agents["agent_0"]
-
-            success = False
-            for step in range(1000):
-                if not random:
-                    action = policy(ts.data.Batch(obs=np.array([obs]), info=info)).act
-                    action = policy.map_action(action)
-                else:
-                    action = env.action_space.sample()
-                obs, reward, terminated, truncated, info = env.step(action)
-                
-                if terminated:
-                    success = True
-                    success_count += 1
-                    break
-                elif truncated:
-                    break
-            # print("Episode", episode, ": success" if success else ": fail")
+            act_fn = make_policy_act_fn(policy)
 
+        begin = time.perf_counter()
+        result = evaluate(venv, act_fn, args.num_episodes, seed=args.seed)
         print()
         print("Model Seed: ", model_seed)
-        print("Success Rate:", success_count / num_episodes)
-        log_info(model_seed, success_count / num_episodes)
-    print("mean:", np.mean(rate_hist), "std:", np.std(rate_hist))
+        print("Success Rate:", result.success_rate, f"({result.num_skipped} solved by the planner)")
+        print("Took {:.1f}s".format(time.perf_counter() - begin))
+        success_rates[model_seed] = result.success_rate
+        # merged after every model, so that the results so far are kept if interrupted
+        merge_success_rates(result_file, {model_seed: result.success_rate})
+    venv.close()
+
+    rates = list(success_rates.values())
+    print("mean:", np.mean(rates), "std:", np.std(rates))